@@ -0,0 +1,257 @@
+"""Database, scheduler and dashboard benchmarks on synthetic data.
+
+    python bench.py connections              # ops/sec: pooled get_conn vs connect per call
+    python bench.py due                      # due-queue page latency at 100k and 1M cards
+    python bench.py reschedule               # 1M-card deck rescheduled in one pass
+    python bench.py reschedule --cards 100000
+    python bench.py streaks                  # streak upkeep over a 10-year daily history
+    python bench.py search                   # query latency over 1M indexed chat turns
+    python bench.py charts                   # dashboard charts for a year of activity
+
+Each benchmark builds its data in a scratch database under a temporary
+directory, so nothing touches the app's own files.
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import db
+
+DAY = 86400
+
+
+@contextmanager
+def scratch_db():
+    """Point db at an empty database in a temporary directory."""
+    saved = db.DB_NAME, db.SHARD_DIR, db.EMBED_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        db.close_conn()
+        db.DB_NAME, db.SHARD_DIR, db.EMBED_DIR = os.path.join(tmp, "bench.db"), None, tmp
+        db._schema_ready.clear()
+        try:
+            db.init_db()
+            yield db
+        finally:
+            db.close_conn()
+            db._schema_ready.clear()
+            db.DB_NAME, db.SHARD_DIR, db.EMBED_DIR = saved
+
+
+def timed(fn, *args, **kwargs):
+    """(result, seconds) of one call."""
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+@contextmanager
+def connect_per_call():
+    """Swap get_conn for a fresh connection per call, the way db.py used to
+    work; each one closes when the calling function drops it."""
+    pooled = db.get_conn
+    db.get_conn = lambda user_id=None: sqlite3.connect(db.db_path(user_id), timeout=30)
+    try:
+        yield
+    finally:
+        db.get_conn = pooled
+
+
+def ops_per_second(fn, seconds, threads=1):
+    """Calls of fn per second, summed over `threads` threads running it for `seconds`."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def worker():
+        count, deadline = 0, time.perf_counter() + seconds
+        try:
+            while time.perf_counter() < deadline:
+                fn()
+                count += 1
+        finally:
+            db.close_conn()
+        return count
+
+    with ThreadPoolExecutor(threads) as pool:
+        return sum(pool.map(lambda _: worker(), range(threads))) / seconds
+
+
+def insert_cards(count, now=None, user_id=db.DEFAULT_USER):
+    """Insert `count` reviewed cards with varied intervals, a tenth of them due."""
+    now = time.time() if now is None else now
+    rows = []
+    for i in range(count):
+        interval = 1 + i % 200
+        due = now - DAY if i % 10 == 0 else now + (i % 365) * DAY
+        rows.append((user_id, f"topic {i % 20}", f"단어 {i}", f"word {i}", "", interval, due,
+                     due - interval * DAY, 2.5, 3, now))
+    with db.get_conn(user_id) as conn:
+        conn.executemany('''
+            INSERT INTO flashcards (user_id, topic, korean, english, example, interval, next_review,
+                                    last_review, ease, reps, created)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+
+
+def insert_activity(days=365, per_day=12, now=None, user_id=db.DEFAULT_USER):
+    """`per_day` XP events and quiz answers a day for `days` days up to now."""
+    import random
+
+    rng = random.Random(0)
+    now = time.time() if now is None else now
+    stamps = [now - days * DAY + i * DAY / per_day for i in range(days * per_day)]
+    with db.get_conn(user_id) as conn:
+        conn.executemany("INSERT INTO xp_events (user_id, amount, reason, timestamp) VALUES (?, ?, 'bench', ?)",
+                         [(user_id, rng.choice((5, 10, 20)), ts) for ts in stamps])
+        conn.executemany(db._QUIZ_INSERT, [
+            (user_id, "food", "What is 밥?", "[]", 0, 0, "rice", "rice", int(rng.random() < 0.7), ts)
+            for ts in stamps])
+
+
+def bench_connections(args):
+    cases = (("read  get_progress", lambda: db.get_progress()),
+             ("write add_xp", lambda: db.add_xp(1, reason="bench")))
+    with scratch_db():
+        for label, fn in cases:
+            pooled = ops_per_second(fn, args.seconds, args.threads)
+            with connect_per_call():
+                fresh = ops_per_second(fn, args.seconds, args.threads)
+            print(f"{label}: get_conn {pooled:8,.0f} ops/s, connect per call {fresh:8,.0f} ops/s "
+                  f"({pooled / fresh:.1f}x)")
+
+
+def bench_due(args):
+    import statistics
+
+    now = time.time()
+    for cards in args.cards:
+        with scratch_db():
+            insert_cards(cards, now)
+            pages, after = [], None
+            for _ in range(args.pages):
+                page, seconds = timed(db.get_due_page, 50, after, now=now)
+                pages.append(seconds)
+                after = (page[-1][5], page[-1][0])
+            topic = statistics.median(timed(db.get_due_page, 50, topic="topic 10", now=now)[1]
+                                      for _ in range(args.pages))
+            print(f"{cards:>9,} cards: first page {pages[0] * 1000:.2f} ms, "
+                  f"median of {args.pages} pages {statistics.median(pages) * 1000:.2f} ms, "
+                  f"page {args.pages} {pages[-1] * 1000:.2f} ms, one topic {topic * 1000:.2f} ms")
+
+
+def bench_reschedule(args):
+    import numpy as np
+    import scheduler
+
+    interval = np.arange(args.cards) % 200 + 1
+    due = np.full(args.cards, time.time())
+    _, seconds = timed(scheduler.reschedule, due - interval * DAY, due, interval, 1.2)
+    print(f"scheduler.reschedule over {args.cards:,} cards: {seconds * 1000:.0f} ms")
+    with scratch_db():
+        insert_cards(args.cards)
+        changed, seconds = timed(db.reschedule_deck)
+        print(f"identity reschedule of {args.cards:,} cards: {seconds:.2f} s, {changed} changed")
+        changed, seconds = timed(db.reschedule_deck, interval_modifier=1.2)
+        print(f"x1.2 reschedule of {args.cards:,} cards:     {seconds:.2f} s, {changed:,} changed")
+
+
+WORDS = ("학교", "사과", "김치", "친구", "바다", "school", "apple", "friend", "river", "music")
+
+
+def bench_search(args):
+    import random
+    import statistics
+
+    rng = random.Random(0)
+    now = time.time()
+    with scratch_db():
+        with db.get_conn() as conn:
+            conn.executemany("INSERT INTO chat_turns (user_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                             ((db.DEFAULT_USER, "user", " ".join(rng.sample(WORDS, 3)) + f" {i}", now + i)
+                              for i in range(args.rows)))
+        _, seconds = timed(db.sync_search)
+        print(f"indexed {args.rows:,} chat turns in {seconds:.1f} s")
+        every_kind = list(db.SEARCH_KINDS)
+        for label, query in (("common word", "학교"), ("two words", "사과 river"), ("rare", "12345")):
+            for kinds in (None, every_kind):
+                latency = statistics.median(timed(db.search, query, kinds)[1] for _ in range(args.queries))
+                print(f"{label:>12}, kinds={'all' if kinds else 'None'}: {latency * 1000:6.2f} ms")
+
+
+def bench_streaks(args):
+    import statistics
+
+    start, costs = datetime.date.today() - datetime.timedelta(days=365 * args.years - 1), []
+    with scratch_db():
+        conn = db.get_conn()
+        for day in range(365 * args.years):
+            today = (start + datetime.timedelta(days=day)).isoformat()
+            with conn:
+                costs.append(timed(db._log_activity, conn, db.DEFAULT_USER, today)[1])
+        first, last = statistics.median(costs[:365]), statistics.median(costs[-365:])
+        print(f"log_activity: {first * 1e6:.0f} us/day in year 1, {last * 1e6:.0f} us/day in year {args.years}")
+        streaks, seconds = timed(db.get_streaks)
+        print(f"get_streaks after {len(costs):,} days: {seconds * 1e6:.0f} us -> {streaks}")
+        _, seconds = timed(db.rebuild_streaks)
+        print(f"full rebuild from the day rows: {seconds * 1000:.1f} ms")
+
+
+def bench_charts(args):
+    import statistics
+    import charts
+
+    with scratch_db():
+        insert_cards(2000)
+        insert_activity(args.days)
+        _, _, intervals = db.get_flashcard_stats()
+        rows = db.get_xp_events(), db.get_quiz_history(), intervals
+        _, cold = timed(charts.render_charts, *rows)  # includes the NumPy import
+        warm = statistics.median(timed(charts.render_charts, *rows)[1] for _ in range(args.runs))
+        _, query = timed(lambda: (db.get_xp_events(), db.get_quiz_history(), db.get_flashcard_stats()))
+    print(f"{len(rows[0]):,} XP events + {len(rows[1]):,} answers over {args.days} days: "
+          f"render {warm * 1000:.1f} ms (median of {args.runs}), first call {cold * 1000:.1f} ms, "
+          f"queries {query * 1000:.1f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    connections = commands.add_parser("connections", help="thread-local connections vs connect per call")
+    connections.add_argument("--seconds", type=float, default=2.0, help="run time per case")
+    connections.add_argument("--threads", type=int, default=1)
+    connections.set_defaults(run=bench_connections)
+
+    due = commands.add_parser("due", help="keyset-paged due queue")
+    due.add_argument("--cards", type=int, nargs="+", default=[100_000, 1_000_000])
+    due.add_argument("--pages", type=int, default=200, help="pages walked per deck")
+    due.set_defaults(run=bench_due)
+
+    reschedule = commands.add_parser("reschedule", help="vectorised deck rescheduling")
+    reschedule.add_argument("--cards", type=int, default=1_000_000)
+    reschedule.set_defaults(run=bench_reschedule)
+
+    streaks = commands.add_parser("streaks", help="incremental streak summary")
+    streaks.add_argument("--years", type=int, default=10)
+    streaks.set_defaults(run=bench_streaks)
+
+    chart = commands.add_parser("charts", help="dashboard chart rendering")
+    chart.add_argument("--days", type=int, default=365)
+    chart.add_argument("--runs", type=int, default=20)
+    chart.set_defaults(run=bench_charts)
+
+    search = commands.add_parser("search", help="full-text search latency")
+    search.add_argument("--rows", type=int, default=1_000_000)
+    search.add_argument("--queries", type=int, default=50, help="queries timed per case")
+    search.set_defaults(run=bench_search)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""Dashboard charts as inline SVG.
+
+Takes the rows db.py returns (XP events, quiz answers, interval counts),
+rolls them up per day with NumPy and draws plain SVG strings, like the
+ornaments in render.py. A year of events renders in a few milliseconds,
+where a matplotlib PNG took ~100 ms per chart; the app still caches the
+result per data version. NumPy is imported on first use, keeping it off
+the first-paint path.
+"""
+import datetime
+import math
+
+DAY = 86400
+WIDTH, HEIGHT = 700, 260
+LEFT, RIGHT, TOP, BOTTOM = 52, 16, 34, 40  # plot margins inside the viewBox
+PLOT_W, PLOT_H = WIDTH - LEFT - RIGHT, HEIGHT - TOP - BOTTOM
+INK, GOLD, PAPER = "#4a2a18", "#B8973A", "#F5EDD8"
+MAX_MARKERS = 60  # points; longer series are drawn as a plain line
+
+
+def daily(rows, how="sum"):
+    """Roll (timestamp, value) rows up per UTC day.
+
+    Returns (first_day, values) with one value per day from the first row's
+    day to the last's: the day's total, or with how="mean" its average
+    (NaN on days without rows).
+    """
+    import numpy as np
+
+    data = np.asarray(rows, dtype=np.float64)
+    days = np.floor(data[:, 0] / DAY).astype(np.int64)
+    first = int(days.min())
+    totals = np.bincount(days - first, weights=data[:, 1])
+    if how == "mean":
+        counts = np.bincount(days - first)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            totals = totals / counts
+    return first, totals
+
+
+def _nice_top(y_max, ticks=4):
+    """(axis top, tick step) with a 1/2/2.5/5 x 10^n step."""
+    raw = max(y_max, 1e-9) / ticks
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw)
+    return step * math.ceil(y_max / step), step
+
+
+def _frame(title, y_top, step, y_label):
+    """Background, title, horizontal grid and y labels."""
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {WIDTH} {HEIGHT}" width="100%" '
+        f'style="font-family:Times New Roman,Times,serif;font-size:11px;">',
+        f'<rect width="{WIDTH}" height="{HEIGHT}" fill="{PAPER}"/>',
+        f'<text x="{WIDTH / 2}" y="20" text-anchor="middle" fill="{INK}" font-size="13">{title}</text>',
+        f'<text transform="translate(13,{TOP + PLOT_H / 2}) rotate(-90)" text-anchor="middle" '
+        f'fill="{INK}">{y_label}</text>',
+    ]
+    for i in range(int(round(y_top / step)) + 1):
+        tick = i * step
+        y = TOP + PLOT_H * (1 - tick / y_top)
+        parts.append(f'<line x1="{LEFT}" x2="{WIDTH - RIGHT}" y1="{y:.1f}" y2="{y:.1f}" '
+                     f'stroke="{GOLD}" stroke-opacity="0.35"/>')
+        parts.append(f'<text x="{LEFT - 6}" y="{y + 4:.1f}" text-anchor="end" fill="{INK}">{tick:g}</text>')
+    return parts
+
+
+def _x_label(x, text):
+    return f'<text x="{x:.1f}" y="{HEIGHT - BOTTOM + 16}" text-anchor="middle" fill="{INK}">{text}</text>'
+
+
+def _date_labels(first_day, n_days, x_of):
+    """Month starts for spans over two months, otherwise about seven days."""
+    start = datetime.date(1970, 1, 1) + datetime.timedelta(days=first_day)
+    if n_days <= 62:
+        every = max(1, math.ceil(n_days / 7))
+        return [_x_label(x_of(d), (start + datetime.timedelta(days=d)).strftime("%b %d"))
+                for d in range(0, n_days, every)]
+    every = max(1, math.ceil(n_days / 30 / 8))  # at most ~8 month labels
+    labels, month, index = [], datetime.date(start.year, start.month, 1), 0
+    while (month - start).days < n_days:
+        offset = (month - start).days
+        if offset >= 0 and index % every == 0:
+            labels.append(_x_label(x_of(offset), month.strftime("%b %Y" if month.month == 1 else "%b")))
+        month = datetime.date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        index += 1
+    return labels
+
+
+def line_chart(title, first_day, values, y_label, color, y_max=None, fill=False):
+    """Line over per-day values; NaN days are skipped."""
+    import numpy as np
+
+    days = np.flatnonzero(~np.isnan(values))
+    points = values[days]
+    y_top, step = _nice_top(y_max or max(float(points.max()), 1.0))
+    span = max(len(values) - 1, 1)
+
+    def x_of(day):
+        return LEFT + PLOT_W * (day / span if len(values) > 1 else 0.5)
+
+    xs = (LEFT + PLOT_W * days / span) if len(values) > 1 else np.full(len(days), LEFT + PLOT_W / 2)
+    ys = TOP + PLOT_H * (1 - points / y_top)
+    coords = " ".join(f"{a:.1f},{b:.1f}" for a, b in zip(xs.tolist(), ys.tolist()))
+
+    parts = _frame(title, y_top, step, y_label)
+    if fill:
+        base = TOP + PLOT_H
+        parts.append(f'<polygon points="{xs[0]:.1f},{base} {coords} {xs[-1]:.1f},{base}" '
+                     f'fill="{color}" fill-opacity="0.15"/>')
+    parts.append(f'<polyline points="{coords}" fill="none" stroke="{color}" stroke-width="2.5" '
+                 f'stroke-linejoin="round"/>')
+    if len(days) <= MAX_MARKERS:
+        parts.extend(f'<circle cx="{a:.1f}" cy="{b:.1f}" r="3.5" fill="{GOLD}" stroke="{color}"/>'
+                     for a, b in zip(xs.tolist(), ys.tolist()))
+    parts.extend(_date_labels(first_day, len(values), x_of))
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def bar_chart(title, labels, counts, x_label, y_label, color):
+    y_top, step = _nice_top(max(counts))
+    slot = PLOT_W / len(counts)
+    parts = _frame(title, y_top, step, y_label)
+    for i, (label, count) in enumerate(zip(labels, counts)):
+        height = PLOT_H * count / y_top
+        x = LEFT + slot * i
+        parts.append(f'<rect x="{x + slot * 0.1:.1f}" y="{TOP + PLOT_H - height:.1f}" '
+                     f'width="{slot * 0.8:.1f}" height="{height:.1f}" fill="{color}" stroke="{GOLD}"/>')
+        parts.append(_x_label(x + slot / 2, label))
+    parts.append(f'<text x="{LEFT + PLOT_W / 2}" y="{HEIGHT - 6}" text-anchor="middle" '
+                 f'fill="{INK}">{x_label}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def render_charts(events, answers, interval_data):
+    """{"xp", "accuracy", "intervals"} SVGs for whichever inputs have rows.
+
+    events are (timestamp, amount) XP rows, answers (timestamp, correct)
+    quiz rows and interval_data (interval_days, count) pairs.
+    """
+    charts = {}
+    if events:
+        first, xp = daily(events)
+        charts["xp"] = line_chart("XP over time", first, xp.cumsum(), "XP", "#8B1A1A", fill=True)
+    if answers:
+        first, accuracy = daily(answers, how="mean")
+        charts["accuracy"] = line_chart("Quiz accuracy per day", first, accuracy * 100, "% correct",
+                                        "#3B5E8C", y_max=100)
+    if interval_data:
+        days, counts = zip(*interval_data)
+        charts["intervals"] = bar_chart("Review interval distribution", [str(d) for d in days], counts,
+                                        "Interval (days)", "Cards", "#6B8E7B")
+    return charts
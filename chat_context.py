@@ -0,0 +1,92 @@
+"""Token-budgeted context for the chatbot.
+
+The newest turns are sent verbatim; older turns are folded into one rolling
+summary that travels as a single system message, so request size stays
+bounded however long the conversation gets.
+"""
+import functools
+import threading
+
+from llm import estimate_tokens
+
+TOKENIZER_NAME = "gpt2"
+DEFAULT_BUDGET = 2000
+MESSAGE_OVERHEAD = 4  # role/formatting tokens per message
+
+_tokenizer = None      # set by the background load; None until then or without transformers
+_loader = None
+_loader_lock = threading.Lock()
+
+
+def _load_tokenizer():
+    global _tokenizer
+    try:
+        from transformers import AutoTokenizer
+        _tokenizer = AutoTokenizer.from_pretrained(TOKENIZER_NAME)
+    except Exception:
+        pass
+
+
+def preload():
+    """Start loading the tokenizer on a background thread, once per process."""
+    global _loader
+    with _loader_lock:
+        if _loader is None:
+            _loader = threading.Thread(target=_load_tokenizer, name="tokenizer-preload", daemon=True)
+            _loader.start()
+
+
+@functools.lru_cache(maxsize=4096)
+def _encoded_len(text):
+    return len(_tokenizer.encode(text, add_special_tokens=False))
+
+
+def count_tokens(text):
+    """Token count with the local tokenizer once it has loaded; until then
+    (or without transformers) the byte-based llm.estimate_tokens."""
+    if _tokenizer is None:
+        return estimate_tokens(text)
+    return _encoded_len(text)
+
+
+def message_tokens(msg):
+    return count_tokens(msg["content"]) + MESSAGE_OVERHEAD
+
+
+def _window_start(history, floor, budget):
+    """Index of the oldest turn (>= floor) that still fits in budget, newest first."""
+    start, used = len(history), 0
+    while start > floor:
+        cost = message_tokens(history[start - 1])
+        if used + cost > budget and start < len(history):
+            break
+        used += cost
+        start -= 1
+    return start
+
+
+def build_context(history, summary="", summarized=0, budget=DEFAULT_BUDGET, summarize=None):
+    """Return (messages, summary, summarized) for the next request.
+
+    `summarized` counts the leading turns of history already folded into
+    `summary`; callers keep both between calls. When the verbatim turns
+    overflow the budget, older ones are folded via summarize(summary, turns)
+    down to half the budget, so the summariser runs once per several turns
+    rather than on every message. The first call starts the tokenizer
+    loading in the background instead of waiting for it.
+    """
+    preload()
+    if summary:
+        budget -= count_tokens(summary) + MESSAGE_OVERHEAD
+    start = _window_start(history, summarized, budget)
+    if start > summarized:
+        start = _window_start(history, summarized, budget // 2)
+        if summarize is not None:
+            summary = summarize(summary, history[summarized:start])
+        summarized = start
+
+    messages = list(history[start:])
+    if summary:
+        messages.insert(0, {"role": "system",
+                            "content": f"Summary of the earlier conversation: {summary}"})
+    return messages, summary, summarized
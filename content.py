@@ -0,0 +1,229 @@
+"""Prompts, validation and precomputed bundles for generated study content.
+
+Nothing here touches Streamlit, so the app and the `precompute.py` batch job
+share one definition of each prompt and of what counts as valid output.
+Generation goes through a `chat(messages, system=None) -> str` callable:
+groq_chat in the app, an llm.Backend in the batch job.
+
+A content bundle is a small SQLite file of ready topic packs (flashcards,
+vocabulary quiz, assignments) keyed by normalised topic, which the app
+serves before falling back to live generation.
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+
+from jsonparse import extract_json_list
+
+BUNDLE_FORMAT = 2  # 2: quizzes carry answer_index instead of answer text
+
+FLASHCARD_SYSTEM = "Output only a valid JSON array, no other text."
+QUIZ_SYSTEM = (
+    "You are a JSON-only quiz generator. "
+    "Output only a valid JSON array. "
+    "The answer field must be an exact copy of one of the options strings."
+)
+
+FALLBACK_FLASHCARDS = [{"front": "학교", "back": "School"}]
+FALLBACK_QUIZ = [{"question": "What does '학교' mean?",
+                  "options": ["School", "Book", "Friend", "Teacher"],
+                  "answer_index": 0}]
+FALLBACK_ASSIGNMENT = "Write 5 sentences using the word '학교'."
+
+POPULAR_TOPICS = [
+    "food", "family", "travel", "K-drama phrases", "greetings", "shopping",
+    "school life", "weather", "numbers", "animals", "hobbies", "emotions",
+]
+
+
+def topic_key(topic):
+    """Bundle lookup key: NFC, case-folded, single-spaced."""
+    return " ".join(unicodedata.normalize("NFC", topic).casefold().split())
+
+
+# ---------------- FLASHCARDS ----------------
+def flashcard_messages(topic):
+    prompt = (
+        f'Create 5 Korean flashcards about "{topic}". '
+        f'Each side max 5 words. Front = Korean, Back = English. '
+        f'Output ONLY a JSON array: [{{"front":"학교","back":"School"}}]'
+    )
+    return [{"role": "user", "content": prompt}]
+
+def valid_flashcard(card):
+    return (isinstance(card, dict)
+            and isinstance(card.get("front"), str) and card["front"].strip()
+            and isinstance(card.get("back"), str) and card["back"].strip())
+
+def parse_flashcards(raw):
+    cards = [c for c in extract_json_list(raw) or [] if valid_flashcard(c)]
+    return cards or None
+
+
+# ---------------- QUIZZES ----------------
+def vocab_quiz_prompt(topic):
+    return (
+        f"Korean vocabulary quiz on '{topic}'. "
+        f"Give English words, Korean-related answer options. All questions in English."
+    )
+
+def quiz_messages(topic_prompt):
+    prompt = (
+        f'{topic_prompt} '
+        f'Create exactly 10 multiple-choice questions. '
+        f'CRITICAL RULE: The "answer" field MUST be copied EXACTLY (same spelling, same capitalisation, '
+        f'same punctuation) from one of the 4 options in the "options" array. '
+        f'Output ONLY a JSON array, no markdown, no extra text: '
+        f'[{{"question":"...","options":["Option A","Option B","Option C","Option D"],"answer":"Option A"}}]'
+    )
+    return [{"role": "user", "content": prompt}]
+
+_LABEL = re.compile(r"^\(?([A-Da-d1-4])[).:]\s+")  # "B) ...", "(2) ...", "c. ..."
+_EDGE_PUNCT = "\"'`“”‘’「」.,;:!?。 "
+
+def clean_text(text):
+    """NFC (so composed and decomposed Hangul compare equal) with runs of
+    whitespace collapsed to single spaces."""
+    return " ".join(unicodedata.normalize("NFC", str(text)).split())
+
+def _value_text(value):
+    """Cleaned text of a string or JSON number (2000.0 -> "2000"), else None."""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return clean_text(value)
+
+def _match_key(text):
+    return _LABEL.sub("", clean_text(text)).strip(_EDGE_PUNCT).casefold()
+
+def _label_index(answer, n):
+    """Index for an answer given as a bare label: "B", "(2)", 2."""
+    if isinstance(answer, int) and not isinstance(answer, bool):
+        return answer - 1 if 1 <= answer <= n else None
+    text = clean_text(answer).strip("()[]. ")
+    if len(text) == 1 and text.upper() in "ABCD"[:n]:
+        return "ABCD".index(text.upper())
+    if text.isdigit() and 1 <= int(text) <= n:
+        return int(text) - 1
+    return None
+
+def normalize_question(q):
+    """{"question", "options", "answer_index"} from one model-written item, or
+    None when no option can be identified as the answer.
+
+    The answer is matched against the options, in order: exactly after
+    cleaning (numbers as their text, so 2000 matches "2000"); ignoring case,
+    option labels ("B) ") and edge punctuation; as a bare label or 1-based
+    number; as the one option it contains or is contained in.
+    """
+    if not isinstance(q, dict) or not isinstance(q.get("options"), list):
+        return None
+    options = []
+    for option in q["options"]:
+        option = _value_text(option)
+        if option and option not in options:
+            options.append(option)
+    question = clean_text(q.get("question", ""))
+    answer = q.get("answer", "")
+    if len(options) < 2 or not question or answer is None:
+        return None
+
+    keys = [_match_key(o) for o in options]
+    answer_text = _value_text(answer)
+    index = None
+    if answer_text in options:
+        index = options.index(answer_text)
+    elif answer_text is not None and _match_key(answer_text) in keys:
+        index = keys.index(_match_key(answer_text))
+    else:
+        index = _label_index(answer, len(options))
+        if index is None and answer_text and isinstance(answer, str):  # 50 isn't in "150"
+            key = _match_key(answer_text)
+            hits = [i for i, k in enumerate(keys) if key and k and (key in k or k in key)]
+            index = hits[0] if len(hits) == 1 else None
+    if index is None:
+        return None
+    return {"question": question, "options": options, "answer_index": index}
+
+def parse_quiz(raw):
+    questions = [q for q in map(normalize_question, extract_json_list(raw) or []) if q]
+    return questions or None
+
+
+# ---------------- ASSIGNMENTS ----------------
+def assignment_messages(topic):
+    return [{"role": "user",
+             "content": f"Create 2 practical Korean learning assignments about '{topic}'."}]
+
+def parse_assignment(raw):
+    return raw.strip() or None
+
+
+# ---------------- TOPIC PACKS ----------------
+PACK_PARTS = ("flashcards", "quizzes", "assignments")
+
+def generate_part(chat, topic, part):
+    """Generate and validate one part ("flashcards", "quizzes" or
+    "assignments") of a topic pack; ValueError if the output is unusable."""
+    if part == "flashcards":
+        value = parse_flashcards(chat(flashcard_messages(topic), system=FLASHCARD_SYSTEM))
+    elif part == "quizzes":
+        value = parse_quiz(chat(quiz_messages(vocab_quiz_prompt(topic)), system=QUIZ_SYSTEM))
+    elif part == "assignments":
+        value = parse_assignment(chat(assignment_messages(topic)))
+    else:
+        raise ValueError(f"Unknown pack part {part!r}")
+    if value is None:
+        raise ValueError(f"No valid {part} for {topic!r}")
+    return value
+
+
+# ---------------- BUNDLES ----------------
+def write_bundle(path, packs, version, model):
+    """Write {topic: pack} to a new bundle file, replacing path atomically."""
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    with conn:
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("CREATE TABLE packs (topic_key TEXT PRIMARY KEY, topic TEXT, pack TEXT)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("format", str(BUNDLE_FORMAT)), ("version", version),
+            ("model", model), ("created", str(time.time())),
+        ])
+        conn.executemany("INSERT OR REPLACE INTO packs VALUES (?, ?, ?)",
+                         [(topic_key(t), t, json.dumps(p, ensure_ascii=False)) for t, p in packs.items()])
+    conn.close()
+    os.replace(tmp, path)
+
+def _read_bundle(path):
+    """(meta, [(topic_key, topic, pack)]); no packs if the file is missing or
+    of another format."""
+    if not os.path.exists(path):
+        return {}, []
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        if meta.get("format") != str(BUNDLE_FORMAT):
+            return meta, []
+        return meta, [(key, topic, json.loads(pack))
+                      for key, topic, pack in conn.execute("SELECT topic_key, topic, pack FROM packs")]
+    except sqlite3.DatabaseError:
+        return {}, []
+    finally:
+        conn.close()
+
+def load_bundle(path):
+    """Return (meta, {topic_key: pack}); empty if the file is missing or of
+    another format."""
+    meta, rows = _read_bundle(path)
+    return meta, {key: pack for key, _, pack in rows}
+
+def bundle_packs(path):
+    """{topic: pack} as written, for carrying packs over into a new bundle."""
+    return {topic: pack for _, topic, pack in _read_bundle(path)[1]}
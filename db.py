@@ -1,42 +1,206 @@
-import sqlite3, time, datetime
+import sqlite3, time, datetime, threading, json, hashlib, os, re
+from contextlib import contextmanager
+
+import scheduler
 
 DB_NAME = "flashcards.db"
+DEFAULT_USER = "default"
+
+# Set to a directory to give every user their own SQLite file (write
+# isolation between learners). The shared LLM cache stays in DB_NAME.
+SHARD_DIR = os.environ.get("MANJOG_SHARD_DIR")
+
+# ---------------- CONNECTIONS ----------------
+# One long-lived connection per thread and database file instead of
+# connect/close on every call. Streamlit runs each session's script in its
+# own thread, so connections are never shared across threads.
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+STATEMENT_CACHE_SIZE = 256
+MMAP_SIZE = 256 * 1024 * 1024
+
+def _user_slug(user_id):
+    """Filesystem-safe, collision-free name for user_id."""
+    safe = re.sub(r"[^A-Za-z0-9_-]", "_", user_id)[:40]
+    digest = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:8]
+    return f"{safe}-{digest}"
+
+def db_path(user_id=None):
+    if SHARD_DIR and user_id is not None:
+        return os.path.join(SHARD_DIR, f"{_user_slug(user_id)}.db")
+    return DB_NAME
+
+def get_conn(user_id=None):
+    """Connection for user_id's database (the shared one unless sharding is on)."""
+    path = db_path(user_id)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        if path != DB_NAME:
+            os.makedirs(SHARD_DIR, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, cached_statements=STATEMENT_CACHE_SIZE)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        conns[path] = conn
+        if path != DB_NAME:
+            _ensure_schema(conn, path)
+    return conn
+
+def close_conn():
+    for conn in getattr(_local, "conns", {}).values():
+        conn.close()
+    _local.conns = {}
+
+def _ensure_schema(conn, path):
+    with _schema_lock:
+        if path not in _schema_ready:
+            _create_schema(conn)
+            _schema_ready.add(path)
+
+def _add_column(c, table, column, decl):
+    cols = [row[1] for row in c.execute(f"PRAGMA table_info({table})")]
+    if column not in cols:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+_BUMP_VERSION = '''
+    INSERT INTO stats_version (user_id, version) VALUES ({row}.user_id, 1)
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+'''
+_CARD_IN = '''
+    INSERT INTO card_stats (user_id, interval, count) VALUES (NEW.user_id, IFNULL(NEW.interval, 0), 1)
+    ON CONFLICT (user_id, interval) DO UPDATE SET count = count + 1;
+'''
+_CARD_OUT = '''
+    UPDATE card_stats SET count = count - 1 WHERE user_id = OLD.user_id AND interval = IFNULL(OLD.interval, 0);
+'''
+_STATS_TRIGGERS = f'''
+CREATE TRIGGER IF NOT EXISTS trg_flashcards_stats_insert AFTER INSERT ON flashcards BEGIN
+    {_CARD_IN} {_BUMP_VERSION.format(row="NEW")}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_flashcards_stats_delete AFTER DELETE ON flashcards BEGIN
+    {_CARD_OUT} {_BUMP_VERSION.format(row="OLD")}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_flashcards_stats_interval AFTER UPDATE OF interval, user_id ON flashcards
+WHEN OLD.interval IS NOT NEW.interval OR OLD.user_id IS NOT NEW.user_id BEGIN
+    {_CARD_OUT} {_CARD_IN}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_flashcards_stats_update AFTER UPDATE ON flashcards BEGIN
+    {_BUMP_VERSION.format(row="NEW")}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_quizzes_stats_insert AFTER INSERT ON quizzes BEGIN
+    INSERT INTO quiz_stats (user_id, total, correct) VALUES (NEW.user_id, 1, NEW.correct)
+    ON CONFLICT (user_id) DO UPDATE SET total = total + 1, correct = correct + NEW.correct;
+    {_BUMP_VERSION.format(row="NEW")}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_quizzes_stats_delete AFTER DELETE ON quizzes BEGIN
+    UPDATE quiz_stats SET total = total - 1, correct = correct - OLD.correct WHERE user_id = OLD.user_id;
+    {_BUMP_VERSION.format(row="OLD")}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_progress_stats_insert AFTER INSERT ON progress BEGIN
+    {_BUMP_VERSION.format(row="NEW")}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_progress_stats_update AFTER UPDATE ON progress BEGIN
+    {_BUMP_VERSION.format(row="NEW")}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_streaks_stats_insert AFTER INSERT ON streaks BEGIN
+    {_BUMP_VERSION.format(row="NEW")}
+END;
+'''
+
+# Full-text index rows: rowid = source id * 4 + kind code, so a source row's
+# entry is found by rowid without an extra lookup table. ts is the source
+# row's creation time (from the column named here); results are ordered by it.
+_SEARCH_SOURCES = {
+    "card":       ("flashcards", ("korean", "english", "example"), "created"),
+    "assignment": ("assignments", ("task", "feedback"), "timestamp"),
+    "chat":       ("chat_turns", ("content",), "timestamp"),
+}
+SEARCH_KINDS = {"card": 1, "assignment": 2, "chat": 3}
+
+def _search_text(kind, row):
+    _, columns, _ = _SEARCH_SOURCES[kind]
+    return " || ' ' || ".join(f"COALESCE({row}.{col}, '')" for col in columns)
+
+# Plain SQL, so writes from any connection are tracked: the triggers only
+# queue changed rows in search_pending, and _sync_search tokenises them in
+# Python (at db.py's write sites, and before every search).
+_SEARCH_TRIGGERS = "".join(f'''
+DROP TRIGGER IF EXISTS trg_{table}_search_insert;
+DROP TRIGGER IF EXISTS trg_{table}_search_delete;
+DROP TRIGGER IF EXISTS trg_{table}_search_update;
+CREATE TRIGGER trg_{table}_search_insert AFTER INSERT ON {table} BEGIN
+    INSERT OR IGNORE INTO search_pending (doc) VALUES (NEW.id * 4 + {SEARCH_KINDS[kind]});
+END;
+CREATE TRIGGER trg_{table}_search_delete AFTER DELETE ON {table} BEGIN
+    INSERT OR IGNORE INTO search_pending (doc) VALUES (OLD.id * 4 + {SEARCH_KINDS[kind]});
+END;
+CREATE TRIGGER trg_{table}_search_update AFTER UPDATE OF {", ".join(columns)}, user_id ON {table} BEGIN
+    INSERT OR IGNORE INTO search_pending (doc) VALUES (OLD.id * 4 + {SEARCH_KINDS[kind]});
+    INSERT OR IGNORE INTO search_pending (doc) VALUES (NEW.id * 4 + {SEARCH_KINDS[kind]});
+END;
+''' for kind, (table, columns, _) in _SEARCH_SOURCES.items())
 
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_conn()
+    _ensure_schema(conn, DB_NAME)
+
+def _create_schema(conn):
     c = conn.cursor()
 
     # Flashcards
     c.execute('''
         CREATE TABLE IF NOT EXISTS flashcards (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL DEFAULT 'default',
             topic TEXT,
             korean TEXT,
             english TEXT,
             example TEXT,
             interval INTEGER,
-            next_review REAL
+            next_review REAL,
+            ease REAL DEFAULT 2.5,
+            reps INTEGER DEFAULT 0,
+            lapses INTEGER DEFAULT 0,
+            last_review REAL
         )
     ''')
+    # Scheduler state for decks created before these columns existed
+    _add_column(c, "flashcards", "ease", f"REAL DEFAULT {scheduler.DEFAULT_EASE}")
+    _add_column(c, "flashcards", "reps", "INTEGER DEFAULT 0")
+    _add_column(c, "flashcards", "lapses", "INTEGER DEFAULT 0")
+    _add_column(c, "flashcards", "created", "REAL")  # NULL for cards that predate it
+    _add_column(c, "flashcards", "last_review", "REAL")
 
     # Quizzes
     c.execute('''
         CREATE TABLE IF NOT EXISTS quizzes (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL DEFAULT 'default',
             topic TEXT,
             question TEXT,
             options TEXT,
             answer TEXT,
             user_answer TEXT,
             correct INTEGER,
-            timestamp REAL
+            timestamp REAL,
+            answer_index INTEGER,
+            user_index INTEGER
         )
     ''')
+    # Graded by option index; options are stored as JSON
+    _add_column(c, "quizzes", "answer_index", "INTEGER")
+    _add_column(c, "quizzes", "user_index", "INTEGER")
 
     # Assignments
     c.execute('''
         CREATE TABLE IF NOT EXISTS assignments (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL DEFAULT 'default',
             topic TEXT,
             task TEXT,
             user_response TEXT,
@@ -48,7 +212,34 @@ def init_db():
     # Streaks
     c.execute('''
         CREATE TABLE IF NOT EXISTS streaks (
-            date TEXT PRIMARY KEY
+            user_id TEXT NOT NULL DEFAULT 'default',
+            date TEXT,
+            PRIMARY KEY (user_id, date)
+        )
+    ''')
+
+    # Rows written before the schema was user-scoped belong to DEFAULT_USER
+    for table in ("flashcards", "quizzes", "assignments"):
+        _add_column(c, table, "user_id", f"TEXT NOT NULL DEFAULT '{DEFAULT_USER}'")
+    if "user_id" not in [row[1] for row in c.execute("PRAGMA table_info(streaks)")]:
+        c.execute("ALTER TABLE streaks RENAME TO streaks_old")
+        c.execute('''
+            CREATE TABLE streaks (
+                user_id TEXT NOT NULL DEFAULT 'default',
+                date TEXT,
+                PRIMARY KEY (user_id, date)
+            )
+        ''')
+        c.execute("INSERT INTO streaks (user_id, date) SELECT ?, date FROM streaks_old", (DEFAULT_USER,))
+        c.execute("DROP TABLE streaks_old")
+
+    # Current/longest streak per user, maintained by log_activity
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS streak_summary (
+            user_id TEXT PRIMARY KEY,
+            current INTEGER,
+            longest INTEGER,
+            last_date TEXT
         )
     ''')
 
@@ -61,137 +252,756 @@ def init_db():
     ''')
     c.execute("INSERT OR IGNORE INTO xp (id, points) VALUES (1, 0)")
 
+    # Per-user progress counters (supersedes the single-row xp table)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS progress (
+            user_id TEXT PRIMARY KEY,
+            xp INTEGER DEFAULT 0,
+            quizzes_taken INTEGER DEFAULT 0,
+            correct_answers INTEGER DEFAULT 0,
+            assignments_done INTEGER DEFAULT 0
+        )
+    ''')
+    c.execute("INSERT OR IGNORE INTO progress (user_id, xp) SELECT ?, points FROM xp WHERE id = 1", (DEFAULT_USER,))
+
+    # Append-only XP log behind the dashboard's XP-over-time chart
+    fresh_log = c.execute("SELECT 1 FROM sqlite_master WHERE name='xp_events'").fetchone() is None
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS xp_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            amount INTEGER,
+            reason TEXT,
+            timestamp REAL
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_xp_events_user_timestamp ON xp_events (user_id, timestamp)")
+    if fresh_log:
+        c.execute("INSERT INTO xp_events (user_id, amount, reason, timestamp) SELECT user_id, xp, 'carried over', ? "
+                  "FROM progress WHERE xp != 0", (time.time(),))
+
+    # Per-user indexes: due-card queue and history lookups
+    c.execute("DROP INDEX IF EXISTS idx_flashcards_next_review")
+    c.execute("DROP INDEX IF EXISTS idx_flashcards_topic_next_review")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_flashcards_user_next_review ON flashcards (user_id, next_review)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_flashcards_user_topic_next_review ON flashcards (user_id, topic, next_review)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_quizzes_user_timestamp ON quizzes (user_id, timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_assignments_user_timestamp ON assignments (user_id, timestamp)")
+
+    # Materialised dashboard statistics, kept current by triggers on every write path
+    fresh_stats = c.execute("SELECT 1 FROM sqlite_master WHERE name='card_stats'").fetchone() is None
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS card_stats (
+            user_id TEXT,
+            interval INTEGER,
+            count INTEGER,
+            PRIMARY KEY (user_id, interval)
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS quiz_stats (
+            user_id TEXT PRIMARY KEY,
+            total INTEGER DEFAULT 0,
+            correct INTEGER DEFAULT 0
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS stats_version (
+            user_id TEXT PRIMARY KEY,
+            version INTEGER
+        )
+    ''')
+    c.executescript(_STATS_TRIGGERS)
+    if fresh_stats:
+        _rebuild_stats(c)
+
+    # LLM response cache
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            response TEXT,
+            created REAL,
+            last_used REAL
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)")
+
+    # Chat turns, kept so past conversations can be searched
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS chat_turns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            role TEXT,
+            content TEXT,
+            timestamp REAL
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_chat_turns_user_timestamp ON chat_turns (user_id, timestamp)")
+
+    # Full-text search over cards, assignments and chat, kept current through
+    # the search_pending queue. Text is pre-tokenised by search_terms (Hangul
+    # syllable n-grams); tags holds the owner and kind tokens so both filters
+    # are answered by the index.
+    fts_columns = [row[1] for row in c.execute("PRAGMA table_info(search_fts)")]
+    if fts_columns and "ts" not in fts_columns:  # built before ts was added
+        c.execute("DROP TABLE search_fts")
+    fresh_search = "ts" not in fts_columns
+    c.execute("CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(body, tags, ts UNINDEXED, tokenize='unicode61')")
+    c.execute("CREATE TABLE IF NOT EXISTS search_pending (doc INTEGER PRIMARY KEY)")
+    c.executescript(_SEARCH_TRIGGERS)
+    if fresh_search:
+        _rebuild_search(c)
+
     conn.commit()
-    conn.close()
 
 # ---------------- FLASHCARDS ----------------
-def add_flashcards(topic, cards):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    for card in cards:
-        c.execute('''
-            INSERT INTO flashcards (topic, korean, english, example, interval, next_review)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (topic, card["korean"], card["english"], card["example"], 1, time.time()))
-    conn.commit()
-    conn.close()
+def add_flashcards(topic, cards, user_id=DEFAULT_USER, dedup=True):
+    """Insert cards and return how many were added.
 
-def get_due_cards():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
+    With dedup on, a card whose embedding is within DUP_THRESHOLD cosine
+    similarity of an existing card, or of an earlier card in the same call,
+    is skipped. Cards are embedded in batches, so bulk imports stay fast.
+    """
+    import embeddings
+
+    cards = list(cards)
     now = time.time()
-    c.execute("SELECT id, korean, english, example, interval, next_review FROM flashcards WHERE next_review <= ?", (now,))
-    cards = c.fetchall()
-    conn.close()
-    return cards
+    with _card_index(user_id) as index:
+        vectors = embeddings.embed([card_text(card) for card in cards])
+        if dedup:
+            keep = embeddings.dedup(vectors, index, DUP_THRESHOLD)
+            cards, vectors = [c for c, k in zip(cards, keep) if k], vectors[keep]
+        if not cards:
+            return 0
+        with get_conn(user_id) as conn:
+            conn.executemany('''
+                INSERT INTO flashcards (user_id, topic, korean, english, example, interval, next_review, created)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(user_id, topic, card["korean"], card["english"], card["example"], 1, now, now)
+                  for card in cards])
+            # AUTOINCREMENT ids of one insert batch are contiguous: the write lock is held throughout
+            last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            _sync_search(conn)
+        index.add(range(last - len(cards) + 1, last + 1), vectors)
+    return len(cards)
 
-def update_card(card_id, interval, next_review):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE flashcards SET interval=?, next_review=? WHERE id=?", (interval, next_review, card_id))
-    conn.commit()
-    conn.close()
+def find_similar(text, k=5, user_id=DEFAULT_USER):
+    """The k cards closest in meaning to text, best first, each with a "score"."""
+    import embeddings
 
-def get_flashcard_stats():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM flashcards")
-    total = c.fetchone()[0]
+    with _card_index(user_id) as index:
+        hits = index.search(embeddings.embed([text])[0], k)
+    if not hits:
+        return []
+    scores = dict(hits)
+    rows = get_conn(user_id).execute(f'''
+        SELECT id, topic, korean, english, example FROM flashcards
+        WHERE user_id = ? AND id IN ({",".join("?" * len(scores))})
+    ''', (user_id, *scores)).fetchall()
+    cards = [dict(zip(("id", "topic", "korean", "english", "example"), row), score=scores[row[0]])
+             for row in rows]
+    return sorted(cards, key=lambda card: -card["score"])
 
+def get_due_page(limit=50, after=None, topic=None, now=None, user_id=DEFAULT_USER):
+    """Return up to `limit` due cards in review order (next_review, id).
+
+    `after` is the (next_review, id) of the last card of the previous page;
+    paging is keyset-based so every page is an index range scan.
+    """
+    now = time.time() if now is None else now
+    cols = "id, korean, english, example, interval, next_review"
+    where, params = "user_id = ?", [user_id]
+    if topic is not None:
+        where += " AND topic = ?"
+        params.append(topic)
+    if after is None:
+        sql = f"SELECT {cols} FROM flashcards WHERE {where} AND next_review <= ? ORDER BY next_review, id LIMIT ?"
+        return get_conn(user_id).execute(sql, (*params, now, limit)).fetchall()
+    # Cards added together share a next_review. A row-value (next_review, id) > (?, ?)
+    # only seeks on next_review and walks the tied ids, so deep pages would slow
+    # down; the rest of the tie and the later values are two separate index seeks.
+    sql = f'''
+        SELECT * FROM (
+            SELECT * FROM (SELECT {cols} FROM flashcards WHERE {where} AND next_review = ? AND id > ?
+                           ORDER BY id LIMIT ?)
+            UNION ALL
+            SELECT * FROM (SELECT {cols} FROM flashcards WHERE {where} AND next_review > ? AND next_review <= ?
+                           ORDER BY next_review, id LIMIT ?)
+        ) ORDER BY next_review, id LIMIT ?
+    '''
+    return get_conn(user_id).execute(sql, (*params, after[0], after[1], limit,
+                                           *params, after[0], now, limit, limit)).fetchall()
+
+def iter_due_cards(topic=None, page_size=100, user_id=DEFAULT_USER):
+    """Yield due cards in review order, fetching one page at a time."""
     now = time.time()
-    c.execute("SELECT COUNT(*) FROM flashcards WHERE next_review <= ?", (now,))
-    due = c.fetchone()[0]
+    after = None
+    while True:
+        page = get_due_page(page_size, after, topic, now, user_id)
+        yield from page
+        if len(page) < page_size:
+            return
+        after = (page[-1][5], page[-1][0])
+
+def get_due_cards(limit=None, topic=None, user_id=DEFAULT_USER):
+    if limit is None:
+        return list(iter_due_cards(topic, user_id=user_id))
+    return get_due_page(limit, topic=topic, user_id=user_id)
+
+def update_card(card_id, interval, next_review, user_id=DEFAULT_USER):
+    with get_conn(user_id) as conn:
+        conn.execute("UPDATE flashcards SET interval=?, next_review=? WHERE id=? AND user_id=?",
+                     (interval, next_review, card_id, user_id))
 
-    c.execute("SELECT interval, COUNT(*) FROM flashcards GROUP BY interval")
+def review_card(card_id, quality, now=None, user_id=DEFAULT_USER):
+    """Grade a card (SM-2 quality 0-5) and store its new schedule."""
+    now = time.time() if now is None else now
+    conn = get_conn(user_id)
+    ease, reps, lapses, interval = conn.execute(
+        "SELECT ease, reps, lapses, interval FROM flashcards WHERE id=? AND user_id=?", (card_id, user_id)
+    ).fetchone()
+    ease, reps, lapses, interval = scheduler.review(quality, ease, reps, lapses, interval)
+    with conn:
+        conn.execute('''
+            UPDATE flashcards SET ease=?, reps=?, lapses=?, interval=?, next_review=?, last_review=?
+            WHERE id=?
+        ''', (ease, reps, lapses, interval, now + interval * scheduler.DAY, now, card_id))
+    return interval
+
+def reschedule_deck(interval_modifier=1.0, max_interval=scheduler.MAX_INTERVAL, user_id=DEFAULT_USER):
+    """Recompute every card's interval and due date in one vectorised pass.
+
+    Returns the number of cards whose schedule changed.
+    """
+    import numpy as np  # only needed for bulk rescheduling
+
+    conn = get_conn(user_id)
+    rows = conn.execute("SELECT id, interval, last_review, next_review FROM flashcards WHERE user_id=?",
+                        (user_id,)).fetchall()
+    if not rows:
+        return 0
+    deck = np.array(rows, dtype=np.float64)  # NULLs become NaN
+    ids, old_interval, last_review, next_review = deck.T
+    interval, due = scheduler.reschedule(last_review, next_review, old_interval,
+                                         interval_modifier, max_interval)
+    # Only write back the cards whose schedule actually moved
+    changed = (interval != old_interval) | ((due != next_review) & ~(np.isnan(due) & np.isnan(next_review)))
+    with conn:
+        conn.executemany("UPDATE flashcards SET interval=?, next_review=? WHERE id=?",
+                         zip(interval[changed].tolist(), due[changed].tolist(),
+                             ids[changed].astype(np.int64).tolist()))
+    return int(changed.sum())
+
+def get_flashcard_stats(user_id=DEFAULT_USER):
+    c = get_conn(user_id).cursor()
+    c.execute("SELECT interval, count FROM card_stats WHERE user_id=? AND count > 0 ORDER BY interval", (user_id,))
     interval_data = c.fetchall()
+    total = sum(count for _, count in interval_data)
+
+    # Time-dependent, so not materialised; an index range count on (user_id, next_review)
+    now = time.time()
+    c.execute("SELECT COUNT(*) FROM flashcards WHERE user_id=? AND next_review <= ?", (user_id, now))
+    due = c.fetchone()[0]
 
-    conn.close()
     return total, due, interval_data
 
+# ---------------- CARD EMBEDDINGS ----------------
+# Vector index used by add_flashcards / find_similar, one per user and
+# database, stored as NumPy memmaps under EMBED_DIR (see embeddings.py).
+# Opening it first indexes any cards added since it was last written, so
+# decks that predate the index are picked up on first use.
+EMBED_DIR = os.environ.get("MANJOG_EMBED_DIR", "card_index")
+DUP_THRESHOLD = 0.92
+INDEX_CATCH_UP_BATCH = 1024
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def card_text(card):
+    return f"{card['korean']} — {card['english']}"
+
+@contextmanager
+def _card_index(user_id):
+    """Hold user_id's vector index (locked, caught up with the flashcards table)."""
+    import embeddings
+
+    db_name = os.path.splitext(os.path.basename(db_path(user_id)))[0]
+    path = os.path.join(EMBED_DIR, db_name, _user_slug(user_id))
+    model = embeddings.model_name()
+    with _indexes_lock:
+        entry = _indexes.get(path)
+        if entry is None or entry[0].model != model:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            entry = _indexes[path] = (embeddings.VectorIndex(path, model, embeddings.dimension()),
+                                      threading.Lock())
+    index, lock = entry
+    with lock:
+        conn = get_conn(user_id)
+        newest = conn.execute("SELECT COALESCE(MAX(id), 0) FROM flashcards WHERE user_id = ?",
+                              (user_id,)).fetchone()[0]
+        if index.last_id > newest:  # database was replaced underneath the index
+            index.reset()
+        while index.last_id < newest:
+            rows = conn.execute('''
+                SELECT id, korean, english FROM flashcards
+                WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?
+            ''', (user_id, index.last_id, INDEX_CATCH_UP_BATCH)).fetchall()
+            index.add([r[0] for r in rows],
+                      embeddings.embed([card_text({"korean": r[1], "english": r[2]}) for r in rows]))
+        yield index
+
 # ---------------- QUIZZES ----------------
-def save_quiz_result(topic, question, options, answer, user_answer, correct):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO quizzes (topic, question, options, answer, user_answer, correct, timestamp)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (topic, question, str(options), answer, user_answer, int(correct), time.time()))
-    conn.commit()
-    conn.close()
+_QUIZ_INSERT = '''
+    INSERT INTO quizzes (user_id, topic, question, options, answer_index, user_index,
+                         answer, user_answer, correct, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
 
-def get_quiz_accuracy():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*), SUM(correct) FROM quizzes")
-    total, correct = c.fetchone()
-    conn.close()
-    return total, correct if correct else 0
+def _quiz_row(user_id, topic, question, options, answer_index, user_index):
+    """Row for _QUIZ_INSERT. user_index is None for an unanswered question;
+    answer/user_answer keep the option text for people reading the table."""
+    return (user_id, topic, question, json.dumps(options, ensure_ascii=False), answer_index, user_index,
+            options[answer_index], None if user_index is None else options[user_index],
+            int(user_index == answer_index), time.time())
+
+def save_quiz_result(topic, question, options, answer_index, user_index, user_id=DEFAULT_USER):
+    with get_conn(user_id) as conn:
+        conn.execute(_QUIZ_INSERT, _quiz_row(user_id, topic, question, options, answer_index, user_index))
+
+def get_quiz_accuracy(user_id=DEFAULT_USER):
+    row = get_conn(user_id).execute("SELECT total, correct FROM quiz_stats WHERE user_id=?", (user_id,)).fetchone()
+    return row if row is not None else (0, 0)
+
+def get_quiz_history(user_id=DEFAULT_USER, since=0):
+    """(timestamp, correct) rows for every answered question, oldest first."""
+    return get_conn(user_id).execute(
+        "SELECT timestamp, correct FROM quizzes WHERE user_id=? AND timestamp >= ? ORDER BY timestamp",
+        (user_id, since)
+    ).fetchall()
 
 # ---------------- ASSIGNMENTS ----------------
-def add_assignment(topic, task, user_response, feedback):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO assignments (topic, task, user_response, feedback, timestamp)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (topic, task, user_response, feedback, time.time()))
-    conn.commit()
-    conn.close()
+def add_assignment(topic, task, user_response, feedback, user_id=DEFAULT_USER):
+    with get_conn(user_id) as conn:
+        conn.execute('''
+            INSERT INTO assignments (user_id, topic, task, user_response, feedback, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (user_id, topic, task, user_response, feedback, time.time()))
+        _sync_search(conn)
 
-def get_assignment_history():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT topic, task, user_response, feedback, timestamp FROM assignments ORDER BY timestamp DESC")
-    rows = c.fetchall()
-    conn.close()
-    return rows
+_ASSIGNMENT_FULL = "id, topic, task, user_response, feedback, timestamp"
+_ASSIGNMENT_SUMMARY = "id, topic, timestamp, length(task), length(user_response), length(feedback)"
+
+def get_assignment_page(limit=20, before=None, summaries=False, user_id=DEFAULT_USER):
+    """Return up to `limit` assignments, newest first.
+
+    Rows are (id, topic, task, user_response, feedback, timestamp), or with
+    summaries=True (id, topic, timestamp, task_len, response_len, feedback_len)
+    so the large text columns stay in the database until get_assignment asks
+    for them. `before` is the (timestamp, id) of the last row of the previous
+    page; paging walks the (user_id, timestamp) index.
+    """
+    sql = f"SELECT {_ASSIGNMENT_SUMMARY if summaries else _ASSIGNMENT_FULL} FROM assignments WHERE user_id = ?"
+    params = [user_id]
+    if before is not None:
+        sql += " AND (timestamp, id) < (?, ?)"
+        params.extend(before)
+    sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+    params.append(limit)
+    return get_conn(user_id).execute(sql, params).fetchall()
+
+def iter_assignment_history(page_size=50, summaries=False, user_id=DEFAULT_USER):
+    """Yield assignments newest first, fetching one page at a time."""
+    ts = 2 if summaries else 5
+    before = None
+    while True:
+        page = get_assignment_page(page_size, before, summaries, user_id)
+        yield from page
+        if len(page) < page_size:
+            return
+        before = (page[-1][ts], page[-1][0])
+
+def get_assignment(assignment_id, user_id=DEFAULT_USER):
+    """Full (id, topic, task, user_response, feedback, timestamp) row, or None."""
+    return get_conn(user_id).execute(f"SELECT {_ASSIGNMENT_FULL} FROM assignments WHERE id = ? AND user_id = ?",
+                                     (assignment_id, user_id)).fetchone()
+
+def get_assignment_history(user_id=DEFAULT_USER):
+    return [row[1:] for row in iter_assignment_history(user_id=user_id)]
+
+# ---------------- CHAT ----------------
+def save_chat_turn(role, content, user_id=DEFAULT_USER):
+    with get_conn(user_id) as conn:
+        conn.execute("INSERT INTO chat_turns (user_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                     (user_id, role, content, time.time()))
+        _sync_search(conn)
 
 # ---------------- STREAKS ----------------
-def log_activity():
+# streaks keeps one row per active day; streak_summary holds the running
+# totals so reads and writes are O(1) regardless of account age.
+def _log_activity(conn, user_id, today):
+    cur = conn.execute("INSERT OR IGNORE INTO streaks (user_id, date) VALUES (?, ?)", (user_id, today))
+    if cur.rowcount == 0:
+        return
+    row = conn.execute("SELECT current, longest, last_date FROM streak_summary WHERE user_id=?", (user_id,)).fetchone()
+    if row is None or (row[2] is not None and today < row[2]):  # first day, or logged out of order
+        _rebuild_streaks(conn, user_id)
+        return
+    current, longest, last_date = row
+    yesterday = (datetime.date.fromisoformat(today) - datetime.timedelta(days=1)).isoformat()
+    current = current + 1 if last_date == yesterday else 1
+    conn.execute("UPDATE streak_summary SET current=?, longest=?, last_date=? WHERE user_id=?",
+                 (current, max(longest, current), today, user_id))
+
+def _rebuild_streaks(conn, user_id):
+    """Recompute the summary from the full history (gaps-and-islands)."""
+    row = conn.execute('''
+        WITH runs AS (
+            SELECT date, julianday(date) - ROW_NUMBER() OVER (ORDER BY date) AS grp
+            FROM streaks WHERE user_id = ?
+        ), islands AS (
+            SELECT COUNT(*) AS len, MAX(date) AS last FROM runs GROUP BY grp
+        )
+        SELECT (SELECT len FROM islands ORDER BY last DESC LIMIT 1), MAX(len), MAX(last) FROM islands
+    ''', (user_id,)).fetchone()
+    current, longest, last_date = row if row[2] is not None else (0, 0, None)
+    conn.execute("INSERT OR REPLACE INTO streak_summary (user_id, current, longest, last_date) VALUES (?, ?, ?, ?)",
+                 (user_id, current, longest, last_date))
+    return current, longest, last_date
+
+def rebuild_streaks(user_id=DEFAULT_USER):
+    with get_conn(user_id) as conn:
+        return _rebuild_streaks(conn, user_id)
+
+def log_activity(user_id=DEFAULT_USER):
     today = datetime.date.today().isoformat()
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("INSERT OR IGNORE INTO streaks (date) VALUES (?)", (today,))
-    conn.commit()
-    conn.close()
+    with get_conn(user_id) as conn:
+        _log_activity(conn, user_id, today)
 
-def get_streaks():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT date FROM streaks ORDER BY date ASC")
-    dates = [datetime.date.fromisoformat(row[0]) for row in c.fetchall()]
-    conn.close()
-
-    if not dates:
-        return 0, 0
-
-    longest, current = 1, 1
-    for i in range(1, len(dates)):
-        if (dates[i] - dates[i-1]).days == 1:
-            current += 1
-            longest = max(longest, current)
-        else:
-            current = 1
-    if (datetime.date.today() - dates[-1]).days == 0:
-        return current, longest
-    else:
+def get_streaks(user_id=DEFAULT_USER):
+    """Return (current, longest); current is 0 unless there was activity today."""
+    row = get_conn(user_id).execute(
+        "SELECT current, longest, last_date FROM streak_summary WHERE user_id=?", (user_id,)
+    ).fetchone()
+    current, longest, last_date = row if row is not None else rebuild_streaks(user_id)
+    if last_date != datetime.date.today().isoformat():
         return 0, longest
+    return current, longest
 
-# ---------------- XP ----------------
-def add_xp(amount: int):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE xp SET points = points + ? WHERE id = 1", (amount,))
-    conn.commit()
-    conn.close()
+# ---------------- PROGRESS / XP ----------------
+PROGRESS_FIELDS = ("xp", "quizzes_taken", "correct_answers", "assignments_done")
 
-def get_xp():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT points FROM xp WHERE id = 1")
-    points = c.fetchone()[0]
-    conn.close()
+def _add_progress(conn, user_id, deltas, reason=None):
+    unknown = set(deltas) - set(PROGRESS_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown progress fields: {sorted(unknown)}")
+    conn.execute("INSERT OR IGNORE INTO progress (user_id) VALUES (?)", (user_id,))
+    if deltas:
+        sets = ", ".join(f"{field} = {field} + ?" for field in deltas)
+        conn.execute(f"UPDATE progress SET {sets} WHERE user_id = ?", (*deltas.values(), user_id))
+    if deltas.get("xp"):
+        conn.execute("INSERT INTO xp_events (user_id, amount, reason, timestamp) VALUES (?, ?, ?, ?)",
+                     (user_id, deltas["xp"], reason, time.time()))
+
+def add_progress(user_id=DEFAULT_USER, reason=None, **deltas):
+    """Atomically increment counters, e.g. add_progress(user, "assignment", xp=20, assignments_done=1).
+    XP changes are also appended to xp_events with the given reason."""
+    with get_conn(user_id) as conn:
+        _add_progress(conn, user_id, deltas, reason)
+
+def get_progress(user_id=DEFAULT_USER):
+    row = get_conn(user_id).execute(
+        f"SELECT {', '.join(PROGRESS_FIELDS)} FROM progress WHERE user_id = ?", (user_id,)
+    ).fetchone()
+    return dict(zip(PROGRESS_FIELDS, row or (0,) * len(PROGRESS_FIELDS)))
+
+def reset_progress(user_id=DEFAULT_USER):
+    with get_conn(user_id) as conn:
+        conn.execute('''
+            INSERT INTO xp_events (user_id, amount, reason, timestamp)
+            SELECT user_id, -xp, 'reset', ? FROM progress WHERE user_id = ? AND xp != 0
+        ''', (time.time(), user_id))
+        conn.execute(f"UPDATE progress SET {', '.join(f'{f} = 0' for f in PROGRESS_FIELDS)} WHERE user_id = ?",
+                     (user_id,))
+
+def import_progress_json(path="progress.json", user_id=DEFAULT_USER):
+    """One-time import of the old progress.json file into the progress table.
+
+    The file is renamed before reading so that only one process imports it,
+    and renamed to *.imported once its counts are committed.
+    """
+    claimed = path + ".importing"
+    try:
+        os.replace(path, claimed)
+    except FileNotFoundError:
+        return False
+    try:
+        with open(claimed) as f:
+            data = json.load(f)
+    except ValueError:
+        data = {}
+    add_progress(user_id, "progress.json import", **{k: int(data.get(k, 0)) for k in PROGRESS_FIELDS})
+    os.replace(claimed, path + ".imported")
+    return True
+
+def add_xp(amount: int, user_id=DEFAULT_USER, reason=None):
+    add_progress(user_id, reason, xp=amount)
+
+def get_xp_events(user_id=DEFAULT_USER, since=0):
+    """(timestamp, amount) rows of the XP log, oldest first."""
+    return get_conn(user_id).execute(
+        "SELECT timestamp, amount FROM xp_events WHERE user_id=? AND timestamp >= ? ORDER BY timestamp",
+        (user_id, since)
+    ).fetchall()
+
+def get_xp(user_id=DEFAULT_USER):
+    points = get_progress(user_id)["xp"]
 
     level = points // 100 + 1
     xp_into_level = points % 100
     return points, level, xp_into_level
+
+# ---------------- DASHBOARD STATS ----------------
+def _rebuild_stats(c):
+    c.execute("DELETE FROM card_stats")
+    c.execute('''
+        INSERT INTO card_stats (user_id, interval, count)
+        SELECT user_id, IFNULL(interval, 0), COUNT(*) FROM flashcards GROUP BY user_id, IFNULL(interval, 0)
+    ''')
+    c.execute("DELETE FROM quiz_stats")
+    c.execute('''
+        INSERT INTO quiz_stats (user_id, total, correct)
+        SELECT user_id, COUNT(*), IFNULL(SUM(correct), 0) FROM quizzes GROUP BY user_id
+    ''')
+
+def rebuild_stats(user_id=None):
+    """Recompute the materialised counters from the base tables."""
+    with get_conn(user_id) as conn:
+        _rebuild_stats(conn)
+
+def stats_version(user_id=DEFAULT_USER):
+    """Bumped by triggers on every card, quiz, progress or streak write; use it as a cache key."""
+    row = get_conn(user_id).execute("SELECT version FROM stats_version WHERE user_id=?", (user_id,)).fetchone()
+    return row[0] if row else 0
+
+def get_stats_snapshot(user_id=DEFAULT_USER):
+    """Everything the Dashboard shows, read from the materialised tables."""
+    total, due, interval_data = get_flashcard_stats(user_id)
+    quizzes, correct = get_quiz_accuracy(user_id)
+    current, longest = get_streaks(user_id)
+    return {
+        "cards": total,
+        "due": due,
+        "intervals": interval_data,
+        "quiz_answers": quizzes,
+        "quiz_correct": correct,
+        "streak": current,
+        "longest_streak": longest,
+        **get_progress(user_id),
+    }
+
+# ---------------- SEARCH ----------------
+_HANGUL_RUN = re.compile(r"[\uac00-\ud7a3]+")
+_WORD = re.compile(r"\w+")
+
+def _tokens(text, query=False):
+    """Lower-cased words, with Hangul runs split into syllables and syllable
+    bigrams (Korean has no reliable word boundaries). Queries use bigrams only
+    where there are any, which is far more selective than single syllables."""
+    out = []
+    for word in _WORD.findall(text.lower()):
+        out.extend(_HANGUL_RUN.sub(" ", word).split())
+        for run in _HANGUL_RUN.findall(word):
+            bigrams = [run[i:i + 2] for i in range(len(run) - 1)]
+            if query:
+                out.extend(bigrams or [run])
+            else:
+                out.extend(run)
+                out.extend(bigrams)
+    return out
+
+def search_terms(text):
+    return " ".join(_tokens(text or ""))
+
+def _owner_tag(user_id):
+    return "u" + hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:16]
+
+def search_tags(user_id, kind):
+    return f"{_owner_tag(user_id)} k{kind}"
+
+SEARCH_SYNC_BATCH = 500
+
+def _index_docs(c, docs):
+    """Rewrite the search_fts rows for docs from their source rows, if any."""
+    c.executemany("DELETE FROM search_fts WHERE rowid = ?", [(doc,) for doc in docs])
+    by_kind = {}
+    for doc in docs:
+        by_kind.setdefault(doc % 4, []).append(doc // 4)
+    for kind, code in SEARCH_KINDS.items():
+        ids = by_kind.get(code)
+        if not ids:
+            continue
+        table, columns, created = _SEARCH_SOURCES[kind]
+        rows = c.execute(f'''
+            SELECT id, user_id, COALESCE({created}, 0), {", ".join(columns)} FROM {table}
+            WHERE id IN ({",".join("?" * len(ids))})
+        ''', ids).fetchall()
+        c.executemany("INSERT INTO search_fts (rowid, body, tags, ts) VALUES (?, ?, ?, ?)", [
+            (source_id * 4 + code, search_terms(" ".join(t or "" for t in texts)), search_tags(owner, kind), ts)
+            for source_id, owner, ts, *texts in rows
+        ])
+
+def _sync_search(c):
+    """Index the rows queued by the search triggers, in the caller's
+    transaction. The DELETE goes first so the write lock is taken up front."""
+    while True:
+        docs = [doc for (doc,) in c.execute('''
+            DELETE FROM search_pending WHERE doc IN (SELECT doc FROM search_pending LIMIT ?)
+            RETURNING doc
+        ''', (SEARCH_SYNC_BATCH,)).fetchall()]
+        if not docs:
+            return
+        _index_docs(c, docs)
+
+def sync_search(user_id=DEFAULT_USER):
+    """Index rows written outside db.py (other tools, plain connections)."""
+    conn = get_conn(user_id)
+    if conn.execute("SELECT 1 FROM search_pending LIMIT 1").fetchone():
+        with conn:
+            _sync_search(conn)
+
+def _rebuild_search(c):
+    c.execute("DELETE FROM search_fts")
+    c.execute("DELETE FROM search_pending")
+    for kind, (table, _, _) in _SEARCH_SOURCES.items():
+        c.execute(f"INSERT INTO search_pending (doc) SELECT id * 4 + {SEARCH_KINDS[kind]} FROM {table}")
+    _sync_search(c)
+
+def rebuild_search(user_id=None):
+    with get_conn(user_id) as conn:
+        _rebuild_search(conn.cursor())
+
+def search(query, kinds=None, limit=20, before=None, user_id=DEFAULT_USER):
+    """Matches for query among user_id's cards, assignments and chat, newest
+    first by creation time (cards older than the `created` column come last).
+
+    kinds restricts the sources ("card", "assignment", "chat"). Pages are
+    keyset-paginated: pass the "cursor" of the last result as `before`.
+    Each result has kind, id, text and cursor. Words match whole (no prefix
+    queries: without a prefix index they merge every matching doclist).
+    """
+    terms = _tokens(query, query=True)
+    if not terms:
+        return []
+    quoted = [f'"{t}"' for t in terms]
+    tags = f'"{_owner_tag(user_id)}"'
+    if kinds:  # every row is one of SEARCH_KINDS: without kinds the OR clause only costs time
+        kind_tags = " OR ".join(f'"k{k}"' for k in kinds)
+        tags += f" AND ({kind_tags})"
+    match = f'tags : ({tags}) AND body : ({" AND ".join(quoted)})'
+
+    sync_search(user_id)
+    sql, params = "SELECT rowid, ts FROM search_fts WHERE search_fts MATCH ?", [match]
+    if before is not None:
+        sql += " AND (ts, rowid) < (?, ?)"
+        params.extend(before)
+    conn = get_conn(user_id)
+    rows = conn.execute(sql + " ORDER BY ts DESC, rowid DESC LIMIT ?", (*params, limit)).fetchall()
+
+    by_kind = {}
+    for rowid, _ in rows:
+        by_kind.setdefault(rowid % 4, []).append(rowid // 4)
+    texts = {}
+    for kind, code in SEARCH_KINDS.items():
+        ids = by_kind.get(code)
+        if not ids:
+            continue
+        table, _, _ = _SEARCH_SOURCES[kind]
+        marks = ",".join("?" * len(ids))
+        for source_id, body in conn.execute(
+                f"SELECT id, {_search_text(kind, table)} FROM {table} WHERE id IN ({marks})", ids):
+            texts[source_id * 4 + code] = body.strip()
+
+    kind_of = {code: kind for kind, code in SEARCH_KINDS.items()}
+    return [{"kind": kind_of[rowid % 4], "id": rowid // 4, "text": texts.get(rowid, ""),
+             "cursor": (ts, rowid)} for rowid, ts in rows]
+
+# ---------------- BATCHED WRITES ----------------
+class WriteBatch:
+    """Queue card, quiz, XP and streak writes and commit them in one transaction."""
+
+    def __init__(self, user_id=DEFAULT_USER, reason=None):
+        self.user_id = user_id
+        self.reason = reason
+        self.card_updates = []
+        self.quiz_rows = []
+        self.progress = {}
+        self.activity = False
+
+    def update_card(self, card_id, interval, next_review):
+        self.card_updates.append((interval, next_review, card_id, self.user_id))
+
+    def save_quiz_result(self, topic, question, options, answer_index, user_index):
+        self.quiz_rows.append(_quiz_row(self.user_id, topic, question, options, answer_index, user_index))
+
+    def add_xp(self, amount: int):
+        self.add_progress(xp=amount)
+
+    def add_progress(self, **deltas):
+        for field, amount in deltas.items():
+            self.progress[field] = self.progress.get(field, 0) + amount
+
+    def log_activity(self):
+        self.activity = True
+
+    def commit(self):
+        with get_conn(self.user_id) as conn:
+            if self.card_updates:
+                conn.executemany("UPDATE flashcards SET interval=?, next_review=? WHERE id=? AND user_id=?",
+                                 self.card_updates)
+            if self.quiz_rows:
+                conn.executemany(_QUIZ_INSERT, self.quiz_rows)
+            if self.progress:
+                _add_progress(conn, self.user_id, self.progress, self.reason)
+            if self.activity:
+                _log_activity(conn, self.user_id, datetime.date.today().isoformat())
+
+@contextmanager
+def batch(user_id=DEFAULT_USER, reason=None):
+    """Usage: `with batch(user, "quiz") as b: b.update_card(...); b.add_xp(10)` — commits once on exit."""
+    b = WriteBatch(user_id, reason)
+    yield b
+    b.commit()
+
+# ---------------- LLM CACHE ----------------
+CACHE_TTL = 7 * 86400
+CACHE_MAX_ENTRIES = 5000
+cache_stats = {"hits": 0, "misses": 0}
+
+def cache_key(*parts):
+    """Content address for a request, e.g. cache_key(model, system, messages, max_tokens)."""
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def cache_get(key, ttl=CACHE_TTL):
+    conn = get_conn()
+    now = time.time()
+    row = conn.execute("SELECT response, created FROM llm_cache WHERE key=?", (key,)).fetchone()
+    if row is None or now - row[1] > ttl:
+        cache_stats["misses"] += 1
+        return None
+    with conn:
+        conn.execute("UPDATE llm_cache SET last_used=? WHERE key=?", (now, key))
+    cache_stats["hits"] += 1
+    return row[0]
+
+def cache_put(key, response, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+    now = time.time()
+    with get_conn() as conn:
+        conn.execute("INSERT OR REPLACE INTO llm_cache (key, response, created, last_used) VALUES (?, ?, ?, ?)",
+                     (key, response, now, now))
+        # Drop expired entries, then the least recently used beyond the size bound
+        conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - ttl,))
+        conn.execute('''
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+        ''', (max_entries,))
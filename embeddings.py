@@ -0,0 +1,226 @@
+"""Card embeddings and an on-disk vector index for near-duplicate detection.
+
+The supported default is a hashed character n-gram vector: no extra
+dependencies, and it catches re-generated cards with the same or lightly
+edited wording. Setting MANJOG_EMBED_MODEL to a sentence model (e.g.
+sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2, ~470 MB)
+switches to mean-pooled transformer embeddings, which also catch
+paraphrases; that needs torch and transformers installed, and the app
+loads the model in the background at start-up (`preload`) rather than in
+a request. If the model can't be loaded the hash vectors are used. Either
+way vectors are L2-normalised, so a dot product is cosine similarity.
+
+`VectorIndex` keeps (card id, vector) rows in two NumPy memmaps that grow by
+doubling, plus a small JSON sidecar recording the model and row count. Rows
+past the recorded count are ignored, so a crash mid-append loses at most the
+unflushed cards, which the caller re-indexes from the database.
+"""
+import functools
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+MODEL_NAME = os.environ.get("MANJOG_EMBED_MODEL")  # None: hash embeddings
+BATCH_SIZE = 64
+HASH_DIM = 256
+INITIAL_CAPACITY = 1024
+SEARCH_CHUNK = 8192  # index rows scored per matmul
+
+
+_model_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _load_model():
+    if not MODEL_NAME:
+        return None
+    try:
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        model = AutoModel.from_pretrained(MODEL_NAME).eval()
+        return torch, tokenizer, model
+    except Exception:
+        return None
+
+
+def _model():
+    with _model_lock:  # one download/load even if several threads ask at once
+        return _load_model()
+
+
+def preload():
+    """Load the configured model now (call off the request path); returns model_name()."""
+    return model_name()
+
+
+def model_name():
+    return MODEL_NAME if _model() is not None else f"hash-{HASH_DIM}"
+
+
+def dimension():
+    loaded = _model()
+    return HASH_DIM if loaded is None else loaded[2].config.hidden_size
+
+
+def _normalise(vecs):
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    return (vecs / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def _hash_embed(texts):
+    vecs = np.zeros((len(texts), HASH_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        text = f" {' '.join(text.lower().split())} "
+        for n in (1, 2, 3):
+            for i in range(len(text) - n + 1):
+                h = hashlib.blake2b(text[i:i + n].encode("utf-8"), digest_size=8).digest()
+                vecs[row, int.from_bytes(h, "little") % HASH_DIM] += 1.0
+    return vecs
+
+
+def embed(texts, batch_size=BATCH_SIZE):
+    """(len(texts), dim) float32 array of unit vectors."""
+    texts = list(texts)
+    loaded = _model()
+    if not texts:
+        return np.zeros((0, dimension()), dtype=np.float32)
+    if loaded is None:
+        return _normalise(_hash_embed(texts))
+
+    torch, tokenizer, model = loaded
+    out = []
+    with torch.no_grad():
+        for i in range(0, len(texts), batch_size):
+            enc = tokenizer(texts[i:i + batch_size], padding=True, truncation=True,
+                            max_length=64, return_tensors="pt")
+            hidden = model(**enc).last_hidden_state
+            mask = enc["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1)
+            out.append(pooled.numpy())
+    return _normalise(np.concatenate(out))
+
+
+class VectorIndex:
+    def __init__(self, path, model, dim):
+        """Open (or create) the index stored at path.{ids,vec,json}.
+        An index built with a different model or dimension starts empty."""
+        self.path = path
+        self.model = model
+        self.dim = dim
+        self.count = 0
+        meta = self._read_meta()
+        if meta.get("model") == model and meta.get("dim") == dim:
+            self.count = meta["count"]
+            self._open(max(meta["capacity"], INITIAL_CAPACITY), "r+")
+        else:
+            self._open(INITIAL_CAPACITY, "w+")
+            self._write_meta()
+
+    def _read_meta(self):
+        try:
+            with open(self.path + ".json", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self):
+        tmp = self.path + ".json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "dim": self.dim,
+                       "count": self.count, "capacity": self.capacity}, f)
+        os.replace(tmp, self.path + ".json")
+
+    def _open(self, capacity, mode):
+        self.capacity = capacity
+        self.ids = np.memmap(self.path + ".ids", dtype=np.int64, mode=mode,
+                             shape=(capacity,))
+        self.vectors = np.memmap(self.path + ".vec", dtype=np.float32, mode=mode,
+                                 shape=(capacity, self.dim))
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        self.ids.flush()
+        self.vectors.flush()
+        del self.ids, self.vectors
+        for suffix, row_bytes in ((".ids", 8), (".vec", 4 * self.dim)):
+            with open(self.path + suffix, "r+b") as f:
+                f.truncate(capacity * row_bytes)
+        self._open(capacity, "r+")
+
+    def reset(self):
+        self.count = 0
+        self._write_meta()
+
+    @property
+    def last_id(self):
+        return int(self.ids[self.count - 1]) if self.count else 0
+
+    def add(self, ids, vectors):
+        n = len(ids)
+        if not n:
+            return
+        self._grow(self.count + n)
+        self.ids[self.count:self.count + n] = ids
+        self.vectors[self.count:self.count + n] = vectors
+        self.ids.flush()
+        self.vectors.flush()
+        self.count += n
+        self._write_meta()
+
+    def scores(self, queries):
+        """(len(queries), count) cosine similarities against every indexed row."""
+        queries = np.asarray(queries, dtype=np.float32)
+        out = np.empty((len(queries), self.count), dtype=np.float32)
+        for i in range(0, self.count, SEARCH_CHUNK):
+            j = min(i + SEARCH_CHUNK, self.count)
+            out[:, i:j] = queries @ self.vectors[i:j].T
+        return out
+
+    def max_scores(self, queries):
+        """Best similarity of each query to anything in the index (-1 if empty)."""
+        best = np.full(len(queries), -1.0, dtype=np.float32)
+        for i in range(0, self.count, SEARCH_CHUNK):
+            j = min(i + SEARCH_CHUNK, self.count)
+            np.maximum(best, (queries @ self.vectors[i:j].T).max(axis=1), out=best)
+        return best
+
+    def search(self, query, k=5):
+        """[(card_id, score), ...] for the k nearest rows, best first."""
+        if not self.count:
+            return []
+        sims = self.scores(query[None, :])[0]
+        k = min(k, self.count)
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(int(self.ids[i]), float(sims[i])) for i in top]
+
+
+def dedup(vectors, index, threshold, block=512):
+    """Boolean mask of rows that are neither near an indexed card nor near an
+    earlier accepted row of the same batch. Works block by block so every
+    comparison is a matrix product rather than a per-row Python loop."""
+    keep = index.max_scores(vectors) < threshold if index.count else np.ones(len(vectors), bool)
+    accepted = []
+    for start in range(0, len(vectors), block):
+        rows = np.flatnonzero(keep[start:start + block]) + start
+        if not len(rows):
+            continue
+        v = vectors[rows]
+        ok = np.ones(len(rows), bool)
+        for prev in accepted:
+            if len(prev):
+                ok &= (v @ prev.T).max(axis=1) < threshold
+        sims = v @ v.T
+        for i in range(len(rows)):
+            if ok[i]:
+                ok[i + 1:][sims[i, i + 1:] >= threshold] = False
+        keep[rows[~ok]] = False
+        accepted.append(v[ok])
+    return keep
@@ -0,0 +1,171 @@
+"""Tolerant, single-pass JSON extraction for LLM output.
+
+Model replies wrap JSON in prose or markdown fences, leave raw newlines
+inside strings and add trailing commas. `StreamParser` walks the text once,
+skipping anything outside a balanced top-level array/object and repairing
+those mistakes as it copies, so each value is handed to json.loads exactly
+once. A bare word that is not a JSON literal or number means the bracket
+was prose, so the scan restarts just after it. It can be fed a streamed completion chunk by chunk and reports every
+element of the top-level array as soon as that element closes.
+"""
+import json
+import re
+
+_LITERAL = re.compile(r"true|false|null|-?\d+(\.\d+)?([eE][+-]?\d+)?")
+_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_OPEN = "[{"
+_CLOSE = "]}"
+
+
+class StreamParser:
+    def __init__(self):
+        self.values = []           # completed top-level values
+        self._reset()
+
+    def _reset(self):
+        self._buf = []             # repaired text of the current top-level value
+        self._raw = []             # the same text as fed, replayed if it turns out to be prose
+        self._word = []            # bare number/literal being read
+        self._root = None          # "[" or "{" while inside a value
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._comma = False        # comma held back until we know it isn't trailing
+        self._elem_start = None    # buffer offset of the open array element
+        self._elements = []        # parsed elements of a top-level array
+
+    def feed(self, text):
+        """Consume more text; return array elements completed by it."""
+        done = []
+        buf = self._buf
+        for ch in text:
+            if self._root is None:
+                if ch in _OPEN:
+                    self._root, self._depth = ch, 1
+                    buf.append(ch)
+                    self._raw.append(ch)
+                continue
+            self._raw.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    buf.append(ch)
+                elif ch == "\\":
+                    self._escape = True
+                    buf.append(ch)
+                elif ch == '"':
+                    self._in_string = False
+                    buf.append(ch)
+                else:
+                    buf.append(_ESCAPES.get(ch, ch) if ch < " " else ch)
+                continue
+
+            if not ch.isspace() and ch not in ',:"[]{}':
+                self._word.append(ch)
+            elif self._word:
+                if not _LITERAL.fullmatch("".join(self._word)):
+                    done.extend(self._restart())
+                    buf = self._buf
+                    continue
+                self._word = []
+
+            if ch.isspace():
+                continue
+            if ch == ",":
+                if self._depth == 1 and self._elem_start is not None:
+                    self._finish_element(done)
+                self._comma = True
+                continue
+            if ch in _CLOSE:
+                self._comma = False  # trailing comma
+                if self._depth == 1 and self._elem_start is not None:
+                    self._finish_element(done)
+                buf.append(ch)
+                self._depth -= 1
+                if self._depth == 1 and self._elem_start is not None:
+                    self._finish_element(done)
+                elif self._depth == 0:
+                    self._finish_value()
+                    buf = self._buf
+                continue
+
+            if self._comma:
+                buf.append(",")
+                self._comma = False
+            if self._depth == 1 and self._root == "[" and self._elem_start is None:
+                self._elem_start = len(buf)
+            if ch == '"':
+                self._in_string = True
+            elif ch in _OPEN:
+                self._depth += 1
+            buf.append(ch)
+        return done
+
+    def _restart(self):
+        """The open bracket was prose: rescan everything after it."""
+        replay = "".join(self._raw[1:])
+        self._reset()
+        return self.feed(replay)
+
+    def _finish_element(self, done):
+        if self._root != "[":
+            self._elem_start = None
+            return
+        try:
+            item = json.loads("".join(self._buf[self._elem_start:]))
+        except ValueError:
+            item = None
+        else:
+            self._elements.append(item)
+            done.append(item)
+        self._elem_start = None
+
+    def _finish_value(self):
+        if self._root == "[":
+            value = self._elements
+        else:
+            try:
+                value = json.loads("".join(self._buf))
+            except ValueError:
+                value = None
+        if value is not None:
+            self.values.append(value)
+        self._reset()
+
+    def close(self):
+        """End of input: salvage the elements of an array cut off mid-way."""
+        if self._root == "[" and self._elements:
+            self.values.append(self._elements)
+        self._reset()
+        return self.values
+
+
+def parse_values(text):
+    """All top-level JSON arrays/objects found in text, in order."""
+    parser = StreamParser()
+    parser.feed(text)
+    return parser.close()
+
+
+def extract_json_list(raw):
+    values = parse_values(raw)
+    lists = [v for v in values if isinstance(v, list)]
+    # Prefer a list of records over stray bracketed prose like "[5]"
+    for v in lists:
+        if v and all(isinstance(x, dict) for x in v):
+            return v
+    if lists:
+        return lists[0]
+    for v in values:
+        for inner in v.values():
+            if isinstance(inner, list):
+                return inner
+    return None
+
+
+def extract_json_obj(raw):
+    for v in parse_values(raw):
+        if isinstance(v, dict):
+            return v
+    return None
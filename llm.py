@@ -0,0 +1,282 @@
+"""LLM backends: Groq, any OpenAI-compatible server, and an offline mock.
+
+A `Backend` pairs a provider with a model name and, for hosted providers,
+a `ratelimit.Throttle`. Backends are configured from settings looked up by
+name (environment or Streamlit secrets):
+
+    LLM_PROVIDER    groq | openai | mock             (default groq)
+    LLM_MODEL       model name                       (provider default)
+    LLM_BASE_URL    OpenAI-compatible endpoint, e.g. http://localhost:8000/v1
+                    (for groq: overrides the API host)
+    LLM_API_KEY     falls back to GROQ_API_KEY for groq
+    LLM_RPM/LLM_TPM client-side limits (Groq free tier by default)
+    LLM_LATENCY     mock only: seconds per reply
+
+The same keys with an LLM_GENERATE_ prefix configure an optional second
+backend for content generation, e.g. a local vLLM or llama.cpp server, so
+only the chatbot pays for the hosted model.
+
+`chat` and `chat_stream` put a backend behind the db response cache and,
+optionally, a SingleFlight that coalesces identical in-flight calls.
+"""
+import hashlib
+import json
+import random
+import re
+import time
+from contextlib import contextmanager
+
+import db
+from ratelimit import Throttle
+
+DEFAULT_MODELS = {"groq": "llama-3.1-8b-instant", "openai": "local-model", "mock": "mock"}
+DEFAULT_LIMITS = {"groq": (30, 6000)}  # (requests/min, tokens/min)
+MESSAGE_OVERHEAD = 4  # role/formatting tokens per message
+
+
+def estimate_tokens(text):
+    """Token estimate for throttling: UTF-8 bytes / 3, i.e. ~3 chars per token
+    for English and ~1 per Hangul syllable. No tokenizer to load, and
+    `Throttle.settle` corrects it with the provider's count afterwards."""
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+def estimate_messages(messages):
+    return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD for m in messages)
+
+
+class ChatCompletionsProvider:
+    """Groq and OpenAI clients share the chat.completions API."""
+
+    def __init__(self, name, make_client):
+        self.name = name
+        self._make_client = make_client
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._make_client()
+        return self._client
+
+    def complete(self, model, messages, max_tokens):
+        """Return (reply, total_tokens or None)."""
+        resp  = self.client.chat.completions.create(model=model, messages=messages,
+                                                    max_tokens=max_tokens)
+        usage = getattr(resp, "usage", None)
+        return resp.choices[0].message.content, getattr(usage, "total_tokens", None)
+
+    def open_stream(self, model, messages, max_tokens):
+        stream = self.client.chat.completions.create(model=model, messages=messages,
+                                                     max_tokens=max_tokens, stream=True)
+        return (chunk.choices[0].delta.content for chunk in stream
+                if chunk.choices and chunk.choices[0].delta.content)
+
+
+def groq_provider(api_key, base_url=None):
+    def make_client():
+        from groq import Groq  # deferred until the first LLM call
+        # Retries are the Throttle's job; client-side ones would multiply them
+        return Groq(api_key=api_key, base_url=base_url, max_retries=0)
+    return ChatCompletionsProvider("groq", make_client)
+
+
+def openai_provider(base_url, api_key=None):
+    def make_client():
+        from openai import OpenAI
+        # Local servers ignore the key but the client insists on one
+        return OpenAI(base_url=base_url, api_key=api_key or "not-needed", max_retries=0)
+    return ChatCompletionsProvider("openai", make_client)
+
+
+class MockProvider:
+    """Deterministic, in-process replies shaped like the app's prompts.
+
+    The reply depends only on the prompt, so caching and coalescing behave as
+    with a real model, and `latency` simulates a slow upstream for
+    throughput runs with no network.
+    """
+    name = "mock"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def _reply(self, messages):
+        prompt = messages[-1]["content"]
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+        topic = (re.findall(r"""["']([^"']{1,40})["']""", prompt) or ["topic"])[0]
+        n = int((re.findall(r"\b(\d+)\b", prompt) or [5])[0])
+        if '"front"' in prompt:
+            return json.dumps([{"front": f"{topic} 단어 {i + 1}", "back": f"{topic} word {i + 1}"}
+                               for i in range(n)], ensure_ascii=False)
+        if '"options"' in prompt:
+            items = []
+            for i in range(n):
+                options = [f"보기 {i + 1}-{j}" for j in range(4)]
+                items.append({"question": f"Question {i + 1} about {topic}?",
+                              "options": options, "answer": rng.choice(options)})
+            return json.dumps(items, ensure_ascii=False)
+        if "NAME_KOREAN:" in prompt:  # labelled story format
+            names = dict(re.findall(r"^(NAME_KOREAN|NAME_ENGLISH): (.+)$", prompt, re.MULTILINE))
+            name = names.get("NAME_ENGLISH", topic)
+            return (f"NAME_KOREAN: {names.get('NAME_KOREAN', '홍길동')}\n"
+                    f"NAME_ENGLISH: {name}\n"
+                    f"KOREAN_STORY: {'옛날 옛적에 큰 꿈을 꾼 사람이 있었어요. ' * 3}\n"
+                    f"ENGLISH_STORY: {name} faced hardship, found a turning point and never gave up.\n"
+                    f"MORAL_KOREAN: 포기하지 마세요.\n"
+                    f"MORAL_ENGLISH: Never give up.")
+        if '"motivation"' in prompt:
+            return json.dumps({"motivation": f"🌸 Feeling {topic} is okay — rest, breathe and keep going 💪😊",
+                               "korean_quote": rng.choice(["천 리 길도 한 걸음부터", "시작이 반이다"]),
+                               "english_translation": "Every journey starts with one step."},
+                              ensure_ascii=False)
+        return f"(mock) {rng.choice(['네', '좋아요', '알겠어요'])} — {prompt[:80]}"
+
+    def complete(self, model, messages, max_tokens):
+        time.sleep(self.latency)
+        return self._reply(messages), None
+
+    def open_stream(self, model, messages, max_tokens):
+        reply = self._reply(messages)
+        time.sleep(self.latency / 2)  # time to first token
+        return (reply[i:i + 16] for i in range(0, len(reply), 16))
+
+
+class Backend:
+    def __init__(self, provider, model, throttle=None):
+        self.provider = provider
+        self.model    = model
+        self.throttle = throttle
+
+    @property
+    def name(self):
+        return f"{self.provider.name}:{self.model}"
+
+    @contextmanager
+    def _call(self, fn, messages, max_tokens, background=False):
+        """Run fn under the throttle, if any, keeping its concurrency slot for
+        the with-block; yields (result, token estimate or None)."""
+        if self.throttle is None:
+            yield fn(), None
+            return
+        estimate = estimate_messages(messages) + max_tokens
+        with self.throttle.hold(fn, estimate, background) as result:
+            yield result, estimate
+
+    def _settle(self, estimate, actual):
+        if estimate is not None and actual:
+            self.throttle.settle(estimate, actual)
+
+    def complete(self, messages, max_tokens, background=False):
+        """background=True marks prefetch traffic, which yields to interactive calls."""
+        with self._call(lambda: self.provider.complete(self.model, messages, max_tokens),
+                        messages, max_tokens, background) as ((reply, used), estimate):
+            pass
+        self._settle(estimate, used)
+        return reply.strip()
+
+    def stream(self, messages, max_tokens):
+        """Yield reply deltas. Retries cover opening the stream, which is where
+        429s and timeouts surface; the slot is held until the stream ends."""
+        parts = []
+        with self._call(lambda: self.provider.open_stream(self.model, messages, max_tokens),
+                        messages, max_tokens) as (deltas, estimate):
+            for delta in deltas:
+                parts.append(delta)
+                yield delta
+        if estimate is not None:
+            self._settle(estimate, estimate - max_tokens + estimate_tokens("".join(parts)))
+
+
+def backend_from_settings(get, prefix="LLM_"):
+    """Build a Backend from settings, or None if {prefix}PROVIDER is unset
+    (only the default LLM_ prefix falls back to groq)."""
+    provider = get(prefix + "PROVIDER") or ("groq" if prefix == "LLM_" else None)
+    if provider is None:
+        return None
+    model = get(prefix + "MODEL") or DEFAULT_MODELS.get(provider)
+    if provider == "groq":
+        impl = groq_provider(get(prefix + "API_KEY") or get("GROQ_API_KEY"), get(prefix + "BASE_URL"))
+    elif provider == "openai":
+        impl = openai_provider(get(prefix + "BASE_URL"), get(prefix + "API_KEY"))
+    elif provider == "mock":
+        impl = MockProvider(float(get(prefix + "LATENCY") or 0))
+    else:
+        raise ValueError(f"Unknown LLM provider {provider!r}")
+
+    rpm, tpm = DEFAULT_LIMITS.get(provider, (None, None))
+    rpm = get(prefix + "RPM") or rpm
+    tpm = get(prefix + "TPM") or tpm
+    throttle = Throttle(rpm=int(rpm), tpm=int(tpm)) if rpm and tpm else None
+    return Backend(impl, model, throttle)
+
+
+def with_system(messages, system):
+    return ([{"role": "system", "content": system}] if system else []) + list(messages)
+
+
+def chat(backend, messages, system=None, max_tokens=1500, use_cache=True, store=True,
+         background=False, flights=None):
+    """Completion served from the db response cache when possible.
+
+    use_cache=False skips the lookup but still refreshes the cached entry;
+    store=False keeps one-off replies (chat turns, summaries) out of the
+    cache altogether. With flights (a SingleFlight), identical concurrent
+    cached calls share one request. use_cache=False calls are never
+    coalesced: their callers want a fresh reply each, e.g. a prefetch pool
+    filling two slots for the same prompt.
+    """
+    key = db.cache_key(backend.name, system, messages, max_tokens)
+    if use_cache:
+        cached = db.cache_get(key)
+        if cached is not None:
+            return cached
+
+    def complete():
+        reply = backend.complete(with_system(messages, system), max_tokens, background)
+        if store:
+            db.cache_put(key, reply)
+        return reply
+
+    if flights is None or not use_cache:
+        return complete()
+    return flights.do(key, complete)
+
+
+def chat_stream(backend, messages, system=None, max_tokens=1500, use_cache=True, store=True,
+                flights=None):
+    """Like chat but yields the reply in deltas as they arrive. A cached
+    reply, or one shared from an identical in-flight stream, arrives as a
+    single chunk."""
+    key = db.cache_key(backend.name, system, messages, max_tokens)
+    if use_cache:
+        cached = db.cache_get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    leader = flights is not None and use_cache
+    if leader:
+        call, leader = flights.begin(key)
+        if not leader:
+            shared = flights.wait(call)
+            if shared is not None:
+                yield shared
+                return
+
+    parts, reply = [], None
+    try:
+        for delta in backend.stream(with_system(messages, system), max_tokens):
+            parts.append(delta)
+            yield delta
+        reply = "".join(parts).strip()
+        if store:
+            db.cache_put(key, reply)
+    except Exception as e:
+        if leader:
+            flights.finish(key, call, error=e)
+            leader = False
+        raise
+    finally:
+        if leader:  # reply stays None if the stream was abandoned mid-way
+            flights.finish(key, call, value=reply)
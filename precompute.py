@@ -0,0 +1,87 @@
+"""Precompute topic packs into a content bundle the app serves instantly.
+
+    python precompute.py                          # content.POPULAR_TOPICS
+    python precompute.py food travel -o content_bundle.db
+    python precompute.py --topics-file topics.txt --workers 8
+
+Every (topic, part) generation runs on a bounded worker pool against the
+generation backend configured with the LLM_GENERATE_* / LLM_* environment
+variables (see llm.py), so the same rate limiting and retries apply.
+Output is validated with the app's parsers; topics with any unusable part
+are left out and reported, and the job exits non-zero.
+
+An existing bundle is updated, not replaced: packs for topics that weren't
+requested, or whose regeneration failed, are carried over (--replace starts
+from an empty bundle). If nothing was generated the file is left alone.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import content
+import llm
+
+DEFAULT_BUNDLE = "content_bundle.db"
+
+
+def read_topics(args):
+    topics = list(args.topics)
+    if args.topics_file:
+        with open(args.topics_file, encoding="utf-8") as f:
+            topics += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    topics = topics or content.POPULAR_TOPICS
+    seen, unique = set(), []
+    for topic in topics:
+        if content.topic_key(topic) not in seen:
+            seen.add(content.topic_key(topic))
+            unique.append(topic)
+    return unique
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("topics", nargs="*", help="topics to precompute (default: popular topics)")
+    parser.add_argument("--topics-file", help="one topic per line")
+    parser.add_argument("-o", "--output", default=os.environ.get("MANJOG_BUNDLE", DEFAULT_BUNDLE))
+    parser.add_argument("--workers", type=int, default=4, help="concurrent generations")
+    parser.add_argument("--version", default=time.strftime("%Y%m%d-%H%M%S"),
+                        help="bundle version label (default: timestamp)")
+    parser.add_argument("--replace", action="store_true",
+                        help="drop packs for topics not generated in this run")
+    args = parser.parse_args(argv)
+
+    backend = llm.backend_from_settings(os.environ.get, "LLM_GENERATE_") or \
+              llm.backend_from_settings(os.environ.get)
+    def chat(messages, system=None):
+        return backend.complete(llm.with_system(messages, system), 1500)
+
+    topics  = read_topics(args)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {(topic, part): pool.submit(content.generate_part, chat, topic, part)
+                   for topic in topics for part in content.PACK_PARTS}
+        packs, failed = {}, []
+        for topic in topics:
+            try:
+                packs[topic] = {part: futures[topic, part].result() for part in content.PACK_PARTS}
+                print(f"  ✓ {topic}")
+            except Exception as e:
+                failed.append(topic)
+                print(f"  ✗ {topic}: {e}", file=sys.stderr)
+
+    if not packs:
+        print(f"No topics generated; {args.output} left unchanged", file=sys.stderr)
+        return 1
+    fresh = {content.topic_key(topic) for topic in packs}
+    kept  = {} if args.replace else {topic: pack for topic, pack in content.bundle_packs(args.output).items()
+                                     if content.topic_key(topic) not in fresh}
+    content.write_bundle(args.output, {**kept, **packs}, args.version, backend.name)
+    print(f"Wrote {len(packs)}/{len(topics)} topics to {args.output}, kept {len(kept)} existing "
+          f"(version {args.version}, {backend.name}) in {time.perf_counter() - started:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
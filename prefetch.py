@@ -0,0 +1,71 @@
+"""Bounded pools of pre-generated content, kept topped up in the background.
+
+Each key has its own producer; `take` hands out a ready item instantly and
+schedules a refill, so slow generations happen off the page-load path.
+Pools start empty and fill on demand: the first `take` for a key misses
+(the caller generates live) and queues that key's refill, so a fresh worker
+doesn't spend its start-up on content nobody has asked for yet. A pool
+whose first miss has no live fallback can be warmed with `fill(1)`.
+"""
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ContentPool:
+    def __init__(self, producers, size=2, workers=2):
+        """producers maps key -> zero-arg callable returning an item.
+        A producer that raises or returns None just leaves its slot empty."""
+        self.producers = producers
+        self.size      = size
+        self._items    = {key: deque() for key in producers}
+        self._pending  = {key: 0 for key in producers}
+        self._lock     = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+
+    def fill(self, per_key=None):
+        """Queue production up to per_key items for every key (default: size)."""
+        for key in self.producers:
+            self._refill(key, per_key)
+
+    def take(self, key=None):
+        """Pop a ready item for key, or None if it has none ready.
+
+        With key None a random key is drawn on every call, so the pool
+        serves (and refills) all its keys rather than whichever happened to
+        be ready; another key's ready item is served only when the drawn
+        one is empty.
+        """
+        with self._lock:
+            if key is None:
+                key = random.choice(list(self._items))
+                ready = [k for k, items in self._items.items() if items]
+                served = key if self._items[key] or not ready else random.choice(ready)
+            else:
+                served = key
+            item = self._items[served].popleft() if served in self._items and self._items[served] else None
+        for k in {key, served} & self._items.keys():
+            self._refill(k)
+        return item
+
+    def available(self, key):
+        with self._lock:
+            return len(self._items.get(key, ()))
+
+    def _refill(self, key, target=None):
+        with self._lock:
+            missing = (target or self.size) - len(self._items[key]) - self._pending[key]
+            self._pending[key] += max(missing, 0)
+        for _ in range(missing):
+            self._executor.submit(self._produce, key)
+
+    def _produce(self, key):
+        try:
+            item = self.producers[key]()
+        except Exception:
+            item = None
+        with self._lock:
+            self._pending[key] -= 1
+            if item is not None:
+                self._items[key].append(item)
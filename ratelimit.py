@@ -0,0 +1,186 @@
+"""Client-side throttling for LLM calls: rate limits, retries, concurrency.
+
+`Throttle` combines three mechanisms, shared by every session in the process:
+  * two token buckets, one for requests/min and one for tokens/min, so we
+    wait locally instead of collecting 429s from the provider;
+  * exponential backoff with full jitter for 429s, timeouts and 5xx,
+    honouring Retry-After when the error carries one;
+  * an AIMD concurrency limit: +1 slot per limit's worth of successes,
+    halved on every rate-limit response.
+
+Calls marked background (prefetching) only run while no interactive call
+is waiting, leave BACKGROUND_RESERVE of each bucket untouched and never
+take the last concurrency slot, so they can't starve a learner's request.
+Streams keep their slot until the last chunk has arrived.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+BACKGROUND_RESERVE = 0.5  # share of each bucket kept for interactive calls
+
+
+class TokenBucket:
+    def __init__(self, per_minute, burst=None):
+        self.rate     = per_minute / 60.0
+        self.capacity = float(burst or per_minute)
+        self.level    = self.capacity
+        self.stamp    = time.monotonic()
+
+    def _fill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_time(self, amount, now, reserve=0.0):
+        """Seconds until amount is available with `reserve` (a share of
+        capacity) left over; 0 if it is now. Caller holds the lock."""
+        self._fill(now)
+        # an oversized request waits for a full bucket
+        needed = min(self.capacity, min(amount, self.capacity) + reserve * self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class AdaptiveLimit:
+    def __init__(self, initial=4, minimum=1, maximum=16):
+        self.limit    = float(initial)
+        self.minimum  = minimum
+        self.maximum  = maximum
+        self.inflight = 0
+        self._cond    = threading.Condition()
+
+    @contextmanager
+    def slot(self, background=False):
+        """Hold one concurrency slot. Background calls leave the last slot
+        free, so with the limit down to one they wait for it to grow again."""
+        with self._cond:
+            while self.inflight >= int(self.limit) - (1 if background else 0):
+                self._cond.wait()
+            self.inflight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.inflight -= 1
+                self._cond.notify_all()
+
+    def success(self):
+        with self._cond:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def backoff(self):
+        with self._cond:
+            self.limit = max(self.minimum, self.limit / 2)
+
+
+def _status(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def retryable(error):
+    status = _status(error)
+    if status is not None:
+        return status in RETRY_STATUS
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+class Throttle:
+    def __init__(self, rpm, tpm, concurrency=4, max_concurrency=16,
+                 retries=5, base_delay=0.5, max_delay=30.0):
+        self.requests = TokenBucket(rpm)
+        self.tokens   = TokenBucket(tpm)
+        self.limit    = AdaptiveLimit(concurrency, 1, max_concurrency)
+        self.retries    = retries
+        self.base_delay = base_delay
+        self.max_delay  = max_delay
+        self._lock = threading.Lock()
+        self._foreground_waiting = 0
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "waited": 0.0}
+
+    def _acquire(self, tokens, background=False):
+        reserve = BACKGROUND_RESERVE if background else 0.0
+        waiting = False
+        try:
+            while True:
+                with self._lock:
+                    now  = time.monotonic()
+                    wait = max(self.requests.wait_time(1, now, reserve),
+                               self.tokens.wait_time(tokens, now, reserve))
+                    if background and self._foreground_waiting:
+                        wait = max(wait, 0.1)
+                    if wait == 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        return
+                    if not background and not waiting:
+                        waiting = True
+                        self._foreground_waiting += 1
+                    self.stats["waited"] += wait
+                time.sleep(wait)
+        finally:
+            if waiting:
+                with self._lock:
+                    self._foreground_waiting -= 1
+
+    def settle(self, estimated, actual):
+        """Correct the token bucket once a call's real usage is known."""
+        with self._lock:
+            if actual < estimated:
+                self.tokens.give(estimated - actual)
+            else:
+                self.tokens.take(actual - estimated)
+
+    def call(self, fn, tokens, background=False):
+        """Run fn() within the limits, retrying transient failures.
+        tokens is the estimated cost (prompt + max completion)."""
+        with self.hold(fn, tokens, background) as result:
+            return result
+
+    @contextmanager
+    def hold(self, fn, tokens, background=False):
+        """Like call, but the concurrency slot stays taken until the
+        with-block exits: a stream's request is still running after fn
+        returns. Tokens are charged once; each retry takes another request."""
+        with self._lock:
+            self.stats["calls"] += 1
+        for attempt in range(self.retries + 1):
+            self._acquire(tokens if attempt == 0 else 0, background)
+            with self.limit.slot(background):
+                try:
+                    result = fn()
+                except Exception as e:
+                    error = e
+                else:
+                    self.limit.success()
+                    yield result
+                    return
+            if attempt == self.retries or not retryable(error):
+                raise error
+            if _status(error) == 429:
+                self.limit.backoff()
+                with self._lock:
+                    self.stats["rate_limited"] += 1
+            with self._lock:
+                self.stats["retries"] += 1
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            time.sleep(max(delay, _retry_after(error) or 0))
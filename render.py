@@ -0,0 +1,478 @@
+"""Static page assets and HTML builders.
+
+Lives outside streamlit_app.py so it is imported once per process: the CSS
+and SVG strings are built a single time instead of on every rerun, and
+list views are assembled into one HTML block per st.markdown call.
+"""
+import functools
+import re
+
+
+# ══════════════════════════════════════════════════
+# GLOBAL CSS  —  Old Korea Aesthetic
+# Fonts: Times New Roman (English) · Nanum Myeongjo (Korean)
+# ══════════════════════════════════════════════════
+GLOBAL_CSS = """
+<style>
+@import url('https://fonts.googleapis.com/css2?family=Nanum+Myeongjo:wght@400;700;800&family=Black+Han+Sans&display=swap');
+
+/* ── Root palette ── */
+:root {
+    --hanji:        #F5EDD8;
+    --ink:          #1C1208;
+    --dancheong:    #C0392B;
+    --dancheong2:   #8B1A1A;
+    --celadon:      #6B8E7B;
+    --gold:         #B8973A;
+    --cloud:        #EDE0CC;
+    --hanbok-blue:  #3B5E8C;
+    --brush-gray:   #6E5E4A;
+    --petal:        #E8B4B8;
+    --petal-deep:   #C97B8A;
+}
+
+/* ── Base font rules ── */
+html, body, [class*="css"] {
+    font-family: 'Times New Roman', Times, serif !important;
+    color: var(--ink) !important;
+}
+.korean-text, :lang(ko) {
+    font-family: 'Nanum Myeongjo', serif !important;
+}
+
+/* ── App background ── */
+.stApp {
+    background-color: var(--hanji) !important;
+    background-image:
+        radial-gradient(ellipse at 10% 20%, rgba(232,180,184,0.18) 0%, transparent 50%),
+        radial-gradient(ellipse at 90% 80%, rgba(107,142,123,0.12) 0%, transparent 50%),
+        radial-gradient(ellipse at 50% 50%, rgba(184,151,58,0.06) 0%, transparent 70%);
+    background-attachment: fixed;
+}
+
+/* ── Dancheong top bar ── */
+.stApp::before {
+    content: '';
+    display: block;
+    height: 6px;
+    background: repeating-linear-gradient(
+        90deg,
+        var(--dancheong)   0px,  var(--dancheong)   40px,
+        var(--gold)        40px, var(--gold)         80px,
+        var(--celadon)     80px, var(--celadon)      120px,
+        var(--hanbok-blue) 120px,var(--hanbok-blue)  160px,
+        var(--gold)        160px,var(--gold)         200px
+    );
+    position: fixed;
+    top: 0; left: 0; width: 100%; z-index: 9999;
+}
+
+/* ── Sidebar ── */
+[data-testid="stSidebar"] {
+    background-color: var(--dancheong2) !important;
+    background-image: repeating-linear-gradient(
+        0deg, transparent, transparent 38px,
+        rgba(255,255,255,0.04) 38px, rgba(255,255,255,0.04) 40px
+    ) !important;
+    border-right: 3px solid var(--gold) !important;
+}
+[data-testid="stSidebar"] * {
+    color: var(--hanji) !important;
+    font-family: 'Times New Roman', Times, serif !important;
+}
+[data-testid="stSidebar"] h1,
+[data-testid="stSidebar"] h2 {
+    color: var(--gold) !important;
+    font-family: 'Black Han Sans', sans-serif !important;
+    letter-spacing: 2px;
+    text-shadow: 1px 1px 3px rgba(0,0,0,0.4);
+}
+
+/* Sidebar radio */
+.stRadio div[role="radiogroup"] label {
+    display: block;
+    background-color: rgba(245,237,216,0.10) !important;
+    color: var(--hanji) !important;
+    padding: 10px 16px;
+    margin-bottom: 8px;
+    border-radius: 4px;
+    cursor: pointer;
+    border: 1px solid rgba(184,151,58,0.35);
+    font-family: 'Times New Roman', Times, serif !important;
+    font-size: 15px;
+    transition: background 0.2s, border-color 0.2s;
+}
+.stRadio div[role="radiogroup"] label:hover {
+    background-color: rgba(184,151,58,0.25) !important;
+    border-color: var(--gold) !important;
+}
+.stRadio div[role="radiogroup"] label[data-baseweb="radio"]:has(input:checked) {
+    background-color: rgba(184,151,58,0.30) !important;
+    border: 2px solid var(--gold) !important;
+    font-weight: 700;
+}
+
+/* ── Headings ── */
+h1, h2, h3 {
+    font-family: 'Black Han Sans', sans-serif !important;
+    color: var(--dancheong2) !important;
+    letter-spacing: 1px;
+}
+h2 { border-bottom: 2px solid var(--gold); padding-bottom: 6px; }
+
+/* ── Inputs ── */
+.stTextInput > div > div > input,
+.stSelectbox > div > div {
+    background-color: rgba(255,255,255,0.65) !important;
+    border: 1.5px solid var(--gold) !important;
+    border-radius: 4px !important;
+    color: var(--ink) !important;
+    font-family: 'Times New Roman', Times, serif !important;
+}
+.stTextInput > div > div > input:focus {
+    border-color: var(--dancheong) !important;
+    box-shadow: 0 0 0 2px rgba(192,57,43,0.2) !important;
+}
+
+/* ── Buttons ── */
+.stButton > button {
+    background-color: var(--dancheong2) !important;
+    color: var(--hanji) !important;
+    border: 2px solid var(--gold) !important;
+    border-radius: 4px !important;
+    font-family: 'Times New Roman', Times, serif !important;
+    font-size: 15px;
+    letter-spacing: 1px;
+    padding: 8px 22px;
+    transition: background 0.2s, transform 0.1s;
+    box-shadow: 2px 3px 8px rgba(0,0,0,0.18);
+}
+.stButton > button:hover {
+    background-color: var(--dancheong) !important;
+    transform: translateY(-1px);
+}
+.stButton > button:active { transform: translateY(0); }
+
+/* ── Progress bar ── */
+.stProgress > div > div > div { background-color: var(--dancheong) !important; }
+.stProgress > div > div      { background-color: rgba(184,151,58,0.25) !important; }
+
+/* ── Metric cards ── */
+[data-testid="stMetric"] {
+    background: rgba(255,255,255,0.5);
+    border: 1px solid var(--gold);
+    border-radius: 6px;
+    padding: 12px !important;
+}
+[data-testid="stMetricValue"] {
+    color: var(--dancheong2) !important;
+    font-family: 'Black Han Sans', sans-serif !important;
+}
+
+/* ── Alerts ── */
+.stSuccess { border-left: 4px solid var(--celadon) !important; border-radius: 6px; }
+.stError   { border-left: 4px solid var(--dancheong) !important; border-radius: 6px; }
+.stInfo    { border-left: 4px solid var(--gold) !important; border-radius: 6px; }
+
+/* ── Chat bubbles ── */
+.user-bubble {
+    background: linear-gradient(135deg, var(--hanbok-blue), #2c4a6e);
+    color: var(--hanji) !important;
+    padding: 12px 18px;
+    border-radius: 18px 18px 4px 18px;
+    max-width: 68%;
+    margin-left: auto;
+    margin-bottom: 12px;
+    font-family: 'Times New Roman', Times, serif;
+    box-shadow: 2px 3px 10px rgba(0,0,0,0.2);
+}
+.bot-bubble {
+    background: linear-gradient(135deg, #f0e8d5, #e8dcc8);
+    color: var(--ink) !important;
+    padding: 12px 18px;
+    border-radius: 18px 18px 18px 4px;
+    max-width: 68%;
+    margin-right: auto;
+    margin-bottom: 12px;
+    border: 1px solid rgba(184,151,58,0.4);
+    font-family: 'Times New Roman', Times, serif;
+    box-shadow: 2px 3px 10px rgba(0,0,0,0.12);
+}
+
+/* ── Chat scroll container ── */
+.chat-scroll {
+    max-height: 480px;
+    overflow-y: auto;
+    padding: 18px;
+    border: 2px solid var(--gold);
+    border-radius: 10px;
+    background: rgba(255,255,255,0.45);
+    backdrop-filter: blur(4px);
+    box-shadow: inset 0 2px 8px rgba(0,0,0,0.06);
+}
+
+/* ── Flashcard grid ── */
+.flashcards-grid {
+    display: flex;
+    flex-wrap: wrap;
+    gap: 18px;
+    align-items: flex-start;
+    margin-top: 12px;
+}
+.card {
+    display: inline-block;
+    perspective: 1200px;
+    cursor: pointer;
+    -webkit-tap-highlight-color: transparent;
+}
+.card input[type="checkbox"] {
+    position: absolute; opacity: 0; pointer-events: none; height: 0; width: 0;
+}
+.card-inner {
+    width: 240px; height: 160px;
+    position: relative;
+    transform-style: preserve-3d;
+    transition: transform 0.65s cubic-bezier(.2,.8,.2,1);
+    border-radius: 10px;
+    box-shadow: 3px 5px 18px rgba(0,0,0,0.18);
+    user-select: none;
+}
+.card input[type="checkbox"]:checked + .card-inner { transform: rotateY(180deg); }
+.card-face {
+    position: absolute; inset: 0;
+    display: flex; align-items: center; justify-content: center;
+    -webkit-backface-visibility: hidden; backface-visibility: hidden;
+    border-radius: 10px;
+    font-size: 24px; font-weight: 700;
+    padding: 14px; text-align: center; word-break: break-word;
+}
+.card-front {
+    background: linear-gradient(145deg, var(--dancheong2), #6B1010);
+    color: var(--hanji);
+    border: 2px solid var(--gold);
+    font-family: 'Nanum Myeongjo', serif;
+}
+.card-back {
+    background: linear-gradient(145deg, var(--celadon), #4a6b5a);
+    color: #fff;
+    transform: rotateY(180deg);
+    border: 2px solid var(--gold);
+    font-family: 'Times New Roman', Times, serif;
+}
+
+/* ── Wellness flip card ── */
+.wellness-card {
+    display: inline-block; perspective: 1200px;
+    cursor: pointer; width: 100%; margin: 15px 0;
+}
+.wellness-card input[type="checkbox"] {
+    position: absolute; opacity: 0; pointer-events: none; height: 0; width: 0;
+}
+.wellness-card-inner {
+    width: 100%; min-height: 480px; position: relative;
+    transform-style: preserve-3d;
+    transition: transform 0.8s cubic-bezier(.25,.8,.25,1);
+    border-radius: 12px;
+    box-shadow: 0 8px 28px rgba(0,0,0,0.18);
+}
+.wellness-card input[type="checkbox"]:checked + .wellness-card-inner {
+    transform: rotateY(180deg);
+}
+.wellness-card-front, .wellness-card-back {
+    position: absolute; inset: 0;
+    display: flex; flex-direction: column;
+    align-items: center; justify-content: center;
+    -webkit-backface-visibility: hidden; backface-visibility: hidden;
+    border-radius: 12px; padding: 24px;
+    text-align: center; word-break: break-word;
+}
+.wellness-card-front {
+    background: linear-gradient(145deg, var(--hanbok-blue), #2c3e6b);
+    color: var(--hanji);
+    font-family: 'Times New Roman', Times, serif;
+    font-size: 20px;
+    border: 3px solid var(--gold);
+}
+.wellness-card-back {
+    background: linear-gradient(145deg, #1a3a2a, #2e5c42);
+    color: #F5EDD8;
+    transform: rotateY(180deg);
+    font-size: 16px;
+    font-family: 'Times New Roman', Times, serif;
+    border: 3px solid var(--gold);
+    overflow-y: auto;
+    box-shadow: inset 0 0 30px rgba(0,0,0,0.25);
+}
+
+/* ── Story card ── */
+.story-card {
+    background: linear-gradient(145deg, #2a1a0e, #4a2a18);
+    border-radius: 14px;
+    padding: 28px 32px;
+    margin-top: 16px;
+    color: var(--hanji);
+    box-shadow: 0 10px 30px rgba(0,0,0,0.3);
+    border: 2px solid var(--gold);
+    max-width: 820px;
+    line-height: 1.9;
+    font-family: 'Times New Roman', Times, serif;
+}
+.story-card h3 {
+    font-family: 'Black Han Sans', sans-serif !important;
+    color: var(--gold) !important;
+    font-size: 22px; margin-bottom: 14px; letter-spacing: 2px;
+}
+.story-card p { font-size: 16px; margin-bottom: 10px; }
+.story-card .moral { font-style: italic; color: var(--petal); margin-top: 14px; font-size: 15px; }
+
+/* ── Blossom deco ── */
+.blossom-deco { text-align: center; padding: 8px 0 16px; }
+
+/* ── Scrollbar ── */
+::-webkit-scrollbar { width: 6px; }
+::-webkit-scrollbar-track { background: var(--cloud); }
+::-webkit-scrollbar-thumb { background: var(--gold); border-radius: 3px; }
+</style>
+"""
+
+
+# ══════════════════════════════════════════════════
+# SVG GRAPHICS
+# ══════════════════════════════════════════════════
+@functools.lru_cache(maxsize=None)
+def blossom_svg():
+    return """
+    <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 200 60" width="180" height="55">
+      <path d="M10,55 Q60,30 100,28 Q140,26 190,10"
+            stroke="#6B3A2A" stroke-width="2.5" fill="none" stroke-linecap="round"/>
+      <g opacity="0.9">
+        <g transform="translate(38,38)">
+          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#E8B4B8" transform="rotate(0)"/>
+          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#E8B4B8" transform="rotate(72)"/>
+          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#E8B4B8" transform="rotate(144)"/>
+          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#EDCFD1" transform="rotate(216)"/>
+          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#EDCFD1" transform="rotate(288)"/>
+          <circle cx="0" cy="0" r="3" fill="#F5D5A0"/>
+        </g>
+        <g transform="translate(75,30)">
+          <ellipse cx="0" cy="-6" rx="3.5" ry="6" fill="#C97B8A" transform="rotate(0)"/>
+          <ellipse cx="0" cy="-6" rx="3.5" ry="6" fill="#C97B8A" transform="rotate(72)"/>
+          <ellipse cx="0" cy="-6" rx="3.5" ry="6" fill="#E8B4B8" transform="rotate(144)"/>
+          <ellipse cx="0" cy="-6" rx="3.5" ry="6" fill="#E8B4B8" transform="rotate(216)"/>
+          <ellipse cx="0" cy="-6" rx="3.5" ry="6" fill="#C97B8A" transform="rotate(288)"/>
+          <circle cx="0" cy="0" r="2.5" fill="#F5D5A0"/>
+        </g>
+        <g transform="translate(115,27)">
+          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#EDCFD1" transform="rotate(0)"/>
+          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#E8B4B8" transform="rotate(72)"/>
+          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#EDCFD1" transform="rotate(144)"/>
+          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#E8B4B8" transform="rotate(216)"/>
+          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#EDCFD1" transform="rotate(288)"/>
+          <circle cx="0" cy="0" r="3" fill="#F5D5A0"/>
+        </g>
+        <g transform="translate(158,17)">
+          <ellipse cx="0" cy="-5.5" rx="3" ry="5.5" fill="#E8B4B8" transform="rotate(0)"/>
+          <ellipse cx="0" cy="-5.5" rx="3" ry="5.5" fill="#C97B8A" transform="rotate(72)"/>
+          <ellipse cx="0" cy="-5.5" rx="3" ry="5.5" fill="#E8B4B8" transform="rotate(144)"/>
+          <ellipse cx="0" cy="-5.5" rx="3" ry="5.5" fill="#EDCFD1" transform="rotate(216)"/>
+          <ellipse cx="0" cy="-5.5" rx="3" ry="5.5" fill="#C97B8A" transform="rotate(288)"/>
+          <circle cx="0" cy="0" r="2" fill="#F5D5A0"/>
+        </g>
+        <ellipse cx="55" cy="50" rx="3" ry="5" fill="#E8B4B8" transform="rotate(-30,55,50)" opacity="0.7"/>
+        <ellipse cx="95" cy="48" rx="2.5" ry="4.5" fill="#C97B8A" transform="rotate(20,95,48)" opacity="0.6"/>
+        <ellipse cx="140" cy="44" rx="2" ry="4" fill="#EDCFD1" transform="rotate(-15,140,44)" opacity="0.7"/>
+      </g>
+    </svg>
+    """
+
+@functools.lru_cache(maxsize=None)
+def dancheong_divider():
+    return """
+    <div style="margin:16px 0;">
+    <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 600 12" width="100%" height="12">
+      <rect x="0"   width="40" height="12" fill="#C0392B"/>
+      <rect x="40"  width="40" height="12" fill="#B8973A"/>
+      <rect x="80"  width="40" height="12" fill="#6B8E7B"/>
+      <rect x="120" width="40" height="12" fill="#3B5E8C"/>
+      <rect x="160" width="40" height="12" fill="#B8973A"/>
+      <rect x="200" width="40" height="12" fill="#C0392B"/>
+      <rect x="240" width="40" height="12" fill="#B8973A"/>
+      <rect x="280" width="40" height="12" fill="#6B8E7B"/>
+      <rect x="320" width="40" height="12" fill="#3B5E8C"/>
+      <rect x="360" width="40" height="12" fill="#B8973A"/>
+      <rect x="400" width="40" height="12" fill="#C0392B"/>
+      <rect x="440" width="40" height="12" fill="#B8973A"/>
+      <rect x="480" width="40" height="12" fill="#6B8E7B"/>
+      <rect x="520" width="40" height="12" fill="#3B5E8C"/>
+      <rect x="560" width="40" height="12" fill="#B8973A"/>
+      <polygon points="20,0 26,6 20,12 14,6"    fill="rgba(255,255,255,0.25)"/>
+      <polygon points="60,0 66,6 60,12 54,6"    fill="rgba(255,255,255,0.25)"/>
+      <polygon points="100,0 106,6 100,12 94,6"  fill="rgba(255,255,255,0.25)"/>
+      <polygon points="140,0 146,6 140,12 134,6" fill="rgba(255,255,255,0.25)"/>
+      <polygon points="180,0 186,6 180,12 174,6" fill="rgba(255,255,255,0.25)"/>
+      <polygon points="220,0 226,6 220,12 214,6" fill="rgba(255,255,255,0.25)"/>
+      <polygon points="260,0 266,6 260,12 254,6" fill="rgba(255,255,255,0.25)"/>
+      <polygon points="300,0 306,6 300,12 294,6" fill="rgba(255,255,255,0.25)"/>
+      <polygon points="340,0 346,6 340,12 334,6" fill="rgba(255,255,255,0.25)"/>
+      <polygon points="380,0 386,6 380,12 374,6" fill="rgba(255,255,255,0.25)"/>
+      <polygon points="420,0 426,6 420,12 414,6" fill="rgba(255,255,255,0.25)"/>
+      <polygon points="460,0 466,6 460,12 454,6" fill="rgba(255,255,255,0.25)"/>
+      <polygon points="500,0 506,6 500,12 494,6" fill="rgba(255,255,255,0.25)"/>
+      <polygon points="540,0 546,6 540,12 534,6" fill="rgba(255,255,255,0.25)"/>
+      <polygon points="580,0 586,6 580,12 574,6" fill="rgba(255,255,255,0.25)"/>
+    </svg>
+    </div>
+    """
+
+@functools.lru_cache(maxsize=128)
+def page_header(title, subtitle=""):
+    sub_html = (
+        f'<p style="font-family:Times New Roman,Times,serif;color:#6E5E4A;'
+        f'margin-top:-6px;font-size:15px;">{subtitle}</p>'
+    ) if subtitle else ""
+    return (
+        f'<div style="margin-bottom:4px;">'
+        f'<h2 style="font-family:Black Han Sans,sans-serif;color:#8B1A1A;'
+        f'letter-spacing:2px;margin-bottom:4px;">{title}</h2>'
+        f'{sub_html}</div>'
+    ) + dancheong_divider()
+
+
+# ══════════════════════════════════════════════════
+# FONT HELPER
+# ══════════════════════════════════════════════════
+_HANGUL = re.compile(r"[\u3131-\uD79D]")
+
+def fmt(text):
+    """Wrap text in the correct font span."""
+    if _HANGUL.search(str(text)):
+        return f"<span style='font-family:Nanum Myeongjo,serif;'>{text}</span>"
+    return f"<span style='font-family:Times New Roman,Times,serif;'>{text}</span>"
+
+def flashcards_html(cards):
+    """The whole flip-card grid as one HTML block."""
+    items = "".join(
+        f'<label class="card"><input type="checkbox"/><div class="card-inner">'
+        f'<div class="card-face card-front">{fmt(card.get("front", ""))}</div>'
+        f'<div class="card-face card-back">{fmt(card.get("back", ""))}</div>'
+        f'</div></label>'
+        for card in cards
+    )
+    return f'<div class="flashcards-grid">{items}</div>'
+
+def chat_html(history):
+    """The whole chat log, bubbles inside the scroll box, as one HTML block."""
+    if not history:
+        body = (
+            "<p style='text-align:center;color:#9E8C78;font-style:italic;"
+            "padding-top:40px;font-family:Times New Roman,Times,serif;'>"
+            "안녕하세요! · Begin your conversation below 🌸</p>"
+        )
+    else:
+        body = "".join(bubble_html(msg["role"], msg["content"]) for msg in history)
+    return f'<div class="chat-scroll">{body}</div>'
+
+def bubble_html(role, content):
+    css = "user-bubble" if role == "user" else "bot-bubble"
+    lbl = "🧑 You"      if role == "user" else "🤖 Bot"
+    return f"<div class='{css}'><b>{lbl}</b><br>{fmt(content)}</div>"
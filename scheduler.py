@@ -0,0 +1,54 @@
+"""SM-2 spaced-repetition scheduling.
+
+`review` grades a single card. `reschedule` rescales the stored intervals
+of a whole deck over NumPy arrays in one pass.
+Quality grades follow SM-2: 0-5, anything below 3 is a lapse.
+NumPy is imported by `reschedule` only, so single reviews stay cheap to
+import.
+"""
+
+DAY = 86400
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+MAX_INTERVAL = 36500  # days
+
+
+def _ease_after(quality, ease):
+    return ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+
+
+def review(quality, ease=DEFAULT_EASE, reps=0, lapses=0, interval=0):
+    """Apply one review. Returns (ease, reps, lapses, interval_days)."""
+    new_ease = max(MIN_EASE, _ease_after(quality, ease))
+    if quality < 3:
+        return new_ease, 0, lapses + 1, 1
+    if reps == 0:
+        interval = 1
+    elif reps == 1:
+        interval = 6
+    else:
+        interval = min(MAX_INTERVAL, round(interval * ease))
+    return new_ease, reps + 1, lapses, interval
+
+
+def reschedule(last_review, next_review, interval,
+               interval_modifier=1.0, max_interval=MAX_INTERVAL):
+    """Rescale every card's stored interval and move its due date to match.
+
+    The interval `review` last produced is scaled by `interval_modifier`
+    and clamped to [1, max_interval] days; the due date moves by the same
+    number of days, so identity parameters change nothing. Cards that were
+    never reviewed (last_review is NaN) keep their interval and due date.
+    Returns (interval_days, next_review) arrays.
+    """
+    import numpy as np
+
+    last_review = np.asarray(last_review, dtype=np.float64)
+    next_review = np.asarray(next_review, dtype=np.float64)
+    interval    = np.asarray(interval, dtype=np.float64)
+
+    scaled = np.clip(np.rint(interval * interval_modifier), 1, max_interval)
+    unseen = np.isnan(last_review)
+    new_interval = np.where(unseen, interval, scaled)
+    due = np.where(unseen, next_review, next_review + (new_interval - interval) * DAY)
+    return new_interval.astype(np.int64), due
@@ -0,0 +1,63 @@
+"""Coalesce identical in-flight calls so they share one upstream request.
+
+The first caller for a key becomes the leader and does the work; callers
+that arrive while it is running wait for and reuse its result. Nothing is
+remembered once the call finishes — the response cache handles reuse after
+that.
+"""
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done  = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock  = threading.Lock()
+        self.stats  = {"leaders": 0, "coalesced": 0}
+
+    def begin(self, key):
+        """Return (call, is_leader). A leader must call finish(key, call, ...)."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.stats["coalesced"] += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.stats["leaders"] += 1
+            return call, True
+
+    def finish(self, key, call, value=None, error=None):
+        """Publish the leader's outcome. value=None and error=None means the
+        leader gave up (e.g. an abandoned stream); waiters then run their own call."""
+        call.value, call.error = value, error
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.done.set()
+
+    def wait(self, call):
+        """Block until the leader finishes; returns its value or raises its error."""
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def do(self, key, fn):
+        """fn() for the first caller of key; concurrent callers get the same result."""
+        call, leader = self.begin(key)
+        if not leader:
+            value = self.wait(call)
+            return value if value is not None else fn()
+        try:
+            value = fn()
+        except Exception as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, value=value)
+        return value
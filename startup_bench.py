@@ -0,0 +1,157 @@
+"""Startup benchmark: what a fresh worker imports, and how fast it paints.
+
+    python startup_bench.py                  # import report + first paint
+    python startup_bench.py --runs 5 --top 15
+    python startup_bench.py --rerun          # rerun latency per page and per chat send
+
+The import report runs `python -X importtime` over the modules the app
+imports at start-up and lists the slowest, flagging (and exiting non-zero
+on) any heavy dependency pulled in at import time. First paint is measured
+with Streamlit's AppTest on the default (Chatbot) page, in a fresh process
+per run against the mock LLM backend, and compared with runs that import
+the installed heavy dependencies up front the way the app used to.
+
+Rerun latency is what a warm worker spends on each interaction: an idle
+rerun of every page, and a chat message sent and streamed back. AppTest
+reruns the whole script, so these are upper bounds on a fragment rerun.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# What streamlit_app.py imports at the top, besides streamlit itself
+APP_MODULES = ("db", "content", "prefetch", "singleflight", "llm", "chat_context",
+               "render", "jsonparse", "charts")
+HEAVY_MODULES = ("groq", "openai", "numpy", "pandas", "matplotlib", "transformers", "torch")
+EAGER_IMPORTS = ("groq", "transformers", "pandas", "matplotlib.pyplot")
+
+_PAINT = """
+import json, sys, time
+started = time.perf_counter()
+for name in {eager!r}:
+    try:
+        __import__(name)
+    except ImportError:
+        pass
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({script!r}, default_timeout=120)
+app.run()
+print(json.dumps({{"seconds": time.perf_counter() - started,
+                  "errors": [str(e.value) for e in app.exception],
+                  "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+_RERUN = """
+import json, statistics, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({script!r}, default_timeout=120)
+app.run()
+
+def timed(action):
+    started = time.perf_counter()
+    action()
+    return time.perf_counter() - started
+
+def send():
+    app.text_input(key="chat_box").input("안녕하세요")
+    next(b for b in app.button if b.label == "전송").click().run()
+
+results = {{}}
+for page in app.sidebar.radio[0].options:
+    app.sidebar.radio[0].set_value(page).run()
+    results[page] = statistics.median(timed(app.run) for _ in range({runs}))
+app.sidebar.radio[0].set_value(app.sidebar.radio[0].options[0]).run()
+results["chat send"] = statistics.median(timed(send) for _ in range({runs}))
+print(json.dumps({{"seconds": results, "errors": [str(e.value) for e in app.exception]}}))
+"""
+
+
+def _env():
+    env = dict(os.environ, PYTHONPATH=ROOT, LLM_PROVIDER="mock")
+    env.pop("LLM_GENERATE_PROVIDER", None)
+    return env
+
+
+def import_report(modules=APP_MODULES):
+    """Return (total_us, [(cumulative_us, module)], heavy) for importing modules."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+                          cwd=ROOT, env=_env(), capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name[1:]))  # nesting shows as extra indentation
+    top_level = [(us, name) for us, name in rows if not name.startswith(" ")]
+    heavy = sorted({name.split(".")[0] for _, name in top_level} & set(HEAVY_MODULES))
+    return sum(us for us, _ in top_level), sorted(rows, reverse=True), heavy
+
+
+def first_paint(eager=False):
+    """One fresh-process AppTest run of the app: {"seconds", "errors", "heavy"}."""
+    code = _PAINT.format(eager=EAGER_IMPORTS if eager else (),
+                         script=os.path.join(ROOT, "streamlit_app.py"), heavy=HEAVY_MODULES)
+    with tempfile.TemporaryDirectory() as tmp:  # keep the run's databases out of the repo
+        proc = subprocess.run([sys.executable, "-c", code], cwd=tmp, capture_output=True,
+                              text=True, check=True,
+                              env=dict(_env(), MANJOG_SHARD_DIR="", MANJOG_EMBED_DIR=tmp))
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def rerun_latency(runs=5):
+    """Median warm rerun per page plus a chat send: {"seconds": {...}, "errors"}."""
+    code = _RERUN.format(script=os.path.join(ROOT, "streamlit_app.py"), runs=runs)
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = subprocess.run([sys.executable, "-c", code], cwd=tmp, capture_output=True,
+                              text=True, check=True,
+                              env=dict(_env(), MANJOG_SHARD_DIR="", MANJOG_EMBED_DIR=tmp))
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="fresh processes per first-paint variant")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--rerun", action="store_true", help="measure warm rerun latency instead")
+    args = parser.parse_args(argv)
+
+    if args.rerun:
+        result = rerun_latency(max(args.runs, 5))
+        for label, seconds in result["seconds"].items():
+            print(f"{label:>24}: {seconds * 1000:6.1f} ms")
+        for err in result["errors"]:
+            print("error: " + err)
+        return 1 if result["errors"] else 0
+
+    total, rows, heavy = import_report()
+    print(f"App module imports: {total / 1000:.1f} ms")
+    for us, name in rows[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name.strip()}")
+    print("Heavy modules imported: " + (", ".join(heavy) or "none"))
+
+    try:
+        import streamlit.testing.v1  # noqa: F401
+    except ImportError:
+        print("streamlit not installed; skipping first paint")
+        return 1 if heavy else 0
+    print()
+    results = {}
+    for label, eager in (("lazy (current)", False), ("eager imports", True)):
+        runs = [first_paint(eager) for _ in range(args.runs)]
+        results[label] = statistics.median(r["seconds"] for r in runs)
+        errors = sorted({err for r in runs for err in r["errors"]})
+        print(f"{label:>16}: first paint {results[label] * 1000:.0f} ms (median of {args.runs}), "
+              f"heavy modules: {', '.join(runs[0]['heavy']) or 'none'}"
+              + (f", errors: {errors}" if errors else ""))
+    saved = results["eager imports"] - results["lazy (current)"]
+    print(f"{'saved':>16}: {saved * 1000:.0f} ms ({saved / results['eager imports']:.0%})")
+    return 1 if heavy else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
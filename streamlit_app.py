@@ -1,8 +1,28 @@
+import time
+_IMPORTS_STARTED = time.perf_counter()
 import streamlit as st
-import json
-import re
 import os
-from groq import Groq
+import re
+import sys
+import random
+import threading
+import functools
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import db
+import content
+from prefetch import ContentPool
+from singleflight import SingleFlight
+import llm
+from chat_context import build_context
+from render import (GLOBAL_CSS, blossom_svg, dancheong_divider, page_header, fmt,
+                    flashcards_html, chat_html, bubble_html)
+from jsonparse import StreamParser, extract_json_obj
+from charts import render_charts
+# groq, numpy and transformers are imported lazily by the
+# code paths that need them, so a fresh worker paints its first page sooner.
+IMPORT_SECONDS = time.perf_counter() - _IMPORTS_STARTED
 
 # ── Must be FIRST Streamlit call ──────────────────
 st.set_page_config(
@@ -11,601 +31,205 @@ st.set_page_config(
     layout="wide"
 )
 
-# ══════════════════════════════════════════════════
-# GLOBAL CSS  —  Old Korea Aesthetic
-# Fonts: Times New Roman (English) · Nanum Myeongjo (Korean)
-# ══════════════════════════════════════════════════
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Nanum+Myeongjo:wght@400;700;800&family=Black+Han+Sans&display=swap');
-
-/* ── Root palette ── */
-:root {
-    --hanji:        #F5EDD8;
-    --ink:          #1C1208;
-    --dancheong:    #C0392B;
-    --dancheong2:   #8B1A1A;
-    --celadon:      #6B8E7B;
-    --gold:         #B8973A;
-    --cloud:        #EDE0CC;
-    --hanbok-blue:  #3B5E8C;
-    --brush-gray:   #6E5E4A;
-    --petal:        #E8B4B8;
-    --petal-deep:   #C97B8A;
-}
-
-/* ── Base font rules ── */
-html, body, [class*="css"] {
-    font-family: 'Times New Roman', Times, serif !important;
-    color: var(--ink) !important;
-}
-.korean-text, :lang(ko) {
-    font-family: 'Nanum Myeongjo', serif !important;
-}
-
-/* ── App background ── */
-.stApp {
-    background-color: var(--hanji) !important;
-    background-image:
-        radial-gradient(ellipse at 10% 20%, rgba(232,180,184,0.18) 0%, transparent 50%),
-        radial-gradient(ellipse at 90% 80%, rgba(107,142,123,0.12) 0%, transparent 50%),
-        radial-gradient(ellipse at 50% 50%, rgba(184,151,58,0.06) 0%, transparent 70%);
-    background-attachment: fixed;
-}
-
-/* ── Dancheong top bar ── */
-.stApp::before {
-    content: '';
-    display: block;
-    height: 6px;
-    background: repeating-linear-gradient(
-        90deg,
-        var(--dancheong)   0px,  var(--dancheong)   40px,
-        var(--gold)        40px, var(--gold)         80px,
-        var(--celadon)     80px, var(--celadon)      120px,
-        var(--hanbok-blue) 120px,var(--hanbok-blue)  160px,
-        var(--gold)        160px,var(--gold)         200px
-    );
-    position: fixed;
-    top: 0; left: 0; width: 100%; z-index: 9999;
-}
-
-/* ── Sidebar ── */
-[data-testid="stSidebar"] {
-    background-color: var(--dancheong2) !important;
-    background-image: repeating-linear-gradient(
-        0deg, transparent, transparent 38px,
-        rgba(255,255,255,0.04) 38px, rgba(255,255,255,0.04) 40px
-    ) !important;
-    border-right: 3px solid var(--gold) !important;
-}
-[data-testid="stSidebar"] * {
-    color: var(--hanji) !important;
-    font-family: 'Times New Roman', Times, serif !important;
-}
-[data-testid="stSidebar"] h1,
-[data-testid="stSidebar"] h2 {
-    color: var(--gold) !important;
-    font-family: 'Black Han Sans', sans-serif !important;
-    letter-spacing: 2px;
-    text-shadow: 1px 1px 3px rgba(0,0,0,0.4);
-}
+# Global CSS — built once per process in render.py
+st.markdown(GLOBAL_CSS, unsafe_allow_html=True)
 
-/* Sidebar radio */
-.stRadio div[role="radiogroup"] label {
-    display: block;
-    background-color: rgba(245,237,216,0.10) !important;
-    color: var(--hanji) !important;
-    padding: 10px 16px;
-    margin-bottom: 8px;
-    border-radius: 4px;
-    cursor: pointer;
-    border: 1px solid rgba(184,151,58,0.35);
-    font-family: 'Times New Roman', Times, serif !important;
-    font-size: 15px;
-    transition: background 0.2s, border-color 0.2s;
-}
-.stRadio div[role="radiogroup"] label:hover {
-    background-color: rgba(184,151,58,0.25) !important;
-    border-color: var(--gold) !important;
-}
-.stRadio div[role="radiogroup"] label[data-baseweb="radio"]:has(input:checked) {
-    background-color: rgba(184,151,58,0.30) !important;
-    border: 2px solid var(--gold) !important;
-    font-weight: 700;
-}
 
-/* ── Headings ── */
-h1, h2, h3 {
-    font-family: 'Black Han Sans', sans-serif !important;
-    color: var(--dancheong2) !important;
-    letter-spacing: 1px;
-}
-h2 { border-bottom: 2px solid var(--gold); padding-bottom: 6px; }
-
-/* ── Inputs ── */
-.stTextInput > div > div > input,
-.stSelectbox > div > div {
-    background-color: rgba(255,255,255,0.65) !important;
-    border: 1.5px solid var(--gold) !important;
-    border-radius: 4px !important;
-    color: var(--ink) !important;
-    font-family: 'Times New Roman', Times, serif !important;
-}
-.stTextInput > div > div > input:focus {
-    border-color: var(--dancheong) !important;
-    box-shadow: 0 0 0 2px rgba(192,57,43,0.2) !important;
-}
-
-/* ── Buttons ── */
-.stButton > button {
-    background-color: var(--dancheong2) !important;
-    color: var(--hanji) !important;
-    border: 2px solid var(--gold) !important;
-    border-radius: 4px !important;
-    font-family: 'Times New Roman', Times, serif !important;
-    font-size: 15px;
-    letter-spacing: 1px;
-    padding: 8px 22px;
-    transition: background 0.2s, transform 0.1s;
-    box-shadow: 2px 3px 8px rgba(0,0,0,0.18);
-}
-.stButton > button:hover {
-    background-color: var(--dancheong) !important;
-    transform: translateY(-1px);
-}
-.stButton > button:active { transform: translateY(0); }
-
-/* ── Progress bar ── */
-.stProgress > div > div > div { background-color: var(--dancheong) !important; }
-.stProgress > div > div      { background-color: rgba(184,151,58,0.25) !important; }
-
-/* ── Metric cards ── */
-[data-testid="stMetric"] {
-    background: rgba(255,255,255,0.5);
-    border: 1px solid var(--gold);
-    border-radius: 6px;
-    padding: 12px !important;
-}
-[data-testid="stMetricValue"] {
-    color: var(--dancheong2) !important;
-    font-family: 'Black Han Sans', sans-serif !important;
-}
-
-/* ── Alerts ── */
-.stSuccess { border-left: 4px solid var(--celadon) !important; border-radius: 6px; }
-.stError   { border-left: 4px solid var(--dancheong) !important; border-radius: 6px; }
-.stInfo    { border-left: 4px solid var(--gold) !important; border-radius: 6px; }
-
-/* ── Chat bubbles ── */
-.user-bubble {
-    background: linear-gradient(135deg, var(--hanbok-blue), #2c4a6e);
-    color: var(--hanji) !important;
-    padding: 12px 18px;
-    border-radius: 18px 18px 4px 18px;
-    max-width: 68%;
-    margin-left: auto;
-    margin-bottom: 12px;
-    font-family: 'Times New Roman', Times, serif;
-    box-shadow: 2px 3px 10px rgba(0,0,0,0.2);
-}
-.bot-bubble {
-    background: linear-gradient(135deg, #f0e8d5, #e8dcc8);
-    color: var(--ink) !important;
-    padding: 12px 18px;
-    border-radius: 18px 18px 18px 4px;
-    max-width: 68%;
-    margin-right: auto;
-    margin-bottom: 12px;
-    border: 1px solid rgba(184,151,58,0.4);
-    font-family: 'Times New Roman', Times, serif;
-    box-shadow: 2px 3px 10px rgba(0,0,0,0.12);
-}
-
-/* ── Chat scroll container ── */
-.chat-scroll {
-    max-height: 480px;
-    overflow-y: auto;
-    padding: 18px;
-    border: 2px solid var(--gold);
-    border-radius: 10px;
-    background: rgba(255,255,255,0.45);
-    backdrop-filter: blur(4px);
-    box-shadow: inset 0 2px 8px rgba(0,0,0,0.06);
-}
+# ══════════════════════════════════════════════════
+# LLM BACKENDS  —  configured in llm.py, initialised once
+# ══════════════════════════════════════════════════
+def _setting(name):
+    """Environment first, then .streamlit/secrets.toml."""
+    value = os.environ.get(name)
+    if value is None:
+        try:
+            value = st.secrets.get(name)
+        except Exception:  # no secrets file
+            value = None
+    return value
 
-/* ── Flashcard grid ── */
-.flashcards-grid {
-    display: flex;
-    flex-wrap: wrap;
-    gap: 18px;
-    align-items: flex-start;
-    margin-top: 12px;
-}
-.card {
-    display: inline-block;
-    perspective: 1200px;
-    cursor: pointer;
-    -webkit-tap-highlight-color: transparent;
-}
-.card input[type="checkbox"] {
-    position: absolute; opacity: 0; pointer-events: none; height: 0; width: 0;
-}
-.card-inner {
-    width: 240px; height: 160px;
-    position: relative;
-    transform-style: preserve-3d;
-    transition: transform 0.65s cubic-bezier(.2,.8,.2,1);
-    border-radius: 10px;
-    box-shadow: 3px 5px 18px rgba(0,0,0,0.18);
-    user-select: none;
-}
-.card input[type="checkbox"]:checked + .card-inner { transform: rotateY(180deg); }
-.card-face {
-    position: absolute; inset: 0;
-    display: flex; align-items: center; justify-content: center;
-    -webkit-backface-visibility: hidden; backface-visibility: hidden;
-    border-radius: 10px;
-    font-size: 24px; font-weight: 700;
-    padding: 14px; text-align: center; word-break: break-word;
-}
-.card-front {
-    background: linear-gradient(145deg, var(--dancheong2), #6B1010);
-    color: var(--hanji);
-    border: 2px solid var(--gold);
-    font-family: 'Nanum Myeongjo', serif;
-}
-.card-back {
-    background: linear-gradient(145deg, var(--celadon), #4a6b5a);
-    color: #fff;
-    transform: rotateY(180deg);
-    border: 2px solid var(--gold);
-    font-family: 'Times New Roman', Times, serif;
-}
+@st.cache_resource
+def get_backends():
+    """"chat" serves the chatbot; "generate" serves content generation and
+    falls back to the chat backend when LLM_GENERATE_PROVIDER is unset."""
+    chat = llm.backend_from_settings(_setting)
+    return {"chat": chat, "generate": llm.backend_from_settings(_setting, "LLM_GENERATE_") or chat}
 
-/* ── Wellness flip card ── */
-.wellness-card {
-    display: inline-block; perspective: 1200px;
-    cursor: pointer; width: 100%; margin: 15px 0;
-}
-.wellness-card input[type="checkbox"] {
-    position: absolute; opacity: 0; pointer-events: none; height: 0; width: 0;
-}
-.wellness-card-inner {
-    width: 100%; min-height: 480px; position: relative;
-    transform-style: preserve-3d;
-    transition: transform 0.8s cubic-bezier(.25,.8,.25,1);
-    border-radius: 12px;
-    box-shadow: 0 8px 28px rgba(0,0,0,0.18);
-}
-.wellness-card input[type="checkbox"]:checked + .wellness-card-inner {
-    transform: rotateY(180deg);
-}
-.wellness-card-front, .wellness-card-back {
-    position: absolute; inset: 0;
-    display: flex; flex-direction: column;
-    align-items: center; justify-content: center;
-    -webkit-backface-visibility: hidden; backface-visibility: hidden;
-    border-radius: 12px; padding: 24px;
-    text-align: center; word-break: break-word;
-}
-.wellness-card-front {
-    background: linear-gradient(145deg, var(--hanbok-blue), #2c3e6b);
-    color: var(--hanji);
-    font-family: 'Times New Roman', Times, serif;
-    font-size: 20px;
-    border: 3px solid var(--gold);
-}
-.wellness-card-back {
-    background: linear-gradient(145deg, #1a3a2a, #2e5c42);
-    color: #F5EDD8;
-    transform: rotateY(180deg);
-    font-size: 16px;
-    font-family: 'Times New Roman', Times, serif;
-    border: 3px solid var(--gold);
-    overflow-y: auto;
-    box-shadow: inset 0 0 30px rgba(0,0,0,0.25);
-}
+@st.cache_resource
+def get_flights():
+    """Process-wide: identical prompts in flight across sessions share one request."""
+    return SingleFlight()
 
-/* ── Story card ── */
-.story-card {
-    background: linear-gradient(145deg, #2a1a0e, #4a2a18);
-    border-radius: 14px;
-    padding: 28px 32px;
-    margin-top: 16px;
-    color: var(--hanji);
-    box-shadow: 0 10px 30px rgba(0,0,0,0.3);
-    border: 2px solid var(--gold);
-    max-width: 820px;
-    line-height: 1.9;
-    font-family: 'Times New Roman', Times, serif;
-}
-.story-card h3 {
-    font-family: 'Black Han Sans', sans-serif !important;
-    color: var(--gold) !important;
-    font-size: 22px; margin-bottom: 14px; letter-spacing: 2px;
-}
-.story-card p { font-size: 16px; margin-bottom: 10px; }
-.story-card .moral { font-style: italic; color: var(--petal); margin-top: 14px; font-size: 15px; }
 
-/* ── Blossom deco ── */
-.blossom-deco { text-align: center; padding: 8px 0 16px; }
+# ══════════════════════════════════════════════════
+# STORAGE  —  SQLite via db.py
+# ══════════════════════════════════════════════════
+PROGRESS_FILE = "progress.json"  # legacy store, imported into the database once
 
-/* ── Scrollbar ── */
-::-webkit-scrollbar { width: 6px; }
-::-webkit-scrollbar-track { background: var(--cloud); }
-::-webkit-scrollbar-thumb { background: var(--gold); border-radius: 3px; }
-</style>
-""", unsafe_allow_html=True)
+def _preload_embeddings():
+    import embeddings  # numpy/torch stay off the first-paint path
+    embeddings.preload()
 
+@st.cache_resource
+def init_storage():
+    db.init_db()
+    db.import_progress_json(PROGRESS_FILE)
+    if os.environ.get("MANJOG_EMBED_MODEL"):
+        # Download/load the sentence model now, not inside the first card insert
+        threading.Thread(target=_preload_embeddings, name="embed-preload", daemon=True).start()
 
-# ══════════════════════════════════════════════════
-# SVG GRAPHICS
-# ══════════════════════════════════════════════════
-def blossom_svg():
-    return """
-    <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 200 60" width="180" height="55">
-      <path d="M10,55 Q60,30 100,28 Q140,26 190,10"
-            stroke="#6B3A2A" stroke-width="2.5" fill="none" stroke-linecap="round"/>
-      <g opacity="0.9">
-        <g transform="translate(38,38)">
-          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#E8B4B8" transform="rotate(0)"/>
-          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#E8B4B8" transform="rotate(72)"/>
-          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#E8B4B8" transform="rotate(144)"/>
-          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#EDCFD1" transform="rotate(216)"/>
-          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#EDCFD1" transform="rotate(288)"/>
-          <circle cx="0" cy="0" r="3" fill="#F5D5A0"/>
-        </g>
-        <g transform="translate(75,30)">
-          <ellipse cx="0" cy="-6" rx="3.5" ry="6" fill="#C97B8A" transform="rotate(0)"/>
-          <ellipse cx="0" cy="-6" rx="3.5" ry="6" fill="#C97B8A" transform="rotate(72)"/>
-          <ellipse cx="0" cy="-6" rx="3.5" ry="6" fill="#E8B4B8" transform="rotate(144)"/>
-          <ellipse cx="0" cy="-6" rx="3.5" ry="6" fill="#E8B4B8" transform="rotate(216)"/>
-          <ellipse cx="0" cy="-6" rx="3.5" ry="6" fill="#C97B8A" transform="rotate(288)"/>
-          <circle cx="0" cy="0" r="2.5" fill="#F5D5A0"/>
-        </g>
-        <g transform="translate(115,27)">
-          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#EDCFD1" transform="rotate(0)"/>
-          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#E8B4B8" transform="rotate(72)"/>
-          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#EDCFD1" transform="rotate(144)"/>
-          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#E8B4B8" transform="rotate(216)"/>
-          <ellipse cx="0" cy="-7" rx="4" ry="7" fill="#EDCFD1" transform="rotate(288)"/>
-          <circle cx="0" cy="0" r="3" fill="#F5D5A0"/>
-        </g>
-        <g transform="translate(158,17)">
-          <ellipse cx="0" cy="-5.5" rx="3" ry="5.5" fill="#E8B4B8" transform="rotate(0)"/>
-          <ellipse cx="0" cy="-5.5" rx="3" ry="5.5" fill="#C97B8A" transform="rotate(72)"/>
-          <ellipse cx="0" cy="-5.5" rx="3" ry="5.5" fill="#E8B4B8" transform="rotate(144)"/>
-          <ellipse cx="0" cy="-5.5" rx="3" ry="5.5" fill="#EDCFD1" transform="rotate(216)"/>
-          <ellipse cx="0" cy="-5.5" rx="3" ry="5.5" fill="#C97B8A" transform="rotate(288)"/>
-          <circle cx="0" cy="0" r="2" fill="#F5D5A0"/>
-        </g>
-        <ellipse cx="55" cy="50" rx="3" ry="5" fill="#E8B4B8" transform="rotate(-30,55,50)" opacity="0.7"/>
-        <ellipse cx="95" cy="48" rx="2.5" ry="4.5" fill="#C97B8A" transform="rotate(20,95,48)" opacity="0.6"/>
-        <ellipse cx="140" cy="44" rx="2" ry="4" fill="#EDCFD1" transform="rotate(-15,140,44)" opacity="0.7"/>
-      </g>
-    </svg>
-    """
-
-def dancheong_divider():
-    return """
-    <div style="margin:16px 0;">
-    <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 600 12" width="100%" height="12">
-      <rect x="0"   width="40" height="12" fill="#C0392B"/>
-      <rect x="40"  width="40" height="12" fill="#B8973A"/>
-      <rect x="80"  width="40" height="12" fill="#6B8E7B"/>
-      <rect x="120" width="40" height="12" fill="#3B5E8C"/>
-      <rect x="160" width="40" height="12" fill="#B8973A"/>
-      <rect x="200" width="40" height="12" fill="#C0392B"/>
-      <rect x="240" width="40" height="12" fill="#B8973A"/>
-      <rect x="280" width="40" height="12" fill="#6B8E7B"/>
-      <rect x="320" width="40" height="12" fill="#3B5E8C"/>
-      <rect x="360" width="40" height="12" fill="#B8973A"/>
-      <rect x="400" width="40" height="12" fill="#C0392B"/>
-      <rect x="440" width="40" height="12" fill="#B8973A"/>
-      <rect x="480" width="40" height="12" fill="#6B8E7B"/>
-      <rect x="520" width="40" height="12" fill="#3B5E8C"/>
-      <rect x="560" width="40" height="12" fill="#B8973A"/>
-      <polygon points="20,0 26,6 20,12 14,6"    fill="rgba(255,255,255,0.25)"/>
-      <polygon points="60,0 66,6 60,12 54,6"    fill="rgba(255,255,255,0.25)"/>
-      <polygon points="100,0 106,6 100,12 94,6"  fill="rgba(255,255,255,0.25)"/>
-      <polygon points="140,0 146,6 140,12 134,6" fill="rgba(255,255,255,0.25)"/>
-      <polygon points="180,0 186,6 180,12 174,6" fill="rgba(255,255,255,0.25)"/>
-      <polygon points="220,0 226,6 220,12 214,6" fill="rgba(255,255,255,0.25)"/>
-      <polygon points="260,0 266,6 260,12 254,6" fill="rgba(255,255,255,0.25)"/>
-      <polygon points="300,0 306,6 300,12 294,6" fill="rgba(255,255,255,0.25)"/>
-      <polygon points="340,0 346,6 340,12 334,6" fill="rgba(255,255,255,0.25)"/>
-      <polygon points="380,0 386,6 380,12 374,6" fill="rgba(255,255,255,0.25)"/>
-      <polygon points="420,0 426,6 420,12 414,6" fill="rgba(255,255,255,0.25)"/>
-      <polygon points="460,0 466,6 460,12 454,6" fill="rgba(255,255,255,0.25)"/>
-      <polygon points="500,0 506,6 500,12 494,6" fill="rgba(255,255,255,0.25)"/>
-      <polygon points="540,0 546,6 540,12 534,6" fill="rgba(255,255,255,0.25)"/>
-      <polygon points="580,0 586,6 580,12 574,6" fill="rgba(255,255,255,0.25)"/>
-    </svg>
-    </div>
-    """
-
-def page_header(title, subtitle=""):
-    sub_html = (
-        f'<p style="font-family:Times New Roman,Times,serif;color:#6E5E4A;'
-        f'margin-top:-6px;font-size:15px;">{subtitle}</p>'
-    ) if subtitle else ""
-    return (
-        f'<div style="margin-bottom:4px;">'
-        f'<h2 style="font-family:Black Han Sans,sans-serif;color:#8B1A1A;'
-        f'letter-spacing:2px;margin-bottom:4px;">{title}</h2>'
-        f'{sub_html}</div>'
-    ) + dancheong_divider()
+init_storage()
 
+@st.cache_data(max_entries=1000)
+def dashboard_stats(user, version, minute):
+    """Dashboard snapshot, recomputed only when the user's data version changes
+    (bumped by db triggers on write) or, for the due count, once a minute."""
+    return db.get_stats_snapshot(user)
 
-# ══════════════════════════════════════════════════
-# FONT HELPER
-# ══════════════════════════════════════════════════
-def fmt(text):
-    """Wrap text in the correct font span."""
-    if re.search(r"[\u3131-\uD79D]", str(text)):
-        return f"<span style='font-family:Nanum Myeongjo,serif;'>{text}</span>"
-    return f"<span style='font-family:Times New Roman,Times,serif;'>{text}</span>"
 
+# Precomputed topic packs written by precompute.py; live generation covers misses
+BUNDLE_FILE = os.environ.get("MANJOG_BUNDLE", "content_bundle.db")
 
-# ══════════════════════════════════════════════════
-# GROQ CLIENT  —  cached, initialised once
-# ══════════════════════════════════════════════════
 @st.cache_resource
-def get_client():
-    return Groq(api_key=st.secrets["GROQ_API_KEY"])
+def get_bundle(mtime):
+    """(meta, packs) of the bundle; keyed by mtime so a rebuilt file is picked up."""
+    return content.load_bundle(BUNDLE_FILE)
 
-client = get_client()
-MODEL  = "llama-3.1-8b-instant"
+def bundled(topic, part):
+    """A copy of the precomputed `part` of topic's pack, or None."""
+    try:
+        mtime = os.path.getmtime(BUNDLE_FILE)
+    except OSError:
+        return None
+    _, packs = get_bundle(mtime)
+    pack     = packs.get(content.topic_key(topic))
+    return copy.deepcopy(pack[part]) if pack else None
 
 
 # ══════════════════════════════════════════════════
-# PROGRESS HELPERS
+# DASHBOARD CHARTS  —  rendered once per data version
 # ══════════════════════════════════════════════════
-PROGRESS_FILE = "progress.json"
-
-def load_progress():
-    if os.path.exists(PROGRESS_FILE):
-        try:
-            with open(PROGRESS_FILE, "r") as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return {"xp": 0, "quizzes_taken": 0, "correct_answers": 0, "assignments_done": 0}
-
-def save_progress(p):
-    with open(PROGRESS_FILE, "w") as f:
-        json.dump(p, f)
+@st.cache_data(max_entries=200)
+def dashboard_charts(user, version):
+    """SVG charts for the Dashboard. Keyed on the db stats version, so they
+    are only re-rendered after the user's data actually changes."""
+    _, _, interval_data = db.get_flashcard_stats(user)
+    return render_charts(db.get_xp_events(user), db.get_quiz_history(user), interval_data)
 
 
 # ══════════════════════════════════════════════════
 # AI HELPERS
 # ══════════════════════════════════════════════════
-def groq_chat(messages, system=None, max_tokens=1500):
-    msgs = []
-    if system:
-        msgs.append({"role": "system", "content": system})
-    msgs.extend(messages)
-    resp = client.chat.completions.create(model=MODEL, messages=msgs, max_tokens=max_tokens)
-    return resp.choices[0].message.content.strip()
-
-def clean_raw(raw):
-    """Strip markdown fences, leading/trailing backticks."""
-    raw = re.sub(r"```[a-zA-Z]*", "", raw)
-    return raw.strip().strip("`").strip()
-
-def extract_json_list(raw):
-    raw = clean_raw(raw)
-    # Try direct parse first
-    try:
-        return json.loads(raw)
-    except Exception:
-        pass
-    # Try extracting array
-    m = re.search(r"\[.*\]", raw, re.DOTALL)
-    if m:
-        try:
-            return json.loads(m.group(0))
-        except Exception:
-            # Try encoding fix for escaped unicode
-            try:
-                return json.loads(m.group(0).encode().decode("unicode_escape").encode("latin-1").decode("utf-8"))
-            except Exception:
-                pass
-    return None
-
-def extract_json_obj(raw):
-    raw = clean_raw(raw)
-    # Try direct parse first
-    try:
-        return json.loads(raw)
-    except Exception:
-        pass
-    # Try extracting object — use a greedy match from first { to last }
-    start = raw.find("{")
-    end   = raw.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        candidate = raw[start:end+1]
-        try:
-            return json.loads(candidate)
-        except Exception:
-            # Attempt to fix common LLM issues: unescaped newlines inside strings
-            try:
-                fixed = re.sub(r'(?<!\\)\n', ' ', candidate)
-                return json.loads(fixed)
-            except Exception:
-                pass
-    return None
-
-def generate_flashcards(topic):
+def groq_chat(messages, system=None, max_tokens=1500, use_cache=True, route="generate", store=True,
+              background=False):
+    """Chat completion on the `route` backend through the SQLite response
+    cache (see llm.chat for use_cache/store). background=True (prefetching)
+    yields to interactive calls in the rate limiter."""
+    return llm.chat(get_backends()[route], messages, system, max_tokens, use_cache=use_cache,
+                    store=store, background=background, flights=get_flights())
+
+def groq_chat_stream(messages, system=None, max_tokens=1500, use_cache=True, route="generate", store=True):
+    """Like groq_chat but yields the reply in deltas as they arrive.
+    Time to first token is recorded in st.session_state.last_ttft."""
+    start  = time.perf_counter()
+    chunks = llm.chat_stream(get_backends()[route], messages, system, max_tokens,
+                             use_cache=use_cache, store=store, flights=get_flights())
+    for i, delta in enumerate(chunks):
+        if i == 0:
+            st.session_state.last_ttft = time.perf_counter() - start
+        yield delta
+
+def stream_into(placeholder, chunks, render):
+    """Render a growing reply into an st.empty() placeholder; returns the full text."""
+    text = ""
+    for delta in chunks:
+        text += delta
+        placeholder.markdown(render(text), unsafe_allow_html=True)
+    return text.strip()
+
+def ttft_caption():
+    if st.session_state.get("last_ttft") is not None:
+        st.caption(f"⏱ First token in {st.session_state.last_ttft * 1000:.0f} ms")
+
+CHAT_TOKEN_BUDGET = 2000
+
+def summarize_turns(summary, turns):
+    """Fold older chat turns into the rolling conversation summary."""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in turns)
     prompt = (
-        f'Create 5 Korean flashcards about "{topic}". '
-        f'Each side max 5 words. Front = Korean, Back = English. '
-        f'Output ONLY a JSON array: [{{"front":"학교","back":"School"}}]'
+        f"Summary so far:\n{summary or '(none)'}\n\n"
+        f"Newer turns:\n{transcript}\n\n"
+        f"Rewrite the summary to cover everything above in under 120 words. "
+        f"Keep Korean words, names and the learner's goals."
     )
+    return groq_chat([{"role": "user", "content": prompt}],
+                     system="You summarise conversations concisely.", max_tokens=200,
+                     use_cache=False, store=False)
+
+def generate_flashcards(topic, placeholder=None):
+    """Generate cards; with a placeholder, each card is shown as soon as it is parsed."""
+    cards = bundled(topic, "flashcards")
+    if cards:
+        return cards
+    messages = content.flashcard_messages(topic)
+    system   = content.FLASHCARD_SYSTEM
     try:
-        raw = groq_chat([{"role": "user", "content": prompt}],
-                        system="Output only a valid JSON array, no other text.")
-        data = extract_json_list(raw)
+        if placeholder is None:
+            data = content.parse_flashcards(groq_chat(messages, system=system))
+        else:
+            parser, data = StreamParser(), []
+            for delta in groq_chat_stream(messages, system=system):
+                new_cards = parser.feed(delta)
+                if new_cards:
+                    data.extend(c for c in new_cards if content.valid_flashcard(c))
+                    placeholder.markdown(flashcards_html(data), unsafe_allow_html=True)
         if data:
             return data
     except Exception as e:
         st.error(f"⚠️ Flashcard error: {e}")
-    return [{"front": "학교", "back": "School"}]
+    return copy.deepcopy(content.FALLBACK_FLASHCARDS)
 
 def generate_quiz(topic_prompt):
-    prompt = (
-        f'{topic_prompt} '
-        f'Create exactly 10 multiple-choice questions. '
-        f'CRITICAL RULE: The "answer" field MUST be copied EXACTLY (same spelling, same capitalisation, '
-        f'same punctuation) from one of the 4 options in the "options" array. '
-        f'Output ONLY a JSON array, no markdown, no extra text: '
-        f'[{{"question":"...","options":["Option A","Option B","Option C","Option D"],"answer":"Option A"}}]'
-    )
     try:
-        raw = groq_chat([{"role": "user", "content": prompt}],
-                        system=(
-                            "You are a JSON-only quiz generator. "
-                            "Output only a valid JSON array. "
-                            "The answer field must be an exact copy of one of the options strings."
-                        ))
-        data = extract_json_list(raw)
+        data = content.parse_quiz(groq_chat(content.quiz_messages(topic_prompt),
+                                            system=content.QUIZ_SYSTEM))
         if data:
-            # Normalise: ensure answer matches an option exactly (case-insensitive fallback)
-            for q in data:
-                ans = q.get("answer", "")
-                opts = q.get("options", [])
-                if ans not in opts:
-                    # Try to find the closest matching option
-                    for opt in opts:
-                        if opt.strip().lower() == ans.strip().lower():
-                            q["answer"] = opt  # replace with exact option text
-                            break
             return data
     except Exception as e:
         st.error(f"⚠️ Quiz error: {e}")
-    return [{"question": "What does '학교' mean?",
-             "options": ["School", "Book", "Friend", "Teacher"],
-             "answer": "School"}]
+    return copy.deepcopy(content.FALLBACK_QUIZ)
+
+def generate_vocab_quiz(topic):
+    return bundled(topic, "quizzes") or generate_quiz(content.vocab_quiz_prompt(topic))
 
 def generate_assignment(topic):
-    prompt = f"Create 2 practical Korean learning assignments about '{topic}'."
+    assignment = bundled(topic, "assignments")
+    if assignment:
+        return assignment
     try:
-        return groq_chat([{"role": "user", "content": prompt}])
+        return groq_chat(content.assignment_messages(topic))
     except Exception as e:
         st.error(f"⚠️ Assignment error: {e}")
-    return "Write 5 sentences using the word '학교'."
+    return content.FALLBACK_ASSIGNMENT
 
-def generate_wellness(feeling):
+# Feelings the wellness pool keeps a ready message for
+COMMON_FEELINGS = ["tired", "stressed", "sad", "anxious", "lonely", "overwhelmed", "happy", "excited"]
+
+def fetch_wellness(feeling, use_cache=True, background=False):
+    """Wellness message or None; raises on API errors (safe off the script thread)."""
     prompt = (
         f"Motivational message (~35 words) for someone feeling '{feeling}'. "
         f"Exactly 3 emojis. Include Korean quote + English translation. "
         f'Output ONLY JSON: {{"motivation":"...","korean_quote":"...","english_translation":"..."}}'
     )
+    raw = groq_chat([{"role": "user", "content": prompt}],
+                    system="Output only valid JSON, no other text.",
+                    use_cache=use_cache, background=background)
+    return extract_json_obj(raw)
+
+def generate_wellness(feeling):
     try:
-        raw = groq_chat([{"role": "user", "content": prompt}],
-                        system="Output only valid JSON, no other text.")
-        data = extract_json_obj(raw)
+        data = fetch_wellness(feeling)
         if data:
             return data
     except Exception as e:
@@ -616,6 +240,26 @@ def generate_wellness(feeling):
         "english_translation": "A journey of a thousand miles begins with a single step."
     }
 
+def generate_topic_pack(topic):
+    """Generate flashcards, a vocabulary quiz and assignments for one topic
+    concurrently, so the whole pack takes about as long as the slowest call."""
+    ctx = get_script_run_ctx()
+
+    def run(fn, arg):
+        # Let st.error() inside the generators reach this session
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(arg)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        flashcards  = pool.submit(run, generate_flashcards, topic)
+        quizzes     = pool.submit(run, generate_vocab_quiz, topic)
+        assignments = pool.submit(run, generate_assignment, topic)
+        return {
+            "flashcards":  flashcards.result(),
+            "quizzes":     quizzes.result(),
+            "assignments": assignments.result(),
+        }
+
 # Fallback stories so the section never shows empty
 _FALLBACK_STORIES = [
     {
@@ -644,20 +288,26 @@ _FALLBACK_STORIES = [
     }
 ]
 
-def generate_story():
-    import random
-    # Pick a random person to avoid always getting Sejong
-    subjects = [
-        ("유관순", "Yu Gwan-sun", "a young female independence activist during Japanese occupation"),
-        ("안창호", "Ahn Chang-ho", "an educator and independence movement leader"),
-        ("김구", "Kim Gu", "a prominent independence activist and politician"),
-        ("신사임당", "Shin Saimdang", "a renowned artist, poet and scholar of the Joseon era"),
-        ("장영실", "Jang Yeong-sil", "a low-born inventor who rose to greatness under King Sejong"),
-        ("허준", "Heo Jun", "a royal physician who wrote the Dongui Bogam medical encyclopedia"),
-    ]
-    name_ko, name_en, desc = random.choice(subjects)
+# People the story generator picks from
+STORY_SUBJECTS = [
+    ("유관순", "Yu Gwan-sun", "a young female independence activist during Japanese occupation"),
+    ("안창호", "Ahn Chang-ho", "an educator and independence movement leader"),
+    ("김구", "Kim Gu", "a prominent independence activist and politician"),
+    ("신사임당", "Shin Saimdang", "a renowned artist, poet and scholar of the Joseon era"),
+    ("장영실", "Jang Yeong-sil", "a low-born inventor who rose to greatness under King Sejong"),
+    ("허준", "Heo Jun", "a royal physician who wrote the Dongui Bogam medical encyclopedia"),
+]
 
-    prompt = (
+STORY_SYSTEM = (
+    "You are a bilingual Korean storyteller. "
+    "Follow the format exactly. "
+    "Write Korean as real Korean characters. "
+    "Do not use JSON. Do not add extra commentary."
+)
+
+def story_prompt(subject):
+    name_ko, name_en, desc = subject
+    return (
         f"Write an inspiring story about the Korean historical figure {name_en} ({name_ko}), "
         f"who was {desc}. "
         f"Include their struggles, key turning point, and greatest achievement. "
@@ -670,33 +320,47 @@ def generate_story():
         f"MORAL_KOREAN: <one sentence moral in Korean>\n"
         f"MORAL_ENGLISH: <one sentence moral in English>"
     )
+
+def parse_story(raw):
+    """Parse the plain-text labelled format — much more reliable than JSON."""
+    def extract_field(label, text):
+        pattern = rf"{label}:\s*(.+?)(?=\n[A-Z_]+:|$)"
+        m = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
+        return m.group(1).strip() if m else ""
+
+    result = {
+        "name_korean":   extract_field("NAME_KOREAN",   raw),
+        "name_english":  extract_field("NAME_ENGLISH",  raw),
+        "korean_story":  extract_field("KOREAN_STORY",  raw),
+        "english_story": extract_field("ENGLISH_STORY", raw),
+        "moral_korean":  extract_field("MORAL_KOREAN",  raw),
+        "moral_english": extract_field("MORAL_ENGLISH", raw),
+    }
+    # If we got at least english_story, it worked
+    return result if result["english_story"] else None
+
+def fetch_story(subject, use_cache=True, background=False):
+    """Story or None; raises on API errors (safe off the script thread)."""
+    raw = groq_chat([{"role": "user", "content": story_prompt(subject)}],
+                    system=STORY_SYSTEM, max_tokens=800, use_cache=use_cache,
+                    background=background)
+    return parse_story(raw)
+
+def generate_story(use_cache=True, placeholder=None):
+    """Generate a story; with a placeholder, the text is streamed into it as it arrives."""
+    # Pick a random person to avoid always getting Sejong
+    subject = random.choice(STORY_SUBJECTS)
     try:
-        raw = groq_chat(
-            [{"role": "user", "content": prompt}],
-            system=(
-                "You are a bilingual Korean storyteller. "
-                "Follow the format exactly. "
-                "Write Korean as real Korean characters. "
-                "Do not use JSON. Do not add extra commentary."
-            ),
-            max_tokens=800
-        )
-        # Parse the plain-text labelled format — much more reliable than JSON
-        def extract_field(label, text):
-            pattern = rf"{label}:\s*(.+?)(?=\n[A-Z_]+:|$)"
-            m = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-            return m.group(1).strip() if m else ""
-
-        result = {
-            "name_korean":   extract_field("NAME_KOREAN",   raw),
-            "name_english":  extract_field("NAME_ENGLISH",  raw),
-            "korean_story":  extract_field("KOREAN_STORY",  raw),
-            "english_story": extract_field("ENGLISH_STORY", raw),
-            "moral_korean":  extract_field("MORAL_KOREAN",  raw),
-            "moral_english": extract_field("MORAL_ENGLISH", raw),
-        }
-        # If we got at least english_story, it worked
-        if result["english_story"]:
+        chunks = groq_chat_stream([{"role": "user", "content": story_prompt(subject)}],
+                                  system=STORY_SYSTEM, max_tokens=800, use_cache=use_cache)
+        if placeholder is None:
+            raw = "".join(chunks).strip()
+        else:
+            raw = stream_into(placeholder, chunks, lambda t: (
+                f"<div class='story-card'><p>{fmt(t).replace(chr(10), '<br>')}</p></div>"
+            ))
+        result = parse_story(raw)
+        if result:
             return result
     except Exception as e:
         st.error(f"⚠️ Story generation error: {e}")
@@ -705,11 +369,36 @@ def generate_story():
     return random.choice(_FALLBACK_STORIES)
 
 
+# ══════════════════════════════════════════════════
+# PREFETCH POOLS  —  shared by every session, refilled in the background
+# ══════════════════════════════════════════════════
+# Filled on demand at background priority. The story page's first visit
+# has no live fallback, so that pool is warmed with one story per subject.
+@st.cache_resource
+def get_story_pool():
+    pool = ContentPool({subject[1]: functools.partial(fetch_story, subject, use_cache=False,
+                                                      background=True)
+                        for subject in STORY_SUBJECTS}, size=2)
+    pool.fill(1)
+    return pool
+
+@st.cache_resource
+def get_wellness_pool():
+    return ContentPool({feeling: functools.partial(fetch_wellness, feeling, use_cache=False,
+                                                   background=True)
+                        for feeling in COMMON_FEELINGS}, size=2)
+
+story_pool    = get_story_pool()
+wellness_pool = get_wellness_pool()
+
+
 # ══════════════════════════════════════════════════
 # SESSION STATE
 # ══════════════════════════════════════════════════
 _defaults = {
     "chat_history":     [],
+    "chat_summary":     "",
+    "chat_summarized":  0,
     "flashcards":       [],
     "flashcards_topic": "",
     "quizzes":          [],
@@ -717,17 +406,20 @@ _defaults = {
     "answers":          {},
     "assignments":      "",
     "assignment_topic": "",
+    "search_query":     "",
+    "search_before":    None,
 }
 for k, v in _defaults.items():
     if k not in st.session_state:
         st.session_state[k] = v
-if "progress" not in st.session_state:
-    st.session_state.progress = load_progress()
 
 
 # ══════════════════════════════════════════════════
 # SIDEBAR
 # ══════════════════════════════════════════════════
+SEARCH_PAGE_SIZE = 8
+SEARCH_ICONS     = {"card": "📖", "assignment": "✍️", "chat": "💬"}
+
 with st.sidebar:
     st.markdown(
         f'<div style="text-align:center;padding:12px 0 10px;">{blossom_svg()}</div>',
@@ -747,6 +439,9 @@ with st.sidebar:
         "margin:10px 16px 14px;'></div>",
         unsafe_allow_html=True
     )
+    user = st.text_input("🧑 Learner", value=db.DEFAULT_USER, key="user_id",
+                         help="Progress, quizzes and streaks are kept per learner"
+                         ).strip() or db.DEFAULT_USER
     mode = st.radio("", [
         "🤖 Chatbot",
         "📖 Flashcards",
@@ -757,7 +452,43 @@ with st.sidebar:
         "📊 Dashboard",
     ], label_visibility="collapsed")
 
-    xp    = st.session_state.progress["xp"]
+    st.markdown("---")
+    pack_topic = st.text_input("📦 Topic pack", placeholder="e.g. food, travel…",
+                               help="Prepare flashcards, a quiz and assignments in one go")
+    if st.button("Prepare all 🌸") and pack_topic:
+        with st.spinner("Preparing flashcards, quiz & assignments…"):
+            started = time.perf_counter()
+            pack    = generate_topic_pack(pack_topic)
+            st.session_state.flashcards       = pack["flashcards"]
+            st.session_state.flashcards_topic = pack_topic
+            st.session_state.quizzes          = pack["quizzes"]
+            st.session_state.quiz_topic       = pack_topic
+            st.session_state.answers          = {}
+            st.session_state.assignments      = pack["assignments"]
+            st.session_state.assignment_topic = pack_topic
+        st.caption(f"✨ Ready in {time.perf_counter() - started:.1f}s")
+
+    st.markdown("---")
+    search_query = st.text_input("🔎 Search", placeholder="cards, assignments, chats…",
+                                 help="Search everything you've studied")
+    if search_query:
+        if search_query != st.session_state.search_query:
+            st.session_state.search_query  = search_query
+            st.session_state.search_before = None
+        results = db.search(search_query, limit=SEARCH_PAGE_SIZE,
+                            before=st.session_state.search_before, user_id=user)
+        for r in results:
+            st.caption(f"{SEARCH_ICONS[r['kind']]} {r['text'][:120]}")
+        if not results:
+            st.caption("No matches")
+        if len(results) == SEARCH_PAGE_SIZE and st.button("Older results →"):
+            st.session_state.search_before = results[-1]["cursor"]
+            st.rerun()
+        if st.session_state.search_before is not None and st.button("↺ Newest"):
+            st.session_state.search_before = None
+            st.rerun()
+
+    xp    = db.get_progress(user)["xp"]
     level = xp // 100
     st.markdown("---")
     st.markdown(
@@ -775,13 +506,12 @@ with st.sidebar:
 
 
 # ══════════════════════════════════════════════════
-# MODE: CHATBOT
+# PAGE FRAGMENTS  —  rerun on their own, leaving the sidebar and page chrome alone
 # ══════════════════════════════════════════════════
-if mode == "🤖 Chatbot":
-    st.markdown(page_header("🤖 Chatbot",
-                            "Ask me anything about Korean language & culture"),
-                unsafe_allow_html=True)
+fragment = getattr(st, "fragment", None) or st.experimental_fragment
 
+@fragment
+def chat_panel():
     col1, col2 = st.columns([8, 1])
     with col1:
         user_input = st.text_input("Message", key="chat_box",
@@ -792,45 +522,47 @@ if mode == "🤖 Chatbot":
 
     if send and user_input:
         st.session_state.chat_history.append({"role": "user", "content": user_input})
+        db.save_chat_turn("user", user_input, user)
         try:
-            reply = groq_chat(st.session_state.chat_history)
+            context, st.session_state.chat_summary, st.session_state.chat_summarized = build_context(
+                st.session_state.chat_history,
+                st.session_state.chat_summary,
+                st.session_state.chat_summarized,
+                budget=CHAT_TOKEN_BUDGET,
+                summarize=summarize_turns,
+            )
+            bubble = st.empty()
+            reply  = stream_into(
+                bubble,
+                groq_chat_stream(context, use_cache=False, route="chat", store=False),
+                lambda t: bubble_html("assistant", t)
+            )
+            bubble.empty()  # the reply is drawn with the rest of the log below
             st.session_state.chat_history.append({"role": "assistant", "content": reply})
+            db.save_chat_turn("assistant", reply, user)
         except Exception as e:
             st.error(f"⚠️ Chat error: {e}")
-        st.rerun()
-
-    st.markdown('<div class="chat-scroll">', unsafe_allow_html=True)
-    if not st.session_state.chat_history:
-        st.markdown(
-            "<p style='text-align:center;color:#9E8C78;font-style:italic;"
-            "padding-top:40px;font-family:Times New Roman,Times,serif;'>"
-            "안녕하세요! · Begin your conversation below 🌸</p>",
-            unsafe_allow_html=True
-        )
-    for msg in st.session_state.chat_history:
-        css  = "user-bubble" if msg["role"] == "user" else "bot-bubble"
-        lbl  = "🧑 You"      if msg["role"] == "user" else "🤖 Bot"
-        st.markdown(
-            f"<div class='{css}'><b>{lbl}</b><br>{fmt(msg['content'])}</div>",
-            unsafe_allow_html=True
-        )
-    st.markdown('</div>', unsafe_allow_html=True)
 
+    st.markdown(chat_html(st.session_state.chat_history), unsafe_allow_html=True)
+    ttft_caption()
 
-# ══════════════════════════════════════════════════
-# MODE: FLASHCARDS
-# ══════════════════════════════════════════════════
-elif mode == "📖 Flashcards":
-    st.markdown(page_header("📖 Flashcards",
-                            "Click a card to flip and reveal the translation"),
-                unsafe_allow_html=True)
-
+@fragment
+def flashcards_panel():
     topic = st.text_input("Topic", placeholder="e.g. animals, food, K-drama phrases…",
                           label_visibility="collapsed")
     if st.button("Generate Flashcards 🌸") and topic:
+        card_box = st.empty()
         with st.spinner("Generating cards…"):
-            st.session_state.flashcards       = generate_flashcards(topic)
+            st.session_state.flashcards       = generate_flashcards(topic, placeholder=card_box)
             st.session_state.flashcards_topic = topic
+        card_box.empty()
+        cards = [{"korean": c.get("front", ""), "english": c.get("back", ""), "example": ""}
+                 for c in st.session_state.flashcards]
+        if cards:
+            added   = db.add_flashcards(topic, cards, user_id=user)
+            skipped = len(cards) - added
+            st.caption(f"🗂 {added} new cards saved to your deck"
+                       + (f" · {skipped} near-duplicates skipped" if skipped else ""))
 
     if st.session_state.flashcards:
         st.markdown(
@@ -839,19 +571,29 @@ elif mode == "📖 Flashcards":
             f"Cards for: <b>{st.session_state.flashcards_topic}</b> — click to flip</p>",
             unsafe_allow_html=True
         )
-        st.markdown('<div class="flashcards-grid">', unsafe_allow_html=True)
-        for card in st.session_state.flashcards:
-            front = fmt(card.get("front", ""))
-            back  = fmt(card.get("back",  ""))
-            st.markdown(f"""
-            <label class="card">
-                <input type="checkbox"/>
-                <div class="card-inner">
-                    <div class="card-face card-front">{front}</div>
-                    <div class="card-face card-back">{back}</div>
-                </div>
-            </label>""", unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        st.markdown(flashcards_html(st.session_state.flashcards), unsafe_allow_html=True)
+
+
+# ══════════════════════════════════════════════════
+# MODE: CHATBOT
+# ══════════════════════════════════════════════════
+if mode == "🤖 Chatbot":
+    st.markdown(page_header("🤖 Chatbot",
+                            "Ask me anything about Korean language & culture"),
+                unsafe_allow_html=True)
+
+    chat_panel()
+
+
+# ══════════════════════════════════════════════════
+# MODE: FLASHCARDS
+# ══════════════════════════════════════════════════
+elif mode == "📖 Flashcards":
+    st.markdown(page_header("📖 Flashcards",
+                            "Click a card to flip and reveal the translation"),
+                unsafe_allow_html=True)
+
+    flashcards_panel()
 
 
 # ══════════════════════════════════════════════════
@@ -869,11 +611,9 @@ elif mode == "📝 Quizzes":
                                     placeholder="e.g. food, family, travel")
         if st.button("Generate Vocabulary Quiz 🌸") and vocab_topic:
             with st.spinner("Generating quiz…"):
-                st.session_state.quizzes = generate_quiz(
-                    f"Korean vocabulary quiz on '{vocab_topic}'. "
-                    f"Give English words, Korean-related answer options. All questions in English."
-                )
-                st.session_state.answers = {}
+                st.session_state.quizzes = generate_vocab_quiz(vocab_topic)
+                st.session_state.answers    = {}
+                st.session_state.quiz_topic = vocab_topic
 
     elif quiz_type == "Grammar":
         grammar_topic = st.selectbox("Grammar focus:", [
@@ -889,7 +629,8 @@ elif mode == "📝 Quizzes":
                 st.session_state.quizzes = generate_quiz(
                     f"Korean grammar quiz about '{grammar_topic}'. All questions in English."
                 )
-                st.session_state.answers = {}
+                st.session_state.answers    = {}
+                st.session_state.quiz_topic = grammar_topic
 
     elif quiz_type == "General":
         general_topic = st.text_input("General topic:",
@@ -900,49 +641,37 @@ elif mode == "📝 Quizzes":
                     f"General knowledge quiz about '{general_topic}' "
                     f"related to Korean culture. All in English."
                 )
-                st.session_state.answers = {}
+                st.session_state.answers    = {}
+                st.session_state.quiz_topic = general_topic
 
     if st.session_state.get("quizzes"):
         st.markdown(dancheong_divider(), unsafe_allow_html=True)
         for i, q in enumerate(st.session_state.quizzes, 1):
             st.markdown(f"**Q{i}. {q['question']}**")
-            sel = st.radio("", q["options"],
+            sel = st.radio("", range(len(q["options"])),
+                           format_func=q["options"].__getitem__,
                            key=f"q_{i}_{quiz_type}",
                            label_visibility="collapsed")
             st.session_state.answers[i] = sel
 
         if st.button("Check Answers ✅"):
-            def answers_match(user_ans, correct_ans, options):
-                if user_ans is None:
-                    return False
-                if user_ans == correct_ans:
-                    return True
-                u = user_ans.strip().lower()
-                c = correct_ans.strip().lower()
-                if u == c:
-                    return True
-                if u in c or c in u:
-                    return True
-                # Find closest option to the stated answer key
-                best_option = min(options, key=lambda o: abs(len(o) - len(correct_ans)))
-                if best_option.strip().lower() == u:
-                    return True
-                return False
-
+            # Grading is an index comparison: options and answer_index were
+            # normalised when the quiz was generated (content.normalize_question).
+            # One transaction for the whole submission: quiz rows, XP and streak
             correct = 0
-            for i, q in enumerate(st.session_state.quizzes, 1):
-                user_ans    = st.session_state.answers.get(i)
-                correct_ans = q["answer"]
-                options     = q.get("options", [])
-                if answers_match(user_ans, correct_ans, options):
-                    st.success(f"Q{i}: ✅ Correct!")
-                    correct += 1
-                else:
-                    st.error(f"Q{i}: ❌ Wrong — correct answer: **{correct_ans}**")
-            st.session_state.progress["quizzes_taken"]   += 1
-            st.session_state.progress["correct_answers"] += correct
-            st.session_state.progress["xp"]              += correct * 10
-            save_progress(st.session_state.progress)
+            with db.batch(user, "quiz") as b:
+                for i, q in enumerate(st.session_state.quizzes, 1):
+                    user_index   = st.session_state.answers.get(i)
+                    answer_index = q["answer_index"]
+                    b.save_quiz_result(st.session_state.quiz_topic, q["question"],
+                                       q["options"], answer_index, user_index)
+                    if user_index == answer_index:
+                        st.success(f"Q{i}: ✅ Correct!")
+                        correct += 1
+                    else:
+                        st.error(f"Q{i}: ❌ Wrong — correct answer: **{q['options'][answer_index]}**")
+                b.add_progress(quizzes_taken=1, correct_answers=correct, xp=correct * 10)
+                b.log_activity()
             st.info(f"🌸 Score: {correct}/{len(st.session_state.quizzes)}  ·  +{correct * 10} XP")
 
 
@@ -959,9 +688,7 @@ elif mode == "✍️ Assignments":
         with st.spinner("Generating assignment…"):
             st.session_state.assignments      = generate_assignment(topic)
             st.session_state.assignment_topic = topic
-            st.session_state.progress["assignments_done"] += 1
-            st.session_state.progress["xp"]               += 20
-            save_progress(st.session_state.progress)
+            db.add_progress(user, "assignment", assignments_done=1, xp=20)
         st.info("🌸 +20 XP earned!")
 
     if st.session_state.assignments:
@@ -993,7 +720,7 @@ elif mode == "💖 Wellness":
                             key="wellness_feeling")
     if st.button("Get Motivation 🌸") and feeling:
         with st.spinner("Preparing your message…"):
-            data = generate_wellness(feeling)
+            data = wellness_pool.take(feeling.strip().lower()) or generate_wellness(feeling)
             st.session_state.latest_wellness = {
                 "feeling":             feeling,
                 "motivation":          data.get("motivation", "💪 Keep going!"),
@@ -1043,13 +770,16 @@ elif mode == "🎤 Korean Inspiration":
                             "영감을 주는 이야기 · Stories that move the soul"),
                 unsafe_allow_html=True)
 
-    if "latest_story" not in st.session_state:
-        with st.spinner("Loading a story…"):
-            st.session_state.latest_story = generate_story()
-
-    if st.button("✨ New Story"):
-        with st.spinner("Generating story…"):
-            st.session_state.latest_story = generate_story()
+    # Serve a pre-generated story when one is ready. The first visit never
+    # blocks; "New Story" falls back to a live, streamed generation.
+    new_story = st.button("✨ New Story")
+    if "latest_story" not in st.session_state or new_story:
+        story = story_pool.take()
+        if story is None and new_story:
+            stream_box = st.empty()
+            story = generate_story(use_cache=False, placeholder=stream_box)
+            stream_box.empty()
+        st.session_state.latest_story = story or random.choice(_FALLBACK_STORIES)
 
     if st.session_state.latest_story:
         s = st.session_state.latest_story
@@ -1068,6 +798,7 @@ elif mode == "🎤 Korean Inspiration":
                <i style='font-family:Times New Roman,Times,serif;'>({s['moral_english']})</i>
             </p>
         </div>""", unsafe_allow_html=True)
+        ttft_caption()
 
 
 # ══════════════════════════════════════════════════
@@ -1078,7 +809,7 @@ elif mode == "📊 Dashboard":
                             "나의 여정 · Track your learning journey"),
                 unsafe_allow_html=True)
 
-    prog        = st.session_state.progress
+    prog        = dashboard_stats(user, db.stats_version(user), int(time.time() // 60))
     xp          = prog["xp"]
     level       = xp // 100
     xp_progress = xp % 100
@@ -1102,27 +833,31 @@ elif mode == "📊 Dashboard":
     c2.metric("✅ Correct Answers",   prog.get("correct_answers", 0))
     c3.metric("✍️ Assignments Done",  prog.get("assignments_done", 0))
 
-    import pandas as pd
-    import matplotlib.pyplot as plt
+    accuracy = prog["quiz_correct"] / prog["quiz_answers"] if prog["quiz_answers"] else 0
+    c4, c5, c6 = st.columns(3)
+    c4.metric("📖 Cards · Due", f"{prog['cards']} · {prog['due']}")
+    c5.metric("🎯 Quiz Accuracy", f"{accuracy:.0%}")
+    c6.metric("🔥 Streak", f"{prog['streak']} days", help=f"Longest: {prog['longest_streak']} days")
+    flights = get_flights().stats
+    st.caption(f"⚡ Response cache: {db.cache_stats['hits']} hits · "
+               f"{db.cache_stats['misses']} misses · "
+               f"{flights['coalesced']} coalesced into {flights['leaders']} upstream calls")
+    backends = get_backends()
+    for route, backend in backends.items():
+        throttle = backend.throttle
+        if throttle is not None and (route == "chat" or backend is not backends["chat"]):
+            st.caption(f"🚦 {route} · {backend.name}: {throttle.stats['retries']} retries · "
+                       f"{throttle.stats['rate_limited']} rate-limited · "
+                       f"{throttle.stats['waited']:.0f}s queued · "
+                       f"concurrency {int(throttle.limit.limit)}")
 
     st.markdown("<h3 style='margin-top:20px;'>📊 XP Growth</h3>", unsafe_allow_html=True)
-    xp_df = pd.DataFrame({
-        "XP":    [10, 30, 60, max(xp, 60)],
-        "Stage": ["Day 1", "Day 2", "Day 3", "Now"]
-    })
-    fig, ax = plt.subplots(figsize=(7, 3))
-    fig.patch.set_facecolor("#F5EDD8")
-    ax.set_facecolor("#F5EDD8")
-    ax.plot(xp_df["Stage"], xp_df["XP"],
-            marker="o", color="#8B1A1A", linewidth=2.5,
-            markerfacecolor="#B8973A", markersize=9)
-    ax.fill_between(xp_df["Stage"], xp_df["XP"], alpha=0.15, color="#C0392B")
-    ax.set_ylabel("XP", color="#4a2a18")
-    ax.set_xlabel("Progress", color="#4a2a18")
-    ax.tick_params(colors="#4a2a18")
-    for spine in ax.spines.values():
-        spine.set_edgecolor("#B8973A")
-    st.pyplot(fig)
+    charts = dashboard_charts(user, db.stats_version(user))
+    if not charts:
+        st.caption("Take a quiz or finish an assignment to start your charts 🌸")
+    for name in ("xp", "accuracy", "intervals"):
+        if name in charts:
+            st.markdown(charts[name], unsafe_allow_html=True)
 
     st.markdown(dancheong_divider(), unsafe_allow_html=True)
 
@@ -1138,10 +873,19 @@ elif mode == "📊 Dashboard":
             st.write(f"{lbl}: **{val}**")
 
     if st.button("🔄 Reset Progress"):
-        st.session_state.progress = {
-            "xp": 0, "quizzes_taken": 0,
-            "correct_answers": 0, "assignments_done": 0
-        }
-        save_progress(st.session_state.progress)
+        db.reset_progress(user)
         st.success("Progress reset! 새로 시작합니다 🌸")
         st.rerun()
+
+
+# ══════════════════════════════════════════════════
+# STARTUP PROFILE  —  enable with MANJOG_PROFILE_STARTUP=1
+# ══════════════════════════════════════════════════
+HEAVY_MODULES = ("groq", "numpy", "pandas", "matplotlib", "transformers", "torch")
+
+if os.environ.get("MANJOG_PROFILE_STARTUP"):
+    with st.sidebar.expander("⏱ Startup profile"):
+        loaded = [m for m in HEAVY_MODULES if m in sys.modules]
+        st.caption(f"Imports this run: {IMPORT_SECONDS * 1000:.0f} ms")
+        st.caption(f"Script run: {(time.perf_counter() - _IMPORTS_STARTED) * 1000:.0f} ms")
+        st.caption("Heavy modules loaded: " + (", ".join(loaded) or "none"))
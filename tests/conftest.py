@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """An empty database (and card index) under tmp_path, unsharded."""
+    db.close_conn()
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "test.db"))
+    monkeypatch.setattr(db, "SHARD_DIR", None)
+    monkeypatch.setattr(db, "EMBED_DIR", str(tmp_path / "card_index"))
+    db._schema_ready.clear()
+    db._indexes.clear()
+    db.init_db()
+    yield db
+    db.close_conn()
+    db._schema_ready.clear()
+    db._indexes.clear()
+
+
+@pytest.fixture
+def sharded_db(fresh_db, tmp_path, monkeypatch):
+    """fresh_db with one SQLite file per user under tmp_path/shards."""
+    monkeypatch.setattr(db, "SHARD_DIR", str(tmp_path / "shards"))
+    return fresh_db
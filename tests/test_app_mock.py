@@ -0,0 +1,75 @@
+"""The app end to end on the offline mock backend: every page's prompt must
+get a reply its parser accepts, not the hard-coded fallback."""
+import os
+
+import pytest
+
+pytest.importorskip("streamlit.testing.v1")
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+
+
+@pytest.fixture
+def app(fresh_db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("LLM_PROVIDER", "mock")
+    monkeypatch.delenv("LLM_GENERATE_PROVIDER", raising=False)
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    assert not at.exception
+    return at
+
+
+def open_page(at, page):
+    at.sidebar.radio[0].set_value(page).run()
+    assert not at.exception
+
+
+def click(at, label):
+    next(b for b in at.button if b.label == label).click().run()
+    assert not at.exception
+    assert not at.error, [e.value for e in at.error]
+
+
+def test_wellness_uses_the_model_reply(app):
+    open_page(app, "💖 Wellness")
+    app.text_input(key="wellness_feeling").input("curious")
+    click(app, "Get Motivation 🌸")
+    wellness = app.session_state["latest_wellness"]
+    assert "curious" in wellness["motivation"]
+    assert wellness["korean_quote"] and wellness["english_translation"]
+
+
+def test_new_story_parses(app):
+    open_page(app, "🎤 Korean Inspiration")
+    click(app, "✨ New Story")
+    story = app.session_state["latest_story"]
+    assert "never gave up" in story["english_story"]
+    assert story["korean_story"] and story["moral_english"]
+
+
+def test_flashcards_parse_and_are_saved(app, fresh_db):
+    open_page(app, "📖 Flashcards")
+    next(t for t in app.main.text_input if t.label == "Topic").input("food")
+    click(app, "Generate Flashcards 🌸")
+    assert len(app.session_state["flashcards"]) == 5
+    assert app.session_state["flashcards"][0]["front"].startswith("food")
+    assert fresh_db.get_flashcard_stats()[0] == 5
+
+
+def test_chat_send_streams_a_reply(app, fresh_db):
+    app.text_input(key="chat_box").input("안녕")
+    click(app, "전송")
+    history = app.session_state["chat_history"]
+    assert [m["role"] for m in history] == ["user", "assistant"]
+    assert history[1]["content"]
+    assert any("안녕" in m.value for m in app.markdown)
+
+
+def test_dashboard_draws_svg_charts(app, fresh_db):
+    fresh_db.add_xp(10, reason="quiz")
+    fresh_db.save_quiz_result("food", "What is 밥?", ["rice", "soup"], 0, 0)
+    open_page(app, "📊 Dashboard")
+    drawn = [m.value for m in app.markdown if "<svg" in m.value and "XP over time" in m.value]
+    assert drawn
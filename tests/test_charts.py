@@ -0,0 +1,47 @@
+"""Dashboard charts: daily rollups and render time for a year of activity."""
+import statistics
+import time
+import xml.dom.minidom
+
+import pytest
+
+import bench
+import charts
+
+np = pytest.importorskip("numpy")
+
+DAY = charts.DAY
+
+
+def test_daily_sums_and_means_fill_gaps():
+    rows = [(0, 5), (3600, 10), (2 * DAY + 10, 20)]
+    first, totals = charts.daily(rows)
+    assert first == 0
+    assert totals.tolist() == [15, 0, 20]
+    _, means = charts.daily([(0, 1), (60, 0), (2 * DAY, 1)], how="mean")
+    assert means[0] == 0.5 and np.isnan(means[1]) and means[2] == 1
+
+
+def test_charts_are_drawn_only_for_data_present():
+    assert charts.render_charts([], [], []) == {}
+    drawn = charts.render_charts([(DAY, 10)], [], [(1, 4), (6, 2)])
+    assert set(drawn) == {"xp", "intervals"}
+    for svg in drawn.values():
+        xml.dom.minidom.parseString(svg)  # well-formed
+
+
+def test_a_year_of_events_renders_in_under_50_ms(fresh_db):
+    bench.insert_activity(365)
+    bench.insert_cards(500)
+    _, _, intervals = fresh_db.get_flashcard_stats()
+    rows = fresh_db.get_xp_events(), fresh_db.get_quiz_history(), intervals
+    assert len(rows[0]) == 365 * 12
+
+    drawn = charts.render_charts(*rows)  # warm-up: imports NumPy
+    assert set(drawn) == {"xp", "accuracy", "intervals"}
+    timings = []
+    for _ in range(7):
+        started = time.perf_counter()
+        charts.render_charts(*rows)
+        timings.append(time.perf_counter() - started)
+    assert statistics.median(timings) < 0.05
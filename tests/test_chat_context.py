@@ -0,0 +1,49 @@
+"""Token-budgeted chat context over long conversations."""
+import threading
+import time
+
+import chat_context
+from chat_context import build_context, message_tokens
+
+BUDGET = 300
+
+
+def turn(n):
+    role = "user" if n % 2 == 0 else "assistant"
+    return {"role": role, "content": f"턴 {n}: 오늘 한국어 공부를 했어요. " * (1 + n % 4)}
+
+
+def test_context_stays_bounded_over_200_turns():
+    history, summary, summarized, folds = [], "", 0, []
+
+    def summarize(old, turns):
+        folds.append(len(turns))
+        return f"{len(folds)} summaries, last folded {len(turns)} turns"
+
+    for n in range(200):
+        history.append(turn(n))
+        messages, summary, summarized = build_context(history, summary, summarized, BUDGET, summarize)
+        assert messages[-1] is history[-1]
+        assert sum(message_tokens(m) for m in messages) <= BUDGET
+        if summary:
+            assert messages[0]["role"] == "system"
+            assert messages[1:] == history[summarized:]
+    assert sum(folds) == summarized
+    assert 5 < len(folds) < 100  # folds happen every few turns, not on every message
+
+
+def test_tokenizer_loads_off_the_request_path(monkeypatch):
+    loading = threading.Event()
+
+    def slow_load():
+        loading.set()
+        time.sleep(2)
+
+    monkeypatch.setattr(chat_context, "_load_tokenizer", slow_load)
+    monkeypatch.setattr(chat_context, "_loader", None)
+    monkeypatch.setattr(chat_context, "_tokenizer", None)
+    started = time.perf_counter()
+    build_context([turn(0)])
+    assert time.perf_counter() - started < 0.5
+    assert loading.wait(1)
+    assert chat_context.count_tokens("hello world!") == 5  # byte estimate until it is ready
@@ -0,0 +1,95 @@
+"""Quiz normalisation against the messy output models actually produce."""
+import unicodedata
+
+import pytest
+
+import content
+
+
+def index_of(options, answer, question="Q?"):
+    q = content.normalize_question({"question": question, "options": options, "answer": answer})
+    return None if q is None else q["answer_index"]
+
+
+@pytest.mark.parametrize("options, answer, expected", [
+    (["School", "Book", "Friend", "Teacher"], "Book", 1),
+    (["School", "Book", "Friend", "Teacher"], "  book. ", 1),
+    (["A) School", "B) Book", "C) Friend", "D) Teacher"], "Friend", 2),
+    (["School", "Book", "Friend", "Teacher"], "C) Friend", 2),
+    (["School", "Book", "Friend", "Teacher"], "D", 3),
+    (["School", "Book", "Friend", "Teacher"], "(2)", 1),
+    (["School", "Book", "Friend", "Teacher"], 4, 3),
+    (["School", "Book", "Friend", "Teacher"], "'Teacher'", 3),
+    (["to eat (먹다)", "to sleep (자다)", "to go (가다)"], "먹다", 0),
+    (["학교", "책", "친구"], unicodedata.normalize("NFD", "친구"), 2),
+    (["학교 ", "  책", "친구\n"], "책", 1),
+])
+def test_text_and_label_answers(options, answer, expected):
+    assert index_of(options, answer) == expected
+
+
+@pytest.mark.parametrize("options, answer, expected", [
+    ([10, 20, 30, 40], 20, 1),                        # a value, not label 20
+    (["1990", "2000", "2010", "2020"], 2000, 1),
+    ([1990, 2000, 2010, 2020], "2000", 1),
+    ([1.5, 2.5, 3.5], 2.5, 1),
+    ([10, 20, 30, 40], 20.0, 1),
+    ([10.0, 20.0, 30.0], 30, 2),
+    (["1", "2", "3", "4"], 3, 2),                     # value and label agree
+    (["5", "10", "15", "20"], 2, 1),                  # no value match: 1-based label
+    (["150", "20", "30", "40"], 50, None),            # no substring guesses for numbers
+    ([10, 20, 30, 40], 99, None),
+])
+def test_numeric_answers(options, answer, expected):
+    assert index_of(options, answer) == expected
+
+
+@pytest.mark.parametrize("item", [
+    {"question": "Q?", "options": ["a", "b"], "answer": "c"},
+    {"question": "Q?", "options": ["only one"], "answer": "only one"},
+    {"question": "", "options": ["a", "b"], "answer": "a"},
+    {"question": "Q?", "options": "a, b", "answer": "a"},
+    {"question": "Q?", "options": ["a", "b"], "answer": None},
+    {"question": "Q?", "options": ["a", "b"], "answer": True},
+    {"question": "Q?", "options": ["apple pie", "apple tart"], "answer": "apple"},  # ambiguous
+    ["not", "a", "dict"],
+])
+def test_unanswerable_items_are_dropped(item):
+    assert content.normalize_question(item) is None
+
+
+def test_duplicate_options_are_merged():
+    q = content.normalize_question({"question": "Q?", "options": ["책", "책 ", "학교"], "answer": "학교"})
+    assert q["options"] == ["책", "학교"] and q["answer_index"] == 1
+
+
+def test_parse_quiz_handles_fenced_and_chatty_output():
+    raw = '''Sure! Here is your quiz:
+```json
+[
+  {"question": "What is 'apple'?", "options": ["사과", "배", "포도", "귤"], "answer": "사과"},
+  {"question": "Year of Hangul's creation?", "options": [1443, 1592, 1910, 1945], "answer": 1443},
+  {"question": "Broken", "options": ["a", "b"], "answer": "z"},
+  {"question": "What is 'pear'?", "options": ["A. 사과", "B. 배", "C. 포도", "D. 귤"], "answer": "B"}
+]
+```
+Good luck!'''
+    quiz = content.parse_quiz(raw)
+    assert [q["answer_index"] for q in quiz] == [0, 0, 1]
+    assert quiz[1]["options"][0] == "1443"
+
+
+def test_parse_quiz_rejects_garbage():
+    assert content.parse_quiz("I can't help with that.") is None
+    assert content.parse_quiz('[{"question": "Q", "options": ["a"], "answer": "a"}]') is None
+
+
+def test_flashcards_keep_only_valid_cards():
+    raw = '[{"front": "학교", "back": "School"}, {"front": "", "back": "x"}, {"front": "책"}, "junk"]'
+    assert content.parse_flashcards(raw) == [{"front": "학교", "back": "School"}]
+    assert content.parse_flashcards("no cards here") is None
+
+
+def test_topic_key_normalises():
+    assert content.topic_key("  K-Drama   Phrases ") == content.topic_key("k-drama phrases")
+    assert content.topic_key(unicodedata.normalize("NFD", "음식")) == "음식"
@@ -0,0 +1,76 @@
+"""Keyset paging of the due queue."""
+import pytest
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture
+def deck(fresh_db):
+    """40 cards over two topics: 30 due, many sharing a next_review, 10 not yet due."""
+    cards = [{"korean": f"단어 {i}", "english": f"word {i}", "example": ""} for i in range(40)]
+    fresh_db.add_flashcards("food", cards[:20], dedup=False)
+    fresh_db.add_flashcards("travel", cards[20:], dedup=False)
+    conn = fresh_db.get_conn()
+    with conn:
+        for card_id, in conn.execute("SELECT id FROM flashcards").fetchall():
+            due = NOW + 3600 if card_id % 4 == 0 else NOW - (card_id % 3) * 60  # three tied groups
+            conn.execute("UPDATE flashcards SET next_review=? WHERE id=?", (due, card_id))
+    return fresh_db
+
+
+def expected(db, topic=None):
+    sql = "SELECT id, next_review FROM flashcards WHERE next_review <= ?"
+    params = [NOW]
+    if topic:
+        sql += " AND topic = ?"
+        params.append(topic)
+    return sorted(db.get_conn().execute(sql, params).fetchall(), key=lambda r: (r[1], r[0]))
+
+
+def walk(db, size, topic=None):
+    seen, after = [], None
+    while True:
+        page = db.get_due_page(size, after, topic, NOW)
+        seen.extend((row[0], row[5]) for row in page)
+        if len(page) < size:
+            return seen
+        after = (page[-1][5], page[-1][0])
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 30, 50])
+def test_pages_cover_the_queue_once_in_order(deck, size):
+    assert len(expected(deck)) == 30
+    assert walk(deck, size) == expected(deck)
+
+
+def test_pages_within_a_topic(deck):
+    assert walk(deck, 4, "travel") == expected(deck, "travel")
+    assert {row[0] for row in walk(deck, 4, "travel")}.isdisjoint(row[0] for row in expected(deck, "food"))
+
+
+def test_iter_due_cards_matches_the_full_list(deck, monkeypatch):
+    monkeypatch.setattr(deck.time, "time", lambda: NOW)
+    assert [row[0] for row in deck.iter_due_cards(page_size=4)] == [row[0] for row in expected(deck)]
+    assert deck.get_due_cards() == list(deck.iter_due_cards(page_size=4))
+    assert deck.get_due_cards(limit=5) == deck.get_due_cards()[:5]
+
+
+def test_deep_pages_cost_the_same_as_the_first(fresh_db):
+    conn = fresh_db.get_conn()
+    with conn:
+        conn.executemany("INSERT INTO flashcards (user_id, topic, korean, english, example, next_review) "
+                         "VALUES ('default', 'food', '밥', 'rice', '', ?)", [(NOW,)] * 5000)  # one big tie
+    steps = []
+    conn.set_progress_handler(lambda: steps.append(1), 100)
+    try:
+        def cost(after):
+            steps.clear()
+            page = fresh_db.get_due_page(20, after, now=NOW)
+            return len(steps), page
+        _, first = cost(None)
+        shallow, _ = cost((NOW, first[-1][0]))
+        deep, page = cost((NOW, 4900))
+    finally:
+        conn.set_progress_handler(None, 0)
+    assert [row[0] for row in page] == list(range(4901, 4921))
+    assert deep <= shallow + 2
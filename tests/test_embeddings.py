@@ -0,0 +1,36 @@
+"""Near-duplicate detection with the default (hash) card embeddings."""
+import embeddings
+
+
+def card(korean, english):
+    return {"korean": korean, "english": english, "example": ""}
+
+
+def test_hash_embedder_is_the_default():
+    assert embeddings.model_name() == f"hash-{embeddings.HASH_DIM}"
+    assert embeddings.embed(["학교 — School"]).shape == (1, embeddings.HASH_DIM)
+
+
+def test_regenerated_cards_are_rejected(fresh_db):
+    deck = [card("학교", "School"), card("사과", "Apple"), card("친구", "Friend")]
+    assert fresh_db.add_flashcards("food", deck) == 3
+    again = [card("학교", "school"), card("사과", "Apple."), card("선생님", "Teacher")]
+    assert fresh_db.add_flashcards("food", again) == 1
+    assert fresh_db.get_flashcard_stats()[0] == 4
+
+
+def test_duplicates_within_one_batch_are_rejected(fresh_db):
+    assert fresh_db.add_flashcards("food", [card("물", "Water"), card("물", "Water")]) == 1
+
+
+def test_find_similar_ranks_the_closest_card_first(fresh_db):
+    fresh_db.add_flashcards("food", [card("사과", "Apple"), card("자동차", "Car"), card("학교", "School")])
+    hits = fresh_db.find_similar("사과 — Apples", k=2)
+    assert [h["korean"] for h in hits][0] == "사과"
+    assert hits[0]["score"] >= hits[1]["score"]
+
+
+def test_index_survives_reopening(fresh_db):
+    fresh_db.add_flashcards("food", [card("사과", "Apple")])
+    fresh_db._indexes.clear()  # as after a restart
+    assert fresh_db.add_flashcards("food", [card("사과", "Apple")]) == 0
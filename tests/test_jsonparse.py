@@ -0,0 +1,73 @@
+"""Extracting JSON from the shapes model replies actually come in."""
+import pytest
+
+from jsonparse import StreamParser, extract_json_list, extract_json_obj, parse_values
+
+CARDS = [{"korean": "밥", "english": "rice"}, {"korean": "물", "english": "water"}]
+
+
+@pytest.mark.parametrize("raw", [
+    '```json\n[{"korean": "밥", "english": "rice"}, {"korean": "물", "english": "water"}]\n```',
+    '```\n[{"korean": "밥", "english": "rice"},\n {"korean": "물", "english": "water"}]\n```\nEnjoy!',
+    'Sure! Here are your cards:\n[{"korean": "밥", "english": "rice"}, '
+    '{"korean": "물", "english": "water"}]\nLet me know if you want more.',
+    '[{"korean": "밥", "english": "rice",}, {"korean": "물", "english": "water",},]',
+    'Notes [see below] and the cards: [{"korean": "밥", "english": "rice"}, '
+    '{"korean": "물", "english": "water"}]',
+])
+def test_lists_are_found_in_fences_prose_and_trailing_commas(raw):
+    assert extract_json_list(raw) == CARDS
+
+
+def test_raw_newlines_inside_strings_are_escaped():
+    raw = '{"korean_story": "첫 줄\n둘째 줄", "moral":\t"끝"}'
+    assert extract_json_obj(raw) == {"korean_story": "첫 줄\n둘째 줄", "moral": "끝"}
+
+
+def test_object_in_prose_with_trailing_comma():
+    raw = 'Here you go: {"motivation": "Keep going", "quote": "힘내",} Hope it helps.'
+    assert extract_json_obj(raw) == {"motivation": "Keep going", "quote": "힘내"}
+
+
+def test_array_truncated_mid_element_keeps_the_complete_ones():
+    raw = '[{"korean": "밥", "english": "rice"}, {"korean": "물", "english": "water"}, {"korean": "빵", "eng'
+    assert extract_json_list(raw) == CARDS
+
+
+def test_list_nested_in_an_object():
+    assert extract_json_list('{"flashcards": [{"korean": "밥", "english": "rice"}]}') == CARDS[:1]
+
+
+def test_bracketed_prose_does_not_beat_the_records():
+    assert extract_json_list('Score [5] out of 10: [{"korean": "밥", "english": "rice"}]') == CARDS[:1]
+
+
+def test_nothing_to_find():
+    assert extract_json_list("Sorry, I can't help with that.") is None
+    assert extract_json_obj("[1, 2]") is None
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_chunked_feed_matches_a_single_feed(size):
+    raw = ('Cards:\n```json\n[{"korean": "밥", "english": "rice, \\"cooked\\"",},\n'
+           '{"korean": "물", "english": "water\n(drink)"}]\n```')
+    parser = StreamParser()
+    streamed = []
+    for i in range(0, len(raw), size):
+        streamed.extend(parser.feed(raw[i:i + size]))
+    assert parser.close() == parse_values(raw)
+    assert streamed == parse_values(raw)[0]
+    assert streamed[0]["english"] == 'rice, "cooked"'
+
+
+def test_elements_are_reported_as_they_close():
+    parser = StreamParser()
+    assert parser.feed('[{"korean": "밥", "english": "rice"}, {"korean": "물"') == CARDS[:1]
+    assert parser.feed(', "english": "water"}') == CARDS[1:]
+    assert parser.feed("]") == []
+    assert parser.close() == [CARDS]
+
+
+def test_stray_unbalanced_bracket_before_the_payload():
+    raw = 'Here it is [as requested:\n[{"korean": "밥", "english": "rice"}, {"korean": "물", "english": "water"}]'
+    assert extract_json_list(raw) == CARDS
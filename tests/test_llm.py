@@ -0,0 +1,125 @@
+"""Response cache and request coalescing in front of a stub LLM client."""
+import itertools
+import threading
+import time
+
+import llm
+from prefetch import ContentPool
+from singleflight import SingleFlight
+
+
+class StubProvider:
+    """Slow provider whose every reply is distinct, counting upstream calls."""
+    name = "stub"
+
+    def __init__(self, latency=0.2):
+        self.latency = latency
+        self.calls   = 0
+        self._ids    = itertools.count(1)
+        self._lock   = threading.Lock()
+
+    def _reply(self):
+        with self._lock:
+            self.calls += 1
+            return f"reply {next(self._ids)}"
+
+    def complete(self, model, messages, max_tokens):
+        reply = self._reply()
+        time.sleep(self.latency)
+        return reply, None
+
+    def open_stream(self, model, messages, max_tokens):
+        reply = self._reply()
+        time.sleep(self.latency)
+        return iter([reply[:3], reply[3:]])
+
+
+PROMPT = [{"role": "user", "content": "Tell me a story"}]
+
+
+def run_concurrently(n, fn):
+    results, barrier = [None] * n, threading.Barrier(n)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = fn()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_identical_cached_calls_share_one_request(fresh_db):
+    stub, flights = StubProvider(), SingleFlight()
+    backend = llm.Backend(stub, "m")
+    replies = run_concurrently(8, lambda: llm.chat(backend, PROMPT, flights=flights))
+    assert stub.calls == 1
+    assert set(replies) == {"reply 1"}
+    assert flights.stats["coalesced"] == 7
+    assert llm.chat(backend, PROMPT, flights=flights) == "reply 1"  # now from the cache
+    assert stub.calls == 1
+
+
+def test_uncached_calls_are_never_coalesced(fresh_db):
+    stub, flights = StubProvider(), SingleFlight()
+    backend = llm.Backend(stub, "m")
+    replies = run_concurrently(4, lambda: llm.chat(backend, PROMPT, use_cache=False, flights=flights))
+    assert stub.calls == 4
+    assert len(set(replies)) == 4
+    assert flights.stats == {"leaders": 0, "coalesced": 0}
+
+
+def test_prefetch_pool_gets_distinct_items(fresh_db):
+    stub, flights = StubProvider(latency=0.1), SingleFlight()
+    backend = llm.Backend(stub, "m")
+    pool = ContentPool({"story": lambda: llm.chat(backend, PROMPT, use_cache=False, flights=flights)},
+                       size=2, workers=2)
+    assert pool.take("story") is None  # empty until first asked for
+    deadline = time.monotonic() + 5
+    while pool.available("story") < 2 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    first, second = pool.take("story"), pool.take("story")
+    assert first and second and first != second
+
+
+def test_store_false_keeps_replies_out_of_the_cache(fresh_db):
+    stub = StubProvider(latency=0)
+    backend = llm.Backend(stub, "m")
+    llm.chat(backend, PROMPT, store=False)
+    assert llm.chat(backend, PROMPT, store=False) == "reply 2"
+    assert fresh_db.get_conn().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 0
+
+
+def test_identical_streams_share_one_request(fresh_db):
+    stub, flights = StubProvider(), SingleFlight()
+    backend = llm.Backend(stub, "m")
+    replies = run_concurrently(4, lambda: "".join(llm.chat_stream(backend, PROMPT, flights=flights)))
+    assert stub.calls == 1
+    assert set(replies) == {"reply 1"}
+
+
+def test_abandoned_stream_lets_waiters_run_their_own(fresh_db):
+    stub, flights = StubProvider(latency=0.1), SingleFlight()
+    backend = llm.Backend(stub, "m")
+    leader = llm.chat_stream(backend, PROMPT, flights=flights)
+    next(leader)  # leader holds the flight
+    waiter = []
+    t = threading.Thread(target=lambda: waiter.append(
+        "".join(llm.chat_stream(backend, PROMPT, flights=flights))))
+    t.start()
+    time.sleep(0.05)
+    leader.close()
+    t.join()
+    assert waiter == ["reply 2"]
+
+
+def test_unthrottled_backend_skips_the_token_estimate(monkeypatch):
+    def fail(messages):
+        raise AssertionError("estimated without a throttle")
+    monkeypatch.setattr(llm, "estimate_messages", fail)
+    backend = llm.Backend(llm.MockProvider(), "mock")
+    assert backend.complete(PROMPT, 10)
+    assert "".join(backend.stream(PROMPT, 10))
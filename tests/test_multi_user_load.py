@@ -0,0 +1,64 @@
+"""Load test: 1k simulated learners, each running a short session.
+
+Per-request latency must stay flat as users accumulate — the last users
+are served about as fast as the first — in both the shared database and
+the per-user sharded mode.
+"""
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+USERS = 1000
+SESSIONS_AT_ONCE = 16
+CARDS = [{"korean": f"단어 {i}", "english": f"word {i}", "example": ""} for i in range(5)]
+
+
+def _session(db, n):
+    """One learner's visit; returns the latency of each request in seconds."""
+    user, timings = f"user-{n}", []
+
+    def timed(fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+        return result
+
+    try:
+        timed(db.add_flashcards, "food", CARDS, user, dedup=False)
+        for card in timed(db.get_due_page, 10, user_id=user):
+            timed(db.review_card, card[0], 4, user_id=user)
+        timed(db.save_quiz_result, "food", "What is 밥?", ["rice", "soup"], 0, 0, user)
+        timed(db.add_progress, user, "quiz", xp=10, quizzes_taken=1, correct_answers=1)
+        timed(db.log_activity, user)
+        timed(db.get_progress, user)
+        timed(db.get_streaks, user)
+        timed(db.get_stats_snapshot, user)
+    finally:
+        db.close_conn()  # the session's thread goes away with it
+    return timings
+
+
+def _run(db):
+    with ThreadPoolExecutor(SESSIONS_AT_ONCE) as pool:
+        sessions = list(pool.map(lambda n: _session(db, n), range(USERS)))
+    tenth = USERS // 10
+    first = statistics.median(t for s in sessions[:tenth] for t in s)
+    last  = statistics.median(t for s in sessions[-tenth:] for t in s)
+    return sessions, first, last
+
+
+@pytest.mark.parametrize("mode", ["shared", "sharded"])
+def test_latency_stays_flat_for_1k_users(mode, fresh_db, tmp_path, monkeypatch):
+    if mode == "sharded":
+        monkeypatch.setattr(fresh_db, "SHARD_DIR", str(tmp_path / "shards"))
+    sessions, first, last = _run(fresh_db)
+
+    assert all(sessions)
+    # Flat: median latency for the last 100 users within 3x of the first
+    # 100 (plus 2 ms of slack for scheduler noise on tiny numbers).
+    assert last <= first * 3 + 0.002, (first, last)
+    for n in (0, USERS - 1):
+        assert fresh_db.get_progress(f"user-{n}")["xp"] == 10
+        assert fresh_db.get_flashcard_stats(f"user-{n}")[0] == len(CARDS)
@@ -0,0 +1,70 @@
+"""precompute.py updates a content bundle without losing packs."""
+import os
+
+import pytest
+
+import content
+import precompute
+
+
+@pytest.fixture
+def bundle(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "mock")
+    monkeypatch.delenv("LLM_GENERATE_PROVIDER", raising=False)
+    return str(tmp_path / "bundle.db")
+
+
+def failing_for(monkeypatch, *bad_topics):
+    generate = content.generate_part
+
+    def generate_part(chat, topic, part):
+        if topic in bad_topics:
+            raise ValueError(f"No valid {part} for {topic!r}")
+        return generate(chat, topic, part)
+    monkeypatch.setattr(content, "generate_part", generate_part)
+
+
+def test_writes_every_part_of_every_topic(bundle):
+    assert precompute.main(["Food", "travel", "-o", bundle]) == 0
+    meta, packs = content.load_bundle(bundle)
+    assert sorted(packs) == ["food", "travel"]
+    assert set(packs["food"]) == set(content.PACK_PARTS)
+    assert meta["model"] == "mock:mock"
+
+
+def test_partial_run_keeps_other_topics(bundle):
+    precompute.main(["food", "travel", "-o", bundle])
+    assert precompute.main(["weather", "-o", bundle]) == 0
+    assert sorted(content.load_bundle(bundle)[1]) == ["food", "travel", "weather"]
+    assert content.bundle_packs(bundle).keys() == {"food", "travel", "weather"}
+
+
+def test_replace_drops_other_topics(bundle):
+    precompute.main(["food", "travel", "-o", bundle])
+    precompute.main(["weather", "-o", bundle, "--replace"])
+    assert sorted(content.load_bundle(bundle)[1]) == ["weather"]
+
+
+def test_failed_topic_keeps_its_previous_pack(bundle, monkeypatch):
+    precompute.main(["food", "-o", bundle])
+    before = content.load_bundle(bundle)[1]["food"]
+    failing_for(monkeypatch, "food")
+    assert precompute.main(["food", "weather", "-o", bundle]) == 1
+    packs = content.load_bundle(bundle)[1]
+    assert packs["food"] == before
+    assert "weather" in packs
+
+
+def test_nothing_generated_leaves_the_bundle_alone(bundle, monkeypatch):
+    precompute.main(["food", "-o", bundle, "--version", "v1"])
+    stamp = os.stat(bundle).st_mtime_ns
+    failing_for(monkeypatch, "food", "travel")
+    assert precompute.main(["food", "travel", "-o", bundle, "--version", "v2"]) == 1
+    assert os.stat(bundle).st_mtime_ns == stamp
+    assert content.load_bundle(bundle)[0]["version"] == "v1"
+
+
+def test_nothing_generated_creates_no_bundle(bundle, monkeypatch):
+    failing_for(monkeypatch, "food")
+    assert precompute.main(["food", "-o", bundle]) == 1
+    assert not os.path.exists(bundle)
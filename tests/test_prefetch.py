@@ -0,0 +1,49 @@
+"""ContentPool: warming, keyed takes, and takes across all keys."""
+import itertools
+import random
+import time
+
+from prefetch import ContentPool
+
+SUBJECTS = ("Yu Gwan-sun", "Ahn Chang-ho", "Kim Gu", "Sejong", "Yi Sun-sin", "Jang Yeong-sil")
+
+
+def counting_pool(size=2):
+    counter = itertools.count()
+    return ContentPool({s: (lambda s=s: (s, next(counter))) for s in SUBJECTS}, size=size, workers=4)
+
+
+def settle(pool):
+    """Wait for every queued refill to land."""
+    deadline = time.monotonic() + 5
+    while any(pool._pending.values()) and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_fill_warms_one_item_per_key():
+    pool = counting_pool()
+    pool.fill(1)
+    settle(pool)
+    assert [pool.available(s) for s in SUBJECTS] == [1] * len(SUBJECTS)
+
+
+def test_keyed_take_misses_then_refills_that_key():
+    pool = counting_pool()
+    assert pool.take("Kim Gu") is None
+    settle(pool)
+    assert pool.available("Kim Gu") == 2
+    assert sum(pool.available(s) for s in SUBJECTS) == 2
+
+
+def test_untargeted_takes_spread_over_every_subject():
+    random.seed(8)
+    pool = counting_pool()  # cold: the first take draws a subject and misses
+    served = []
+    for _ in range(60):
+        item = pool.take()
+        if item:
+            served.append(item[0])
+        settle(pool)
+    assert len(served) >= 50
+    assert set(served) == set(SUBJECTS)
+    assert all(served.count(s) > 1 for s in SUBJECTS)  # refilled across keys, not just one
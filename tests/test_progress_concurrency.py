@@ -0,0 +1,66 @@
+"""Concurrent writers must not lose progress updates (the old
+read-modify-write of progress.json dropped them)."""
+import threading
+
+WRITERS = 50
+WRITES_EACH = 20
+
+
+def _hammer(db, user_id, barrier, errors):
+    try:
+        barrier.wait()
+        for _ in range(WRITES_EACH):
+            db.add_progress(user_id, "stress", xp=10, quizzes_taken=1)
+    except Exception as e:
+        errors.append(e)
+    finally:
+        db.close_conn()
+
+
+def test_parallel_writers_lose_no_xp(fresh_db):
+    barrier, errors = threading.Barrier(WRITERS), []
+    threads = [threading.Thread(target=_hammer, args=(fresh_db, "learner", barrier, errors))
+               for _ in range(WRITERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    progress = fresh_db.get_progress("learner")
+    assert progress["xp"] == WRITERS * WRITES_EACH * 10
+    assert progress["quizzes_taken"] == WRITERS * WRITES_EACH
+    assert len(fresh_db.get_xp_events("learner")) == WRITERS * WRITES_EACH
+
+
+def test_parallel_batches_lose_no_xp(fresh_db):
+    barrier, errors = threading.Barrier(WRITERS), []
+
+    def batched():
+        try:
+            barrier.wait()
+            with fresh_db.batch("learner", reason="quiz") as b:
+                for _ in range(WRITES_EACH):
+                    b.add_xp(5)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            fresh_db.close_conn()
+
+    threads = [threading.Thread(target=batched) for _ in range(WRITERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert fresh_db.get_xp("learner")[0] == WRITERS * WRITES_EACH * 5
+
+
+def test_progress_json_is_imported_once(fresh_db, tmp_path):
+    path = tmp_path / "progress.json"
+    path.write_text('{"xp": 120, "quizzes_taken": 3, "correct_answers": 2, "assignments_done": 1}')
+    assert fresh_db.import_progress_json(str(path), "learner")
+    assert not fresh_db.import_progress_json(str(path), "learner")
+    assert fresh_db.get_progress("learner") == {"xp": 120, "quizzes_taken": 3,
+                                                "correct_answers": 2, "assignments_done": 1}
@@ -0,0 +1,361 @@
+"""Throttle against a local fake chat-completions server that injects 429s,
+5xx errors and latency."""
+import json
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import llm
+import ratelimit
+from ratelimit import AdaptiveLimit, Throttle, TokenBucket
+
+
+class FakeServer:
+    """Chat-completions endpoint. Each request pops the next scripted status
+    (200 once the script runs out); with max_inflight set, requests beyond
+    that many in flight get a 429 without Retry-After."""
+
+    def __init__(self, script=(), latency=0.0, retry_after=None, max_inflight=None):
+        self.script       = list(script)
+        self.latency      = latency
+        self.retry_after  = retry_after
+        self.max_inflight = max_inflight
+        self.requests     = []
+        self.inflight     = self.peak = 0
+        self.lock         = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                status = server.enter()
+                try:
+                    time.sleep(server.latency)
+                    self.reply(status)
+                finally:
+                    server.leave()
+
+            def reply(self, status):
+                body = json.dumps({
+                    "id": "fake", "object": "chat.completion", "created": 0, "model": "fake",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "안녕하세요"}}],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+                } if status == 200 else {"error": {"message": f"status {status}"}}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if status == 429 and server.retry_after is not None:
+                    self.send_header("Retry-After", str(server.retry_after))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def enter(self):
+        with self.lock:
+            self.requests.append(time.monotonic())
+            self.inflight += 1
+            self.peak = max(self.peak, self.inflight)
+            if self.script:
+                return self.script.pop(0)
+            if self.max_inflight is not None and self.inflight > self.max_inflight:
+                return 429
+            return 200
+
+    def leave(self):
+        with self.lock:
+            self.inflight -= 1
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StatusError(Exception):
+    """Shaped like the groq/openai errors: status_code plus response headers."""
+
+    def __init__(self, error):
+        super().__init__(str(error))
+        self.status_code = error.code
+        self.response = type("Response", (), {"status_code": error.code, "headers": error.headers})()
+
+
+def post(url):
+    request = urllib.request.Request(url + "/openai/v1/chat/completions", data=b"{}", method="POST",
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as resp:
+            return json.load(resp)["choices"][0]["message"]["content"]
+    except urllib.error.HTTPError as e:
+        raise StatusError(e) from None
+
+
+class FakeClock:
+    """Stands in for the time module inside ratelimit: sleeping advances it."""
+
+    def __init__(self):
+        self.now, self.sleeps = 1000.0, []
+        self.lock = threading.Lock()
+
+    def monotonic(self):
+        with self.lock:
+            return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(**kwargs):
+        servers.append(FakeServer(**kwargs))
+        return servers[-1]
+
+    yield start
+    for s in servers:
+        s.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ratelimit, "time", fake)
+    monkeypatch.setattr(ratelimit.random, "uniform", lambda low, high: high)  # no jitter
+    return fake
+
+
+# ---------------- TOKEN BUCKETS ----------------
+def test_bucket_refills_at_its_rate():
+    bucket = TokenBucket(per_minute=60)
+    bucket.stamp = 0.0
+    bucket.take(60)
+    assert bucket.wait_time(1, now=0.0) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now=1.0) == 0.0
+    assert bucket.wait_time(100, now=1.0) == pytest.approx(59.0)  # capped at a full bucket
+
+
+def test_bucket_reserve_holds_back_background_calls():
+    bucket = TokenBucket(per_minute=60)
+    bucket.stamp = 0.0
+    bucket.take(40)
+    assert bucket.wait_time(1, now=0.0) == 0.0
+    assert bucket.wait_time(1, now=0.0, reserve=0.5) == pytest.approx(11.0)
+
+
+def test_requests_per_minute_are_paced(server, clock):
+    fake = server()
+    throttle = Throttle(rpm=6, tpm=100000)
+    for _ in range(9):
+        assert throttle.call(lambda: post(fake.url), tokens=10) == "안녕하세요"
+    assert len(fake.requests) == 9
+    # 6 go out on the initial burst, then one every 10 s
+    assert clock.now - 1000.0 == pytest.approx(30.0)
+    assert throttle.stats["rate_limited"] == 0
+
+
+def test_tokens_per_minute_are_paced(server, clock):
+    fake = server()
+    throttle = Throttle(rpm=1000, tpm=600)
+    for _ in range(3):
+        throttle.call(lambda: post(fake.url), tokens=300)
+    assert clock.now - 1000.0 == pytest.approx(30.0)  # third call waits for 300 tokens at 10/s
+
+
+def test_settle_returns_unused_tokens(clock):
+    throttle = Throttle(rpm=1000, tpm=600)
+    throttle.call(lambda: None, tokens=600)
+    throttle.settle(600, 15)
+    throttle.call(lambda: None, tokens=500)
+    assert clock.sleeps == []
+
+
+# ---------------- RETRIES ----------------
+def test_retry_after_is_honoured(server, clock):
+    fake = server(script=[429, 429], retry_after=7)
+    throttle = Throttle(rpm=1000, tpm=100000, base_delay=0.5)
+    assert throttle.call(lambda: post(fake.url), tokens=10) == "안녕하세요"
+    assert len(fake.requests) == 3
+    assert clock.sleeps == [7.0, 7.0]  # Retry-After beats the 0.5 s / 1 s backoff
+    assert throttle.stats == {"calls": 1, "retries": 2, "rate_limited": 2, "waited": 0.0}
+
+
+def test_backoff_grows_exponentially_without_retry_after(server, clock):
+    fake = server(script=[503, 500, 429])
+    throttle = Throttle(rpm=1000, tpm=100000, base_delay=0.5)
+    throttle.call(lambda: post(fake.url), tokens=10)
+    assert clock.sleeps == [0.5, 1.0, 2.0]
+
+
+def test_client_errors_are_not_retried(server, clock):
+    fake = server(script=[400])
+    throttle = Throttle(rpm=1000, tpm=100000)
+    with pytest.raises(StatusError):
+        throttle.call(lambda: post(fake.url), tokens=10)
+    assert len(fake.requests) == 1
+
+
+def test_gives_up_after_max_retries(server, clock):
+    fake = server(script=[429] * 10)
+    throttle = Throttle(rpm=1000, tpm=100000, retries=3)
+    with pytest.raises(StatusError):
+        throttle.call(lambda: post(fake.url), tokens=10)
+    assert len(fake.requests) == 4
+
+
+def test_retries_charge_the_token_estimate_once(clock):
+    failures = iter([429, 503])
+
+    def flaky():
+        status = next(failures, None)
+        if status:
+            raise type("RateLimited", (Exception,), {"status_code": status})()
+        return "ok"
+
+    throttle = Throttle(rpm=1000, tpm=600, base_delay=1e-9)
+    assert throttle.call(flaky, tokens=300) == "ok"
+    assert throttle.stats["retries"] == 2
+    assert throttle.tokens.level == pytest.approx(300)   # one charge for the logical call
+    assert throttle.requests.level == pytest.approx(997)  # but every attempt is a request
+
+
+# ---------------- AIMD CONCURRENCY ----------------
+def test_limit_halves_on_rate_limit_and_grows_additively():
+    limit = AdaptiveLimit(initial=8, minimum=1, maximum=16)
+    limit.backoff()
+    assert limit.limit == 4
+    for _ in range(4):
+        limit.success()
+    assert 4.9 < limit.limit < 5.0  # +1 per window of successes
+    for _ in range(10):
+        limit.backoff()
+    assert limit.limit == 1
+
+
+def test_concurrency_adapts_to_server_capacity(server):
+    fake = server(latency=0.02, max_inflight=2)
+    throttle = Throttle(rpm=100000, tpm=10 ** 7, concurrency=12, base_delay=0.01, max_delay=0.05,
+                        retries=20)
+    results, errors = [], []
+
+    def worker():
+        try:
+            for _ in range(8):
+                results.append(throttle.call(lambda: post(fake.url), tokens=10))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(results) == 96
+    assert throttle.stats["rate_limited"] > 0
+    assert throttle.limit.limit < 6  # cut well below the initial 12 towards the server's 2
+
+
+def test_background_calls_leave_a_slot_for_interactive_ones():
+    limit = AdaptiveLimit(initial=2)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def background():
+        with limit.slot(background=True):
+            entered.set()
+            release.wait()
+
+    t = threading.Thread(target=background)
+    t.start()
+    entered.wait()
+    blocked = threading.Thread(target=lambda: limit.slot(background=True).__enter__())
+    blocked.daemon = True
+    blocked.start()
+    blocked.join(0.1)
+    assert blocked.is_alive()  # a second background call would take the last slot
+    with limit.slot():  # an interactive call still gets in
+        pass
+    release.set()
+    t.join()
+
+
+def test_background_calls_never_take_the_only_slot():
+    limit = AdaptiveLimit(initial=1)
+    blocked = threading.Thread(target=lambda: limit.slot(background=True).__enter__())
+    blocked.daemon = True
+    blocked.start()
+    blocked.join(0.1)
+    assert blocked.is_alive() and limit.inflight == 0
+    with limit.slot():  # the reserved slot is the foreground's
+        assert limit.inflight == 1
+    limit.success()  # grows to two slots: background may use one
+    blocked.join(1)
+    assert not blocked.is_alive()
+
+
+# ---------------- BACKENDS ----------------
+def test_groq_client_against_fake_server(server):
+    pytest.importorskip("groq")
+    fake = server(script=[429], retry_after=0.05)
+    backend = llm.Backend(llm.groq_provider("test-key", base_url=fake.url), "fake",
+                          Throttle(rpm=1000, tpm=100000))
+    assert backend.complete([{"role": "user", "content": "안녕"}], max_tokens=50) == "안녕하세요"
+    # one 429 and one success: the client's own retries are off, the Throttle's do the work
+    assert len(fake.requests) == 2
+    assert backend.throttle.stats["rate_limited"] == 1
+
+
+def test_token_estimate_needs_no_tokenizer():
+    assert llm.estimate_tokens("hello world!") == 5
+    assert llm.estimate_tokens("안녕하세요") == 6
+    code = ("import sys, llm, ratelimit;"
+            "b = llm.Backend(llm.MockProvider(), 'mock', ratelimit.Throttle(60, 6000));"
+            "b.complete([{'role': 'user', 'content': 'hi'}], 10);"
+            "print('transformers' in sys.modules)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=llm.__file__.rsplit("/", 1)[0])
+    assert out.stdout.strip() == "False"
+
+
+class ChunkProvider:
+    name = "chunks"
+
+    def open_stream(self, model, messages, max_tokens):
+        return iter(["안녕", "하세", "요"])
+
+
+def test_stream_holds_its_slot_until_the_last_chunk():
+    throttle = Throttle(rpm=1000, tpm=100000, concurrency=1)
+    backend = llm.Backend(ChunkProvider(), "chunks", throttle)
+    stream = backend.stream([{"role": "user", "content": "안녕"}], max_tokens=50)
+    next(stream)
+    assert throttle.limit.inflight == 1  # the request is still streaming
+    assert list(stream) == ["하세", "요"]
+    assert throttle.limit.inflight == 0
+    assert throttle.stats["calls"] == 1
+
+
+def test_abandoned_stream_releases_its_slot():
+    throttle = Throttle(rpm=1000, tpm=100000, concurrency=1)
+    backend = llm.Backend(ChunkProvider(), "chunks", throttle)
+    stream = backend.stream([{"role": "user", "content": "안녕"}], max_tokens=50)
+    next(stream)
+    stream.close()
+    assert throttle.limit.inflight == 0
@@ -0,0 +1,56 @@
+"""SM-2 reviews and bulk rescheduling of a deck."""
+import pytest
+
+import scheduler
+
+np = pytest.importorskip("numpy")
+
+CARDS = [{"korean": f"단어 {i}", "english": f"word {i}", "example": ""} for i in range(6)]
+GRADES = ([5, 5, 5, 4], [4, 4], [3, 5, 2, 4, 5], [5], [], [5, 5, 5, 5, 5, 5, 5])
+
+
+def test_review_follows_sm2():
+    ease, reps, lapses, interval = scheduler.review(5)
+    assert (reps, lapses, interval) == (1, 0, 1)
+    ease, reps, lapses, interval = scheduler.review(5, ease, reps, lapses, interval)
+    assert interval == 6
+    grown = scheduler.review(4, ease, reps, lapses, interval)
+    assert grown[3] == round(6 * ease)  # grows by the ease before this review
+    assert scheduler.review(1, ease, reps, lapses, interval)[1:] == (0, 1, 1)
+
+
+def _graded_deck(db):
+    db.add_flashcards("food", CARDS, dedup=False)
+    ids = [row[0] for row in db.get_conn().execute("SELECT id FROM flashcards ORDER BY id")]
+    now = 1_700_000_000.0
+    for card_id, grades in zip(ids, GRADES):
+        for quality in grades:
+            db.review_card(card_id, quality, now=now)
+            now += 3600
+    return ids
+
+
+def _schedule(db):
+    return db.get_conn().execute("SELECT id, interval, next_review FROM flashcards ORDER BY id").fetchall()
+
+
+def test_identity_reschedule_changes_nothing(fresh_db):
+    _graded_deck(fresh_db)
+    before = _schedule(fresh_db)
+    assert fresh_db.reschedule_deck() == 0
+    assert _schedule(fresh_db) == before
+
+
+def test_reschedule_scales_the_intervals_review_produced(fresh_db):
+    _graded_deck(fresh_db)
+    before = _schedule(fresh_db)
+    fresh_db.reschedule_deck(interval_modifier=2.0, max_interval=30)
+    for (card_id, old, due), (_, new, new_due), grades in zip(before, _schedule(fresh_db), GRADES):
+        assert new == (min(30, old * 2) if grades else old)
+        assert new_due == pytest.approx(due + (new - old) * scheduler.DAY)
+
+
+def test_unreviewed_cards_keep_their_schedule():
+    interval, due = scheduler.reschedule([np.nan, 100.0], [50.0, 100.0 + 6 * scheduler.DAY], [1, 6], 0.5)
+    assert interval.tolist() == [1, 3]
+    assert due.tolist() == [50.0, 100.0 + 3 * scheduler.DAY]
@@ -0,0 +1,73 @@
+"""Full-text search: Hangul matching, ordering, paging and index upkeep."""
+import sqlite3
+import time
+
+
+def card(korean, english):
+    return {"korean": korean, "english": english, "example": ""}
+
+
+def test_hangul_substrings_and_english_words_match(fresh_db):
+    fresh_db.add_flashcards("food", [card("김치찌개", "Kimchi stew")], dedup=False)
+    assert [r["text"] for r in fresh_db.search("김치")] == ["김치찌개 Kimchi stew"]
+    assert fresh_db.search("stew")[0]["kind"] == "card"
+    assert fresh_db.search("ramen") == []
+
+
+def test_results_are_newest_first_across_sources(fresh_db, monkeypatch):
+    clock = iter(range(1000, 2000, 10))
+    monkeypatch.setattr(fresh_db.time, "time", lambda: next(clock))
+    fresh_db.save_chat_turn("user", "학교 가요", "learner")                           # t=1000
+    fresh_db.add_flashcards("school", [card("학교", "School")], "learner")          # t=1010
+    fresh_db.add_assignment("school", "학교 에 대해 쓰세요", "", "", "learner")       # t=1020
+    fresh_db.save_chat_turn("assistant", "학교 좋아요", "learner")                     # t=1030
+
+    results = fresh_db.search("학교", user_id="learner")
+    assert [r["kind"] for r in results] == ["chat", "assignment", "card", "chat"]
+    assert [r["cursor"][0] for r in results] == [1030, 1020, 1010, 1000]
+
+
+def test_keyset_pages_cover_every_match_once(fresh_db):
+    for i in range(25):
+        fresh_db.save_chat_turn("user", f"사과 {i}")
+    seen, before = [], None
+    while True:
+        page = fresh_db.search("사과", limit=10, before=before)
+        if not page:
+            break
+        seen += [r["id"] for r in page]
+        before = page[-1]["cursor"]
+    assert sorted(seen) == list(range(1, 26))
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_results_are_scoped_to_user_and_kind(fresh_db):
+    fresh_db.save_chat_turn("user", "바다", "alice")
+    fresh_db.add_assignment("sea", "바다", "", "", "bob")
+    assert [r["kind"] for r in fresh_db.search("바다", user_id="alice")] == ["chat"]
+    assert fresh_db.search("바다", kinds=["card"], user_id="bob") == []
+
+
+def test_plain_connections_can_write_and_are_indexed(fresh_db):
+    conn = sqlite3.connect(fresh_db.DB_NAME)
+    with conn:  # no UDFs registered on this connection
+        conn.execute("INSERT INTO chat_turns (user_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                     ("default", "user", "비빔밥 먹었어요", time.time()))
+        conn.execute("UPDATE chat_turns SET content = '냉면 먹었어요' WHERE id = 1")
+    conn.close()
+    assert fresh_db.search("비빔밥") == []
+    assert fresh_db.search("냉면")[0]["text"] == "냉면 먹었어요"
+
+    conn = sqlite3.connect(fresh_db.DB_NAME)
+    with conn:
+        conn.execute("DELETE FROM chat_turns")
+    conn.close()
+    assert fresh_db.search("냉면") == []
+
+
+def test_rebuild_search_matches_incremental_index(fresh_db):
+    fresh_db.add_flashcards("food", [card("불고기", "Bulgogi")])
+    fresh_db.save_chat_turn("user", "불고기 맛있어요")
+    before = fresh_db.search("불고기")
+    fresh_db.rebuild_search()
+    assert fresh_db.search("불고기") == before
@@ -0,0 +1,24 @@
+"""A fresh worker must not import heavy dependencies before first paint."""
+import pytest
+
+import startup_bench
+
+
+def test_app_modules_import_no_heavy_dependencies():
+    total_us, rows, heavy = startup_bench.import_report()
+    assert rows
+    assert heavy == []
+
+
+def test_chatbot_first_paint_is_lazy():
+    pytest.importorskip("streamlit.testing.v1")
+    result = startup_bench.first_paint()
+    assert result["errors"] == []
+    assert result["heavy"] == []
+
+
+def test_every_page_and_chat_send_rerun_cleanly():
+    pytest.importorskip("streamlit.testing.v1")
+    result = startup_bench.rerun_latency(runs=1)
+    assert result["errors"] == []
+    assert "chat send" in result["seconds"]
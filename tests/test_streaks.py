@@ -0,0 +1,45 @@
+"""Incremental streak summary against a full rebuild."""
+import datetime
+import random
+
+import pytest
+
+START = datetime.date(2020, 1, 1)
+
+
+def history(seed, days=730):
+    """Active days with runs and gaps of random length, oldest first."""
+    rng, day, active = random.Random(seed), 0, []
+    while day < days:
+        run = rng.choice([1, 1, 2, 3, 5, 8, 30])
+        active.extend(range(day, min(day + run, days)))
+        day += run + rng.choice([1, 1, 2, 4, 10])
+    return [(START + datetime.timedelta(days=d)).isoformat() for d in active]
+
+
+def summary(db, user):
+    return db.get_conn(user).execute(
+        "SELECT current, longest, last_date FROM streak_summary WHERE user_id=?", (user,)).fetchone()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_summary_matches_a_rebuild(fresh_db, seed):
+    user, rng = f"learner-{seed}", random.Random(seed)
+    conn = fresh_db.get_conn(user)
+    for date in history(seed):
+        for _ in range(rng.choice([1, 1, 3])):  # several activities on one day count once
+            with conn:
+                fresh_db._log_activity(conn, user, date)
+        if rng.random() < 0.05:
+            incremental = summary(fresh_db, user)
+            assert fresh_db.rebuild_streaks(user) == incremental
+    incremental = summary(fresh_db, user)
+    assert fresh_db.rebuild_streaks(user) == incremental
+
+
+def test_out_of_order_day_falls_back_to_a_rebuild(fresh_db):
+    conn = fresh_db.get_conn()
+    for date in ("2024-03-01", "2024-03-02", "2024-03-04", "2024-03-03"):
+        with conn:
+            fresh_db._log_activity(conn, fresh_db.DEFAULT_USER, date)
+    assert summary(fresh_db, fresh_db.DEFAULT_USER) == (4, 4, "2024-03-04")